@@ -5,6 +5,7 @@ from app.config import Config
 from app.extensions import db, migrate, limiter
 from app.api.v1 import api_bp
 from app.errors.handlers import register_error_handlers
+from app.cli import register_commands
 
 
 def create_app(config_class=Config):
@@ -26,5 +27,8 @@ def create_app(config_class=Config):
     # Register error handlers
     register_error_handlers(app)
     
+    # Register CLI commands (background jobs)
+    register_commands(app)
+    
     return app
 
@@ -1,10 +1,11 @@
 """API v1 routes."""
 from flask import Blueprint
 from flask_restx import Api
-from app.api.v1 import auth, wallet, airtime, data, transactions, beneficiaries, webhooks
+from app.api.v1 import auth, wallet, airtime, data, bulk, transactions, beneficiaries, webhooks, system
 from app.api.v1.schemas import (
     signup_model, login_model, user_model, wallet_response,
     airtime_purchase_model, data_purchase_model, transaction_model,
+    bulk_purchase_item_model, bulk_purchase_model,
     beneficiary_model, create_beneficiary_model,
     success_response_model, error_response_model
 )
@@ -35,12 +36,14 @@ api.add_namespace(auth.ns, path='/auth')
 api.add_namespace(wallet.ns, path='/wallet')
 api.add_namespace(airtime.ns, path='/airtime')
 api.add_namespace(data.ns, path='/data')
+api.add_namespace(bulk.ns, path='/bulk')
 api.add_namespace(transactions.ns, path='/transactions')
 api.add_namespace(beneficiaries.ns, path='/beneficiaries')
 # Webhooks namespace - no authentication required
 webhooks_ns = webhooks.ns
 webhooks_ns.security = None  # Disable authentication for webhooks
 api.add_namespace(webhooks_ns, path='/webhooks')
+api.add_namespace(system.ns, path='/system')
 
 # Register models for documentation
 api.models[signup_model.name] = signup_model
@@ -50,6 +53,8 @@ api.models[wallet_response.name] = wallet_response
 api.models[airtime_purchase_model.name] = airtime_purchase_model
 api.models[data_purchase_model.name] = data_purchase_model
 api.models[transaction_model.name] = transaction_model
+api.models[bulk_purchase_item_model.name] = bulk_purchase_item_model
+api.models[bulk_purchase_model.name] = bulk_purchase_model
 api.models[beneficiary_model.name] = beneficiary_model
 api.models[create_beneficiary_model.name] = create_beneficiary_model
 api.models[success_response_model.name] = success_response_model
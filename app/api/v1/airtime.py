@@ -5,6 +5,7 @@ from flask import request
 from app.services.airtime_service import AirtimeService
 from app.utils.response import success_response, error_response
 from app.utils.security import token_required
+from app.utils.idempotency import idempotent
 from app.errors.exceptions import BaseAPIException
 from app.api.v1.schemas import airtime_purchase_model, success_response_model, error_response_model
 
@@ -16,11 +17,17 @@ airtime_service = AirtimeService()
 class PurchaseAirtime(Resource):
     @ns.doc('purchase_airtime', security='Bearer')
     @ns.expect(airtime_purchase_model)
+    @ns.param('Prefer', 'Send "respond-async" to queue the vend and get 202 Accepted', _in='header', required=False)
+    @ns.param('Idempotency-Key', 'Unique key per purchase; retries with the same key replay the first response', _in='header', required=False)
     @ns.marshal_with(success_response_model)
+    @ns.response(202, 'Purchase queued', success_response_model)
     @ns.response(400, 'Validation error or insufficient balance', error_response_model)
     @ns.response(401, 'Unauthorized', error_response_model)
+    @ns.response(409, 'Request with this Idempotency-Key still in progress', error_response_model)
+    @ns.response(422, 'Idempotency-Key reused for a different request', error_response_model)
     @ns.response(500, 'Server error', error_response_model)
     @token_required
+    @idempotent
     def post(self, current_user_id):
         """Purchase airtime for a phone number."""
         try:
@@ -34,6 +41,7 @@ class PurchaseAirtime(Resource):
             phone = data.get("phone")
             save_beneficiary = data.get("save_beneficiary", False)
             beneficiary_name = data.get("beneficiary_name")
+            async_mode = "respond-async" in request.headers.get("Prefer", "")
             
             if not network or not amount or not phone:
                 return {"status": False, "message": "network, amount, and phone are required"}, 400
@@ -44,9 +52,17 @@ class PurchaseAirtime(Resource):
                 amount=Decimal(str(amount)),
                 phone=phone,
                 save_beneficiary=save_beneficiary,
-                beneficiary_name=beneficiary_name
+                beneficiary_name=beneficiary_name,
+                async_mode=async_mode
             )
             
+            if async_mode:
+                return {
+                    "status": True,
+                    "message": "Airtime purchase queued",
+                    "data": result
+                }, 202
+            
             return {
                 "status": True,
                 "message": "Airtime purchased successfully",
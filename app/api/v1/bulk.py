@@ -0,0 +1,86 @@
+"""Bulk purchase endpoints."""
+from flask_restx import Namespace, Resource
+from flask import request
+from app.services.bulk_purchase_service import BulkPurchaseService
+from app.utils.security import token_required
+from app.utils.idempotency import idempotent
+from app.errors.exceptions import BaseAPIException
+from app.api.v1.schemas import bulk_purchase_model, success_response_model, error_response_model
+
+ns = Namespace('bulk', description='Bulk airtime and data purchase operations')
+bulk_purchase_service = BulkPurchaseService()
+
+
+@ns.route('/purchase')
+class BulkPurchase(Resource):
+    @ns.doc('bulk_purchase', security='Bearer')
+    @ns.expect(bulk_purchase_model)
+    @ns.param('Prefer', 'Send "respond-async" to queue every line and get 202 Accepted (batches over BULK_PURCHASE_SYNC_MAX_ITEMS always are)', _in='header', required=False)
+    @ns.param('Idempotency-Key', 'Unique key per batch; retries with the same key replay the first response', _in='header', required=False)
+    @ns.marshal_with(success_response_model)
+    @ns.response(202, 'Batch queued', success_response_model)
+    @ns.response(400, 'Validation error or insufficient balance', error_response_model)
+    @ns.response(401, 'Unauthorized', error_response_model)
+    @ns.response(409, 'Request with this Idempotency-Key still in progress', error_response_model)
+    @ns.response(422, 'Idempotency-Key reused for a different request', error_response_model)
+    @ns.response(500, 'Server error', error_response_model)
+    @token_required
+    @idempotent
+    def post(self, current_user_id):
+        """Purchase airtime and/or data for many phone numbers in one batch."""
+        try:
+            data = request.get_json()
+            
+            if not data or not isinstance(data.get("items"), list):
+                return {"status": False, "message": "items is required"}, 400
+            
+            async_mode = bulk_purchase_service.should_queue(
+                data["items"], "respond-async" in request.headers.get("Prefer", "")
+            )
+            
+            result = bulk_purchase_service.purchase_bulk(
+                user_id=current_user_id,
+                items=data["items"],
+                async_mode=async_mode
+            )
+            
+            if async_mode:
+                return {
+                    "status": True,
+                    "message": "Bulk purchase queued",
+                    "data": result
+                }, 202
+            
+            return {
+                "status": True,
+                "message": "Bulk purchase processed",
+                "data": result
+            }
+        except BaseAPIException as e:
+            return {"status": False, "message": e.message}, e.status_code
+        except Exception as e:
+            return {"status": False, "message": f"An error occurred: {str(e)}"}, 500
+
+
+@ns.route('/<string:batch_id>')
+@ns.param('batch_id', 'Batch ID')
+class GetBatch(Resource):
+    @ns.doc('get_batch', security='Bearer')
+    @ns.marshal_with(success_response_model)
+    @ns.response(401, 'Unauthorized', error_response_model)
+    @ns.response(404, 'Batch not found', error_response_model)
+    @token_required
+    def get(self, current_user_id, batch_id):
+        """Get a bulk purchase batch with per-line results."""
+        try:
+            result = bulk_purchase_service.get_batch(current_user_id, batch_id)
+            
+            return {
+                "status": True,
+                "message": "Batch retrieved successfully",
+                "data": result
+            }
+        except BaseAPIException as e:
+            return {"status": False, "message": e.message}, e.status_code
+        except Exception as e:
+            return {"status": False, "message": f"An error occurred: {str(e)}"}, 500
@@ -4,6 +4,7 @@ from flask import request
 from app.services.data_service import DataService
 from app.utils.response import success_response, error_response
 from app.utils.security import token_required
+from app.utils.idempotency import idempotent
 from app.errors.exceptions import BaseAPIException
 from app.api.v1.schemas import data_purchase_model, success_response_model, error_response_model
 
@@ -47,11 +48,17 @@ class GetDataPlans(Resource):
 class PurchaseData(Resource):
     @ns.doc('purchase_data', security='Bearer')
     @ns.expect(data_purchase_model)
+    @ns.param('Prefer', 'Send "respond-async" to queue the vend and get 202 Accepted', _in='header', required=False)
+    @ns.param('Idempotency-Key', 'Unique key per purchase; retries with the same key replay the first response', _in='header', required=False)
     @ns.marshal_with(success_response_model)
+    @ns.response(202, 'Purchase queued', success_response_model)
     @ns.response(400, 'Validation error or insufficient balance', error_response_model)
     @ns.response(401, 'Unauthorized', error_response_model)
+    @ns.response(409, 'Request with this Idempotency-Key still in progress', error_response_model)
+    @ns.response(422, 'Idempotency-Key reused for a different request', error_response_model)
     @ns.response(500, 'Server error', error_response_model)
     @token_required
+    @idempotent
     def post(self, current_user_id):
         """Purchase data bundle for a phone number."""
         try:
@@ -65,6 +72,7 @@ class PurchaseData(Resource):
             phone = data.get("phone")
             save_beneficiary = data.get("save_beneficiary", False)
             beneficiary_name = data.get("beneficiary_name")
+            async_mode = "respond-async" in request.headers.get("Prefer", "")
             
             if not network or not plan_id or not phone:
                 return {"status": False, "message": "network, plan_id, and phone are required"}, 400
@@ -75,9 +83,17 @@ class PurchaseData(Resource):
                 plan_id=plan_id,
                 phone=phone,
                 save_beneficiary=save_beneficiary,
-                beneficiary_name=beneficiary_name
+                beneficiary_name=beneficiary_name,
+                async_mode=async_mode
             )
             
+            if async_mode:
+                return {
+                    "status": True,
+                    "message": "Data purchase queued",
+                    "data": result
+                }, 202
+            
             return {
                 "status": True,
                 "message": "Data purchased successfully",
@@ -43,6 +43,19 @@ data_purchase_model = Model('DataPurchase', {
     'beneficiary_name': fields.String(description='Beneficiary name (optional)')
 })
 
+# Bulk Purchase Schemas
+bulk_purchase_item_model = Model('BulkPurchaseItem', {
+    'type': fields.String(description='Line type', enum=['airtime', 'data'], default='airtime'),
+    'network': fields.String(required=True, description='Network (mtn, glo, airtel, 9mobile)', enum=['mtn', 'glo', 'airtel', '9mobile']),
+    'phone': fields.String(required=True, description='Phone number to credit'),
+    'amount': fields.Float(description='Airtime amount (minimum NGN 50)', min=50),
+    'plan_id': fields.String(description='Data plan ID from /data/plans')
+})
+
+bulk_purchase_model = Model('BulkPurchase', {
+    'items': fields.List(fields.Nested(bulk_purchase_item_model), required=True, description='Recipients to top up')
+})
+
 # Transaction Schemas
 transaction_model = Model('Transaction', {
     'id': fields.String(description='Transaction ID'),
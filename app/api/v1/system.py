@@ -0,0 +1,30 @@
+"""System endpoints."""
+import hmac
+from flask_restx import Namespace, Resource
+from flask import request, current_app
+from app.utils.metrics import collect_metrics
+from app.api.v1.schemas import success_response_model, error_response_model
+
+ns = Namespace('system', description='Operational endpoints', security=None)
+
+
+@ns.route('/metrics')
+class Metrics(Resource):
+    @ns.doc('get_metrics', description='In-process metrics for this worker')
+    @ns.param('X-Metrics-Token', 'Metrics access token', _in='header', required=False)
+    @ns.response(200, 'Metrics snapshot', success_response_model)
+    @ns.response(401, 'Unauthorized', error_response_model)
+    def get(self):
+        """Get a metrics snapshot for the worker serving the request."""
+        token = current_app.config.get("METRICS_TOKEN", "")
+        if token:
+            if not hmac.compare_digest(request.headers.get("X-Metrics-Token", ""), token):
+                return {"status": False, "message": "Unauthorized"}, 401
+        elif not current_app.config.get("DEBUG", False):
+            return {"status": False, "message": "Unauthorized"}, 401
+
+        return {
+            "status": True,
+            "message": "Metrics retrieved successfully",
+            "data": collect_metrics()
+        }, 200
@@ -1,7 +1,9 @@
 """Transaction endpoints."""
+from datetime import datetime
 from flask_restx import Namespace, Resource
-from flask import request
+from flask import request, Response, stream_with_context
 from app.services.transaction_service import TransactionService
+from app.services.spend_rollup_service import SpendRollupService
 from app.utils.response import success_response, error_response
 from app.utils.security import token_required
 from app.errors.exceptions import BaseAPIException
@@ -9,30 +11,49 @@ from app.api.v1.schemas import transaction_model, success_response_model, error_
 
 ns = Namespace('transactions', description='Transaction operations')
 transaction_service = TransactionService()
+spend_rollup_service = SpendRollupService()
+
+# History filters shared by the list and export endpoints; see TransactionService.parse_filters
+filter_params = {
+    'type': {'description': 'Transaction type filter', 'enum': ['airtime', 'data', 'credit']},
+    'status': {'description': 'Transaction status filter', 'enum': ['pending', 'processing', 'success', 'failed', 'refunded']},
+    'network': {'description': 'Network filter', 'enum': ['mtn', 'glo', 'airtel', '9mobile']},
+    'phone': {'description': 'Recipient phone, full number or leading digits'},
+    'start_date': {'description': 'Created at or after (ISO 8601)'},
+    'end_date': {'description': 'Created before (ISO 8601)'},
+    'min_amount': {'description': 'Minimum amount', 'type': 'number'},
+    'max_amount': {'description': 'Maximum amount', 'type': 'number'},
+}
 
 
 @ns.route('')
 class GetTransactions(Resource):
-    @ns.doc('get_transactions', security='Bearer')
-    @ns.param('type', 'Transaction type filter (airtime, data, credit)', required=False, enum=['airtime', 'data', 'credit'])
-    @ns.param('limit', 'Number of results per page', required=False, type=int, default=50)
-    @ns.param('offset', 'Number of results to skip', required=False, type=int, default=0)
+    @ns.doc('get_transactions', security='Bearer', params=filter_params)
+    @ns.param('limit', 'Number of results per page (max 100)', required=False, type=int, default=50)
+    @ns.param('cursor', 'next_cursor from the previous page', required=False)
+    @ns.param('include_total', 'Also return the (briefly cached) total count', required=False, type=bool, default=False)
+    @ns.param('offset', 'Deprecated: number of results to skip, use cursor instead', required=False, type=int, default=0)
     @ns.marshal_with(success_response_model)
+    @ns.response(400, 'Invalid cursor or filter', error_response_model)
     @ns.response(401, 'Unauthorized', error_response_model)
     @ns.response(500, 'Server error', error_response_model)
     @token_required
     def get(self, current_user_id):
         """Get user transactions with optional filtering."""
         try:
-            transaction_type = request.args.get("type")  # airtime, data, credit
+            filters = transaction_service.parse_filters(request.args)
             limit = int(request.args.get("limit", 50))
             offset = int(request.args.get("offset", 0))
+            cursor = request.args.get("cursor")
+            include_total = request.args.get("include_total", "false").lower() == "true"
             
             result = transaction_service.get_transactions(
                 user_id=current_user_id,
-                transaction_type=transaction_type,
+                filters=filters,
                 limit=limit,
-                offset=offset
+                cursor=cursor,
+                offset=offset,
+                include_total=include_total
             )
             
             return {
@@ -46,6 +67,59 @@ class GetTransactions(Resource):
             return {"status": False, "message": f"An error occurred: {str(e)}"}, 500
 
 
+@ns.route('/summary')
+class TransactionSummary(Resource):
+    @ns.doc('transaction_summary', security='Bearer')
+    @ns.marshal_with(success_response_model)
+    @ns.response(401, 'Unauthorized', error_response_model)
+    @token_required
+    def get(self, current_user_id):
+        """Get spending and funding for this week and month, by type and network."""
+        try:
+            return {
+                "status": True,
+                "message": "Summary retrieved successfully",
+                "data": spend_rollup_service.get_summary(current_user_id)
+            }
+        except BaseAPIException as e:
+            return {"status": False, "message": e.message}, e.status_code
+        except Exception as e:
+            return {"status": False, "message": f"An error occurred: {str(e)}"}, 500
+
+
+@ns.route('/export')
+class ExportTransactions(Resource):
+    @ns.doc('export_transactions', security='Bearer', params=filter_params)
+    @ns.param('format', 'Export format', required=False, enum=['csv', 'ndjson'], default='csv')
+    @ns.response(200, 'Transaction history as a streamed CSV or NDJSON download')
+    @ns.response(400, 'Invalid format or filter', error_response_model)
+    @ns.response(401, 'Unauthorized', error_response_model)
+    @token_required
+    def get(self, current_user_id):
+        """Download the full transaction history, streamed as it is read."""
+        try:
+            export_format = request.args.get("format", "csv").lower()
+            chunks = transaction_service.export_transactions(
+                user_id=current_user_id,
+                export_format=export_format,
+                filters=transaction_service.parse_filters(request.args)
+            )
+            filename = f"transactions-{datetime.utcnow().strftime('%Y%m%d')}.{export_format}"
+            return Response(
+                stream_with_context(chunks),
+                mimetype="text/csv" if export_format == "csv" else "application/x-ndjson",
+                headers={
+                    "Content-Disposition": f"attachment; filename={filename}",
+                    # Stop reverse proxies from buffering the whole download
+                    "X-Accel-Buffering": "no"
+                }
+            )
+        except BaseAPIException as e:
+            return {"status": False, "message": e.message}, e.status_code
+        except Exception as e:
+            return {"status": False, "message": f"An error occurred: {str(e)}"}, 500
+
+
 @ns.route('/<string:transaction_id>')
 @ns.param('transaction_id', 'Transaction ID')
 class GetTransaction(Resource):
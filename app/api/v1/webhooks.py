@@ -1,7 +1,7 @@
 """Webhook endpoints."""
 from flask_restx import Namespace, Resource
 from flask import request, current_app
-from app.services.webhook_service import process_payscribe_webhook
+from app.services.webhook_service import process_payscribe_webhook, record_webhook
 from app.utils.security import verify_webhook_ip
 from app.models.webhook_log import WebhookLog
 from app.extensions import db
@@ -38,15 +38,17 @@ class PayscribeWebhook(Resource):
             # Get event type - Payscribe uses "event_type" field
             event_type = payload.get("event_type") or payload.get("event") or payload.get("type") or "unknown"
             
-            # Log webhook
-            webhook_log = WebhookLog(event_type=event_type, payload=payload)
-            db.session.add(webhook_log)
-            db.session.commit()
+            # Persist webhook; webhook workers process it (flask webhooks work)
+            webhook_log_id = record_webhook(event_type, payload)
+            if webhook_log_id is None:
+                return {"status": True, "message": "Duplicate webhook ignored", "data": {"message": "Webhook received"}}, 200
 
-            # Process webhook synchronously
-            process_payscribe_webhook(webhook_log)
+            if not current_app.config.get("WEBHOOK_ASYNC_PROCESSING", True):
+                # Process webhook synchronously
+                process_payscribe_webhook(db.session.get(WebhookLog, webhook_log_id))
+                return {"status": True, "message": "Webhook processed", "data": {"message": "Webhook received"}}, 200
 
-            return {"status": True, "message": "Webhook processed", "data": {"message": "Webhook received"}}, 200
+            return {"status": True, "message": "Webhook received", "data": {"message": "Webhook received"}}, 200
         except Exception as e:
             current_app.logger.error(f"Webhook error: {str(e)}")
             return {"status": False, "message": f"An error occurred: {str(e)}"}, 500
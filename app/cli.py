@@ -0,0 +1,263 @@
+"""Flask CLI commands for background jobs."""
+import time
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+data_plans_cli = AppGroup("data-plans", help="Data plan catalog commands.")
+vend_queue_cli = AppGroup("vend-queue", help="Async purchase vend queue commands.")
+idempotency_cli = AppGroup("idempotency", help="Idempotency key commands.")
+reconcile_cli = AppGroup("reconcile", help="Reconciliation jobs against Payscribe.")
+webhooks_cli = AppGroup("webhooks", help="Webhook processing commands.")
+transactions_cli = AppGroup("transactions", help="Transaction maintenance commands.")
+
+
+@data_plans_cli.command("sync")
+@click.option("--network", "networks", multiple=True, help="Network to sync (repeatable). Defaults to all.")
+@click.option("--interval", type=int, default=0, help="Repeat every N seconds instead of running once.")
+def sync_data_plans(networks, interval):
+    """Sync the data_plans table from Payscribe."""
+    from app.extensions import db
+    from app.services.data_service import DataService
+
+    data_service = DataService()
+    while True:
+        summary = data_service.sync_data_plans(list(networks) or None)
+        for network, result in summary.items():
+            click.echo(f"{network}: {result}")
+        db.session.remove()
+        if not interval:
+            break
+        time.sleep(interval)
+
+
+@vend_queue_cli.command("work")
+@click.option("--concurrency", type=int, default=4, help="Number of vend worker threads.")
+@click.option("--batch-size", type=int, default=5, help="Jobs claimed per worker iteration.")
+@click.option("--poll-interval", type=float, default=1.0, help="Seconds to sleep when the queue is empty.")
+def work_vend_queue(concurrency, batch_size, poll_interval):
+    """Drain the vend queue until interrupted."""
+    from app.services.vend_queue_service import VendQueueService
+    from app.utils.workers import run_worker_pool
+
+    vend_queue_service = VendQueueService()
+    click.echo(f"Starting {concurrency} vend workers")
+    run_worker_pool(
+        current_app._get_current_object(),
+        lambda: vend_queue_service.run_once(batch_size),
+        concurrency=concurrency,
+        poll_interval=poll_interval,
+        name="vend-worker"
+    )
+
+
+@idempotency_cli.command("cleanup")
+@click.option("--batch-size", type=int, default=1000, help="Rows deleted per statement.")
+def cleanup_idempotency_keys(batch_size):
+    """Delete expired idempotency keys."""
+    from app.utils.idempotency import purge_expired_keys
+
+    deleted = purge_expired_keys(batch_size)
+    click.echo(f"Deleted {deleted} expired idempotency keys")
+
+
+@reconcile_cli.command("pending")
+@click.option("--batch-size", type=int, default=100, help="Transactions requeried per batch.")
+@click.option("--max-batches", type=int, default=None, help="Stop after N batches (default: drain the backlog).")
+@click.option("--interval", type=int, default=0, help="Repeat every N seconds instead of running once.")
+def reconcile_pending(batch_size, max_batches, interval):
+    """Requery stale pending/processing purchases and resolve them."""
+    from app.extensions import db
+    from app.services.reconciliation_service import ReconciliationService
+
+    reconciliation_service = ReconciliationService()
+    while True:
+        summary = reconciliation_service.reconcile_pending(batch_size, max_batches)
+        click.echo(", ".join(f"{key}={value}" for key, value in summary.items()))
+        db.session.remove()
+        if not interval:
+            break
+        time.sleep(interval)
+
+
+@reconcile_cli.command("funding")
+@click.option("--lookback-hours", type=int, default=24, help="Collections window to reconcile.")
+@click.option("--page-size", type=int, default=500, help="Wallets read per page.")
+@click.option("--interval", type=int, default=0, help="Repeat every N seconds instead of running once.")
+def reconcile_funding(lookback_hours, page_size, interval):
+    """Credit virtual-account collections whose funding webhook was missed."""
+    from app.extensions import db
+    from app.services.funding_reconciliation_service import FundingReconciliationService
+
+    funding_reconciliation_service = FundingReconciliationService()
+    while True:
+        summary = funding_reconciliation_service.reconcile_funding(lookback_hours, page_size)
+        click.echo(", ".join(f"{key}={value}" for key, value in summary.items()))
+        db.session.remove()
+        if not interval:
+            break
+        time.sleep(interval)
+
+
+@webhooks_cli.command("work")
+@click.option("--concurrency", type=int, default=4, help="Number of webhook worker threads.")
+@click.option("--batch-size", type=int, default=10, help="Webhooks claimed per worker iteration.")
+@click.option("--poll-interval", type=float, default=1.0, help="Seconds to sleep when the queue is empty.")
+@click.option("--batched/--no-batched", default=False, help="Credit funding webhooks set-wise, a batch per statement.")
+def work_webhooks(concurrency, batch_size, poll_interval, batched):
+    """Process queued webhooks until interrupted."""
+    from app.services.webhook_queue_service import WebhookQueueService
+    from app.utils.workers import run_worker_pool
+
+    webhook_queue_service = WebhookQueueService()
+    run = webhook_queue_service.run_batch if batched else webhook_queue_service.run_once
+    click.echo(f"Starting {concurrency} webhook workers")
+    run_worker_pool(
+        current_app._get_current_object(),
+        lambda: run(batch_size),
+        concurrency=concurrency,
+        poll_interval=poll_interval,
+        name="webhook-worker"
+    )
+
+
+@webhooks_cli.command("replay")
+@click.option("--status", "statuses", multiple=True, default=["failed", "dead"], show_default=True,
+              help="Webhook status to replay (repeatable).")
+@click.option("--event-type", default=None, help="Only replay this event type.")
+@click.option("--since", type=click.DateTime(), default=None, help="Only webhooks received at or after this time (UTC).")
+@click.option("--until", type=click.DateTime(), default=None, help="Only webhooks received before this time (UTC).")
+@click.option("--workers", type=int, default=4, help="Number of worker processes.")
+@click.option("--page-size", type=int, default=500, help="Webhooks read (and checkpointed) per page.")
+@click.option("--checkpoint", "checkpoint_path", default=None, help="Checkpoint file to resume from and update.")
+@click.option("--dry-run", is_flag=True, help="Only report what would be replayed.")
+def replay_webhooks(statuses, event_type, since, until, workers, page_size, checkpoint_path, dry_run):
+    """Reprocess stored webhooks matching the given filters."""
+    from app.services.webhook_replay_service import WebhookReplayService
+
+    replay_service = WebhookReplayService(list(statuses), event_type=event_type, since=since, until=until)
+    try:
+        cursor = replay_service.load_checkpoint(checkpoint_path)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    if dry_run:
+        by_event_type = replay_service.count_by_event_type(cursor)
+        click.echo(f"{sum(by_event_type.values())} webhooks would be replayed")
+        for name, count in sorted(by_event_type.items()):
+            click.echo(f"  {name}: {count}")
+        return
+
+    started = time.monotonic()
+
+    def report(done, total, counts):
+        elapsed = time.monotonic() - started
+        rate = done / elapsed if elapsed else 0
+        eta = (total - done) / rate if rate else 0
+        click.echo(f"{done}/{total} replayed ({rate:.0f}/s, ETA {eta:.0f}s) {counts}")
+
+    click.echo(f"Replaying with {workers} workers")
+    counts = replay_service.replay(
+        workers=workers,
+        page_size=page_size,
+        checkpoint_path=checkpoint_path,
+        progress=report
+    )
+    click.echo(f"Replay finished in {time.monotonic() - started:.1f}s: {counts}")
+
+
+@webhooks_cli.command("partitions")
+@click.option("--months-ahead", type=int, default=None, help="Months of partitions to keep ahead of now.")
+def ensure_webhook_partitions(months_ahead):
+    """Create upcoming monthly webhook_logs partitions (run daily)."""
+    from app.services.webhook_archive_service import WebhookArchiveService
+
+    created = WebhookArchiveService().ensure_partitions(months_ahead)
+    click.echo(f"Created partitions: {', '.join(created)}" if created else "Partitions up to date")
+
+
+@webhooks_cli.command("archive")
+@click.option("--retention-days", type=int, default=None, help="Keep webhook logs this many days.")
+@click.option("--dry-run", is_flag=True, help="Only list the partitions that would be archived.")
+def archive_webhooks(retention_days, dry_run):
+    """Archive expired webhook_logs partitions to NDJSON and drop them."""
+    from app.services.webhook_archive_service import WebhookArchiveService
+
+    archive_service = WebhookArchiveService()
+    if dry_run:
+        for partition in archive_service.expired_partitions(retention_days):
+            click.echo(f"{partition.name} ({'attached' if partition.attached else 'detached'})")
+        return
+
+    for archived in archive_service.archive_expired(retention_days):
+        click.echo(f"Archived {archived['rows']} rows from {archived['partition']} to {archived['path']}")
+
+
+@webhooks_cli.command("restore")
+@click.option("--since", type=click.DateTime(), required=True, help="Restore webhooks received at or after this time (UTC).")
+@click.option("--until", type=click.DateTime(), required=True, help="Restore webhooks received before this time (UTC).")
+def restore_webhooks(since, until):
+    """Load archived webhook logs for a time range into webhook_logs_restored."""
+    from app.services.webhook_archive_service import WebhookArchiveService
+
+    restored = WebhookArchiveService().restore(since, until)
+    click.echo(f"Restored {restored} webhook logs into webhook_logs_restored")
+
+
+@transactions_cli.command("partitions")
+@click.option("--months-ahead", type=int, default=None, help="Months of partitions to keep ahead of now.")
+def ensure_transaction_partitions(months_ahead):
+    """Create upcoming monthly transactions partitions (run daily)."""
+    from app.services.transaction_service import TransactionService
+
+    created = TransactionService().ensure_partitions(months_ahead)
+    click.echo(f"Created partitions: {', '.join(created)}" if created else "Partitions up to date")
+
+
+@transactions_cli.command("archive")
+@click.option("--older-than-days", type=int, default=None, help="Archive finalized transactions older than this.")
+@click.option("--batch-size", type=int, default=1000, help="Transactions moved per commit.")
+@click.option("--max-batches", type=int, default=None, help="Stop after N batches (default: archive everything due).")
+@click.option("--dry-run", is_flag=True, help="Only count the transactions that would be archived.")
+def archive_transactions(older_than_days, batch_size, max_batches, dry_run):
+    """Move old success/failed/refunded transactions to transactions_archive."""
+    from app.services.transaction_archive_service import TransactionArchiveService
+
+    archive_service = TransactionArchiveService()
+    if dry_run:
+        click.echo(f"{archive_service.count_archivable(older_than_days)} transactions would be archived")
+        return
+
+    moved = archive_service.archive(older_than_days, batch_size, max_batches)
+    click.echo(f"Archived {moved} transactions")
+
+
+@transactions_cli.command("backfill-search-columns")
+@click.option("--batch-size", type=int, default=1000, help="Rows updated per commit.")
+def backfill_search_columns(batch_size):
+    """Fill network/recipient_phone on purchases recorded before they existed."""
+    from app.services.transaction_service import TransactionService
+
+    updated = TransactionService().backfill_search_columns(batch_size)
+    click.echo(f"Backfilled {updated} transactions")
+
+
+@transactions_cli.command("rebuild-rollups")
+@click.option("--since", type=click.DateTime(formats=["%Y-%m-%d"]), default=None,
+              help="First day to rebuild (default: all history).")
+def rebuild_rollups(since):
+    """Recompute daily_spend_rollups from transactions."""
+    from app.services.spend_rollup_service import SpendRollupService
+
+    written = SpendRollupService().rebuild(since.date() if since else None)
+    click.echo(f"Wrote {written} rollup rows")
+
+
+def register_commands(app):
+    """Register CLI command groups with Flask app."""
+    app.cli.add_command(data_plans_cli)
+    app.cli.add_command(vend_queue_cli)
+    app.cli.add_command(idempotency_cli)
+    app.cli.add_command(reconcile_cli)
+    app.cli.add_command(webhooks_cli)
+    app.cli.add_command(transactions_cli)
@@ -19,6 +19,10 @@ class Config:
     SQLALCHEMY_ENGINE_OPTIONS = {
         "pool_pre_ping": True,   # run a quick check before using a pooled connection; if dead, open a new one
         "pool_recycle": 300,     # recycle connections after 5 min (Neon closes idle connections after a few minutes)
+        # Purchases release their connection while waiting on Payscribe, so a small pool serves many in-flight vends
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "10")),
     }
 
     # Payscribe
@@ -26,6 +30,88 @@ class Config:
     PAYSCRIBE_API_TOKEN = os.getenv("PAYSCRIBE_API_TOKEN", "ps_pk_live_s34awkOxtpU7XteKeY1poLaP3K1jDrAQzey")
     PAYSCRIBE_SECRET_KEY = os.getenv("PAYSCRIBE_SECRET_KEY", "")
     PAYSCRIBE_WEBHOOK_IPS = os.getenv("PAYSCRIBE_WEBHOOK_IP", "162.254.34.78").split(",")
+    # Keep-alive connection pool shared by all Payscribe calls in a worker process
+    PAYSCRIBE_POOL_SIZE = int(os.getenv("PAYSCRIBE_POOL_SIZE", "10"))
+    PAYSCRIBE_CONNECT_TIMEOUT = float(os.getenv("PAYSCRIBE_CONNECT_TIMEOUT", "5"))
+    PAYSCRIBE_READ_TIMEOUT = float(os.getenv("PAYSCRIBE_READ_TIMEOUT", "30"))
+    # Per-endpoint read timeouts (seconds); endpoints not listed use PAYSCRIBE_READ_TIMEOUT
+    PAYSCRIBE_READ_TIMEOUTS = {
+        "airtime": float(os.getenv("PAYSCRIBE_AIRTIME_READ_TIMEOUT", "30")),
+        "data/vend": float(os.getenv("PAYSCRIBE_DATA_VEND_READ_TIMEOUT", "30")),
+        "data/lookup": float(os.getenv("PAYSCRIBE_DATA_LOOKUP_READ_TIMEOUT", "10")),
+        "customers": float(os.getenv("PAYSCRIBE_CUSTOMERS_READ_TIMEOUT", "15")),
+        "collections/virtual-accounts": float(os.getenv("PAYSCRIBE_VIRTUAL_ACCOUNTS_READ_TIMEOUT", "15")),
+        "requery": float(os.getenv("PAYSCRIBE_REQUERY_READ_TIMEOUT", "10")),
+    }
+    # Circuit breaker per endpoint group: opens when the failure or slow-call rate
+    # over the last N calls crosses its threshold, then probes after OPEN_SECONDS
+    PAYSCRIBE_BREAKER_FAILURE_RATE = float(os.getenv("PAYSCRIBE_BREAKER_FAILURE_RATE", "0.5"))
+    PAYSCRIBE_BREAKER_SLOW_CALL_RATE = float(os.getenv("PAYSCRIBE_BREAKER_SLOW_CALL_RATE", "0.8"))
+    PAYSCRIBE_BREAKER_SLOW_CALL_SECONDS = float(os.getenv("PAYSCRIBE_BREAKER_SLOW_CALL_SECONDS", "10"))
+    PAYSCRIBE_BREAKER_WINDOW_SIZE = int(os.getenv("PAYSCRIBE_BREAKER_WINDOW_SIZE", "20"))
+    PAYSCRIBE_BREAKER_MINIMUM_CALLS = int(os.getenv("PAYSCRIBE_BREAKER_MINIMUM_CALLS", "10"))
+    PAYSCRIBE_BREAKER_OPEN_SECONDS = float(os.getenv("PAYSCRIBE_BREAKER_OPEN_SECONDS", "30"))
+    # Bulkheads: max concurrent calls per endpoint group and network in one worker process
+    PAYSCRIBE_BULKHEAD_DEFAULT_LIMIT = int(os.getenv("PAYSCRIBE_BULKHEAD_DEFAULT_LIMIT", "10"))
+    PAYSCRIBE_BULKHEAD_LIMITS = {
+        "airtime": int(os.getenv("PAYSCRIBE_AIRTIME_BULKHEAD_LIMIT", "10")),
+        "data/vend": int(os.getenv("PAYSCRIBE_DATA_VEND_BULKHEAD_LIMIT", "10")),
+        "data/lookup": int(os.getenv("PAYSCRIBE_DATA_LOOKUP_BULKHEAD_LIMIT", "4")),
+    }
+    PAYSCRIBE_BULKHEAD_MAX_WAIT_SECONDS = float(os.getenv("PAYSCRIBE_BULKHEAD_MAX_WAIT_SECONDS", "0"))
+
+    # Data plan catalog cache (seconds): fresh for TTL, then served stale while refreshing
+    DATA_PLAN_CACHE_TTL = int(os.getenv("DATA_PLAN_CACHE_TTL", "300"))
+    DATA_PLAN_CACHE_STALE_TTL = int(os.getenv("DATA_PLAN_CACHE_STALE_TTL", "3600"))
+
+    # How long a user's transaction count (GET /transactions?include_total=true) is cached
+    TRANSACTION_COUNT_CACHE_TTL = int(os.getenv("TRANSACTION_COUNT_CACHE_TTL", "60"))
+    # transactions is partitioned by month; lookups by reference/trans_id try the last N days first
+    TRANSACTION_PARTITION_MONTHS_AHEAD = int(os.getenv("TRANSACTION_PARTITION_MONTHS_AHEAD", "3"))
+    TRANSACTION_LOOKUP_RECENT_DAYS = int(os.getenv("TRANSACTION_LOOKUP_RECENT_DAYS", "31"))
+    # Finalized transactions older than this move to transactions_archive (flask transactions archive)
+    TRANSACTION_ARCHIVE_AFTER_DAYS = int(os.getenv("TRANSACTION_ARCHIVE_AFTER_DAYS", "180"))
+
+    # Async purchase vend queue: retries for calls rejected by a breaker/bulkhead
+    VEND_QUEUE_MAX_ATTEMPTS = int(os.getenv("VEND_QUEUE_MAX_ATTEMPTS", "5"))
+    VEND_QUEUE_RETRY_BACKOFF = int(os.getenv("VEND_QUEUE_RETRY_BACKOFF", "15"))
+    # Jobs stuck in processing this long (the worker died) are claimed again
+    VEND_QUEUE_LOCK_TIMEOUT_SECONDS = int(os.getenv("VEND_QUEUE_LOCK_TIMEOUT_SECONDS", "300"))
+
+    # Webhooks: intake only persists the payload when async processing is on;
+    # failed webhooks are retried with exponential backoff, then dead-lettered
+    WEBHOOK_ASYNC_PROCESSING = os.getenv("WEBHOOK_ASYNC_PROCESSING", "true").lower() == "true"
+    WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "5"))
+    WEBHOOK_RETRY_BACKOFF = int(os.getenv("WEBHOOK_RETRY_BACKOFF", "30"))
+    WEBHOOK_LOCK_TIMEOUT_SECONDS = int(os.getenv("WEBHOOK_LOCK_TIMEOUT_SECONDS", "300"))
+
+    # Webhook log retention: webhook_logs is partitioned by month; partitions
+    # older than the retention window are exported to gzipped NDJSON and dropped
+    WEBHOOK_LOG_RETENTION_DAYS = int(os.getenv("WEBHOOK_LOG_RETENTION_DAYS", "90"))
+    WEBHOOK_PARTITION_MONTHS_AHEAD = int(os.getenv("WEBHOOK_PARTITION_MONTHS_AHEAD", "3"))
+    WEBHOOK_ARCHIVE_DIR = os.getenv("WEBHOOK_ARCHIVE_DIR", "archives/webhook_logs")
+
+    # Idempotency-Key: how long stored responses are replayed, how long a
+    # duplicate waits for the first request before answering 409, and after how
+    # long an in-progress key (its request died) may be taken over by a retry
+    IDEMPOTENCY_KEY_TTL = int(os.getenv("IDEMPOTENCY_KEY_TTL", "86400"))
+    IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+    IDEMPOTENCY_STALE_SECONDS = int(os.getenv("IDEMPOTENCY_STALE_SECONDS", "300"))
+
+    # Bulk purchases: lines per request, Payscribe vends in flight per batch, and
+    # the most lines vended inside the request (larger batches are queued)
+    BULK_PURCHASE_MAX_ITEMS = int(os.getenv("BULK_PURCHASE_MAX_ITEMS", "500"))
+    BULK_PURCHASE_CONCURRENCY = int(os.getenv("BULK_PURCHASE_CONCURRENCY", "5"))
+    BULK_PURCHASE_SYNC_MAX_ITEMS = int(os.getenv("BULK_PURCHASE_SYNC_MAX_ITEMS", "20"))
+
+    # Reconciliation: open purchases older than MIN_AGE are requeried; ones
+    # Payscribe explicitly reports as not found after NOT_FOUND_FAIL are failed and refunded
+    RECONCILE_MIN_AGE_SECONDS = int(os.getenv("RECONCILE_MIN_AGE_SECONDS", "300"))
+    RECONCILE_NOT_FOUND_FAIL_SECONDS = int(os.getenv("RECONCILE_NOT_FOUND_FAIL_SECONDS", "3600"))
+    RECONCILE_CONCURRENCY = int(os.getenv("RECONCILE_CONCURRENCY", "5"))
+    FUNDING_RECONCILE_CONCURRENCY = int(os.getenv("FUNDING_RECONCILE_CONCURRENCY", "5"))
+    # Collections pages read per account per run (guards against an API that ignores page)
+    FUNDING_RECONCILE_MAX_PAGES = int(os.getenv("FUNDING_RECONCILE_MAX_PAGES", "50"))
     
     # JWT
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", SECRET_KEY)
@@ -34,6 +120,9 @@ class Config:
     # CORS
     ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "http://localhost:8080,http://localhost:5173")
     
+    # Metrics endpoint (/api/v1/system/metrics); open only in DEBUG when no token is set
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
     # Rate Limiting (in-memory when no storage URL)
     RATELIMIT_DEFAULT = "200 per day, 50 per hour"
 
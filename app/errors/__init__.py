@@ -4,6 +4,7 @@ from app.errors.exceptions import (
     InsufficientBalanceException,
     InvalidTransactionException,
     PayscribeAPIException,
+    PayscribeUnavailableException,
     TokenExpiredException,
     InvalidTokenException
 )
@@ -13,6 +14,7 @@ __all__ = [
     "InsufficientBalanceException",
     "InvalidTransactionException",
     "PayscribeAPIException",
+    "PayscribeUnavailableException",
     "TokenExpiredException",
     "InvalidTokenException",
 ]
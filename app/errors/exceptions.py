@@ -27,9 +27,24 @@ class InvalidTransactionException(BaseAPIException):
 
 
 class PayscribeAPIException(BaseAPIException):
-    """Raised when Payscribe API call fails."""
+    """Raised when Payscribe API call fails.
+
+    ``upstream_status`` is Payscribe's HTTP status when it answered with an error.
+    """
     status_code = 502
     message = "External API error"
+    upstream_status = None
+    
+    def __init__(self, message: str = None, status_code: int = None, upstream_status: int = None):
+        super().__init__(message, status_code)
+        if upstream_status:
+            self.upstream_status = upstream_status
+
+
+class PayscribeUnavailableException(PayscribeAPIException):
+    """Raised when a Payscribe call is rejected by a circuit breaker or bulkhead."""
+    status_code = 503
+    message = "Service temporarily unavailable, please try again shortly"
 
 
 class TokenExpiredException(BaseAPIException):
@@ -55,3 +70,9 @@ class ValidationException(BaseAPIException):
     status_code = 400
     message = "Validation error"
 
+
+
+class IdempotencyConflictException(BaseAPIException):
+    """Raised when another request already debited under the same Idempotency-Key."""
+    status_code = 409
+    message = "A request with this Idempotency-Key is still being processed"
@@ -3,6 +3,7 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+from app.utils.metrics import register_metrics_provider
 
 db = SQLAlchemy()
 migrate = Migrate()
@@ -11,3 +12,18 @@ limiter = Limiter(
     default_limits=["200 per day", "50 per hour"]
 )
 
+
+def _db_pool_stats() -> dict:
+    """Get connection pool usage for the current app's engine."""
+    pool = db.engine.pool
+    if not hasattr(pool, "checkedout"):
+        return {"status": pool.status()}
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+    }
+
+
+register_metrics_provider("db_pool", _db_pool_stats)
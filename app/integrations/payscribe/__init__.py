@@ -1,5 +1,5 @@
 """Payscribe API integration."""
 from app.integrations.payscribe.client import PayscribeClient
+from app.integrations.payscribe.async_client import AsyncPayscribeClient
 
-__all__ = ["PayscribeClient"]
-
+__all__ = ["PayscribeClient", "AsyncPayscribeClient"]
@@ -0,0 +1,246 @@
+"""Asyncio Payscribe API client."""
+import httpx
+from typing import Dict, Any, Optional, List
+from flask import current_app
+from app.errors.exceptions import PayscribeAPIException
+from app.integrations.payscribe.client import parse_response, not_found_answer
+from app.integrations.payscribe.transport import get_timeout
+from app.integrations.payscribe.resilience import guard_call
+
+
+class AsyncPayscribeClient:
+    """Asyncio client for interacting with Payscribe API.
+
+    Mirrors PayscribeClient so many calls can be kept in flight from one
+    worker. Use it as an async context manager so the underlying connection
+    pool is closed with the event loop that created it::
+
+        async with AsyncPayscribeClient() as client:
+            results = await asyncio.gather(*(client.lookup_data_plans(n) for n in NETWORKS))
+
+    Config is read from ``current_app`` when the client is opened, so it must
+    be opened inside an application context.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """Initialize async Payscribe client."""
+        self._config = config
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        """Get config, falling back to the current app."""
+        if self._config is None:
+            self._config = dict(current_app.config)
+        return self._config
+
+    @property
+    def base_url(self) -> str:
+        """Get base URL from config."""
+        return self.config.get("PAYSCRIBE_BASE_URL", "https://api.payscribe.ng/api/v1")
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """Get headers with auth token."""
+        return {
+            "Authorization": f"Bearer {self.config.get('PAYSCRIBE_API_TOKEN', '')}",
+            "Content-Type": "application/json"
+        }
+
+    async def open(self) -> "AsyncPayscribeClient":
+        """Open the underlying connection pool."""
+        if self._client is None:
+            pool_size = self.config.get("PAYSCRIBE_POOL_SIZE", 10)
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            )
+        return self
+
+    async def aclose(self) -> None:
+        """Close the underlying connection pool."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self) -> "AsyncPayscribeClient":
+        return await self.open()
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+
+    async def _make_request(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict] = None,
+        params: Optional[Dict] = None,
+        network: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Make HTTP request to Payscribe API behind its breaker and bulkhead."""
+        await self.open()
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        connect_timeout, read_timeout = get_timeout(endpoint, self.config)
+
+        try:
+            with guard_call(endpoint, network, self.config) as call:
+                response = await self._client.request(
+                    method=method,
+                    url=url,
+                    json=data,
+                    params=params,
+                    timeout=httpx.Timeout(read_timeout, connect=connect_timeout)
+                )
+                call.record_status(response.status_code)
+            return parse_response(response)
+        except PayscribeAPIException:
+            raise
+        except httpx.HTTPError as e:
+            raise PayscribeAPIException(f"Payscribe API request error: {str(e)}")
+        except Exception as e:
+            raise PayscribeAPIException(f"Unexpected error: {str(e)}")
+
+    # Customer Management
+    async def create_customer(
+        self,
+        first_name: str,
+        last_name: str,
+        email: str,
+        phone: str,
+        country: str = "NG"
+    ) -> Dict[str, Any]:
+        """Create a customer in Payscribe (Tier 0)."""
+        data = {
+            "first_name": first_name,
+            "last_name": last_name,
+            "email": email,
+            "phone": phone,
+            "country": country
+        }
+        return await self._make_request("POST", "customers/create", data=data)
+
+    # Virtual Account Management
+    async def create_virtual_account(
+        self,
+        customer_id: str,
+        account_type: str = "static",
+        currency: str = "NGN",
+        banks: List[str] = None
+    ) -> Dict[str, Any]:
+        """Create a permanent virtual account for a customer."""
+        if banks is None:
+            banks = ["9psb"]  # Default to 9PSB
+
+        data = {
+            "account_type": account_type,
+            "currency": currency,
+            "customer_id": customer_id,
+            "bank": banks
+        }
+        return await self._make_request("POST", "collections/virtual-accounts/create", data=data)
+
+    async def get_virtual_account(self, account_number: str) -> Dict[str, Any]:
+        """Get virtual account details."""
+        return await self._make_request("GET", f"collections/virtual-accounts/{account_number}")
+
+    async def list_collections(
+        self,
+        account_number: str,
+        start_date: str,
+        end_date: str,
+        page: int = 1,
+        page_size: int = 100
+    ) -> Dict[str, Any]:
+        """List payments received by a virtual account between two dates (YYYY-MM-DD)."""
+        params = {
+            "start_date": start_date,
+            "end_date": end_date,
+            "page": page,
+            "page_size": page_size
+        }
+        return await self._make_request("GET", f"collections/virtual-accounts/{account_number}/transactions", params=params)
+
+    async def verify_payment(
+        self,
+        account_number: str,
+        amount: float,
+        session_id: Optional[str] = None,
+        trans_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Verify payment to virtual account."""
+        data = {
+            "account_number": account_number,
+            "amount": amount
+        }
+        if session_id:
+            data["session_id"] = session_id
+        if trans_id:
+            data["trans_id"] = trans_id
+
+        return await self._make_request("POST", "collections/virtual-accounts/confirm-payment", data=data)
+
+    # Airtime
+    async def vend_airtime(
+        self,
+        network: str,
+        amount: float,
+        recipient: str,
+        ref: Optional[str] = None,
+        ported: bool = False
+    ) -> Dict[str, Any]:
+        """Vend airtime to a phone number."""
+        data = {
+            "network": network.lower(),
+            "amount": amount,
+            "recipient": recipient,
+            "ported": ported
+        }
+        if ref:
+            data["ref"] = ref
+
+        return await self._make_request("POST", "airtime", data=data, network=network)
+
+    # Data Bundle
+    async def lookup_data_plans(
+        self,
+        network: str,
+        category: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Lookup data plans for a network."""
+        params = {"network": network.lower()}
+        if category:
+            params["category"] = category
+
+        return await self._make_request("GET", "data/lookup", params=params, network=network)
+
+    async def vend_data(
+        self,
+        network: str,
+        plan: str,
+        recipient: str,
+        ref: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Vend data bundle to a phone number."""
+        data = {
+            "network": network.lower(),
+            "plan": plan,
+            "recipient": recipient
+        }
+        if ref:
+            data["ref"] = ref
+
+        return await self._make_request("POST", "data/vend", data=data, network=network)
+
+    # Transactions
+    async def requery_transaction(self, trans_id: Optional[str] = None, ref: Optional[str] = None) -> Dict[str, Any]:
+        """Get the current status of a bill payment by Payscribe trans_id or our ref.
+
+        An HTTP 404 is returned as a ``status: false`` body with ``status_code`` 404.
+        """
+        params = {"trans_id": trans_id} if trans_id else {"ref": ref}
+        try:
+            return await self._make_request("GET", "requery", params=params)
+        except PayscribeAPIException as e:
+            if e.upstream_status != 404:
+                raise
+            return not_found_answer(e)
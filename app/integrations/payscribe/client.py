@@ -3,6 +3,45 @@ import requests
 from typing import Dict, Any, Optional, List
 from flask import current_app
 from app.errors.exceptions import PayscribeAPIException
+from app.integrations.payscribe.transport import get_session, get_timeout, record_request
+from app.integrations.payscribe.resilience import guard_call
+
+
+def parse_response(response) -> Dict[str, Any]:
+    """Parse a Payscribe HTTP response and raise on API errors.
+
+    Accepts either a requests or an httpx response object.
+    """
+    # Try to parse JSON response
+    try:
+        response_data = response.json()
+    except ValueError:
+        # If response is not JSON, raise with text
+        raise PayscribeAPIException(f"Invalid JSON response: {response.text}")
+    
+    # Check if Payscribe returned an error in the response body
+    if not response_data.get("status") and response.status_code not in [200, 201]:
+        error_msg = response_data.get("description") or response_data.get("message") or "Unknown error"
+        raise PayscribeAPIException(f"Payscribe API error: {error_msg}", upstream_status=response.status_code)
+    
+    # For non-200 status codes, check if it's a pending transaction (201)
+    if response.status_code == 201:
+        # Transaction pending - this is acceptable for some endpoints
+        return response_data
+    
+    # Raise for other HTTP errors
+    if response.status_code >= 400:
+        error_msg = response_data.get("description") or response_data.get("message") or response.text
+        raise PayscribeAPIException(
+            f"Payscribe API error ({response.status_code}): {error_msg}", upstream_status=response.status_code
+        )
+    
+    return response_data
+
+
+def not_found_answer(error: PayscribeAPIException) -> Dict[str, Any]:
+    """Turn an HTTP 404 requery error into the ``status: false`` body reconciliation reads as not found."""
+    return {"status": False, "status_code": 404, "description": error.message}
 
 
 class PayscribeClient:
@@ -52,44 +91,36 @@ class PayscribeClient:
         method: str,
         endpoint: str,
         data: Optional[Dict] = None,
-        params: Optional[Dict] = None
+        params: Optional[Dict] = None,
+        network: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Make HTTP request to Payscribe API."""
+        """Make HTTP request to Payscribe API.
+        
+        The call runs behind the endpoint's circuit breaker and the
+        endpoint/network bulkhead; see app.integrations.payscribe.resilience.
+        """
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        config = current_app.config
+        session = get_session(pool_size=config.get("PAYSCRIBE_POOL_SIZE", 10))
         
         try:
-            response = requests.request(
-                method=method,
-                url=url,
-                headers=self.headers,
-                json=data,
-                params=params,
-                timeout=30
-            )
-            
-            # Try to parse JSON response
-            try:
-                response_data = response.json()
-            except ValueError:
-                # If response is not JSON, raise with text
-                raise PayscribeAPIException(f"Invalid JSON response: {response.text}")
+            with guard_call(endpoint, network, config) as call:
+                try:
+                    response = session.request(
+                        method=method,
+                        url=url,
+                        headers=self.headers,
+                        json=data,
+                        params=params,
+                        timeout=get_timeout(endpoint, config)
+                    )
+                except requests.exceptions.RequestException:
+                    record_request(failed=True)
+                    raise
+                record_request(failed=response.status_code >= 500)
+                call.record_status(response.status_code)
             
-            # Check if Payscribe returned an error in the response body
-            if not response_data.get("status") and response.status_code not in [200, 201]:
-                error_msg = response_data.get("description") or response_data.get("message") or "Unknown error"
-                raise PayscribeAPIException(f"Payscribe API error: {error_msg}")
-            
-            # For non-200 status codes, check if it's a pending transaction (201)
-            if response.status_code == 201:
-                # Transaction pending - this is acceptable for some endpoints
-                return response_data
-            
-            # Raise for other HTTP errors
-            if response.status_code >= 400:
-                error_msg = response_data.get("description") or response_data.get("message") or response.text
-                raise PayscribeAPIException(f"Payscribe API error ({response.status_code}): {error_msg}")
-            
-            return response_data
+            return parse_response(response)
         except PayscribeAPIException:
             raise
         except requests.exceptions.RequestException as e:
@@ -140,6 +171,23 @@ class PayscribeClient:
         """Get virtual account details."""
         return self._make_request("GET", f"collections/virtual-accounts/{account_number}")
     
+    def list_collections(
+        self,
+        account_number: str,
+        start_date: str,
+        end_date: str,
+        page: int = 1,
+        page_size: int = 100
+    ) -> Dict[str, Any]:
+        """List payments received by a virtual account between two dates (YYYY-MM-DD)."""
+        params = {
+            "start_date": start_date,
+            "end_date": end_date,
+            "page": page,
+            "page_size": page_size
+        }
+        return self._make_request("GET", f"collections/virtual-accounts/{account_number}/transactions", params=params)
+    
     def verify_payment(
         self,
         account_number: str,
@@ -178,7 +226,7 @@ class PayscribeClient:
         if ref:
             data["ref"] = ref
         
-        return self._make_request("POST", "airtime", data=data)
+        return self._make_request("POST", "airtime", data=data, network=network)
     
     # Data Bundle
     def lookup_data_plans(
@@ -191,7 +239,7 @@ class PayscribeClient:
         if category:
             params["category"] = category
         
-        return self._make_request("GET", "data/lookup", params=params)
+        return self._make_request("GET", "data/lookup", params=params, network=network)
     
     def vend_data(
         self,
@@ -209,5 +257,18 @@ class PayscribeClient:
         if ref:
             data["ref"] = ref
         
-        return self._make_request("POST", "data/vend", data=data)
+        return self._make_request("POST", "data/vend", data=data, network=network)
+    
+    # Transactions
+    def requery_transaction(self, trans_id: Optional[str] = None, ref: Optional[str] = None) -> Dict[str, Any]:
+        """Get the current status of a bill payment by Payscribe trans_id or our ref.
 
+        An HTTP 404 is returned as a ``status: false`` body with ``status_code`` 404.
+        """
+        params = {"trans_id": trans_id} if trans_id else {"ref": ref}
+        try:
+            return self._make_request("GET", "requery", params=params)
+        except PayscribeAPIException as e:
+            if e.upstream_status != 404:
+                raise
+            return not_found_answer(e)
@@ -0,0 +1,255 @@
+"""Circuit breakers and bulkheads for Payscribe calls.
+
+Breakers are kept per endpoint group (airtime, data/vend, data/lookup,
+customers, collections/virtual-accounts) and bulkheads per endpoint group and
+network, so a degraded route fails fast without tying up every worker. State
+is per worker process.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+from app.errors.exceptions import PayscribeUnavailableException
+from app.integrations.payscribe.transport import resolve_endpoint_key
+from app.utils.metrics import register_metrics_provider
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Count-based sliding window circuit breaker."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        slow_call_rate_threshold: float = 0.8,
+        slow_call_seconds: float = 10.0,
+        window_size: int = 20,
+        minimum_calls: int = 10,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 1
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.minimum_calls = minimum_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self.rejected = 0
+        self._calls = deque(maxlen=window_size)  # (failed, slow)
+        self._half_open_in_flight = 0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """Check whether a call may proceed, moving to half-open when due."""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.open_seconds:
+                    self.rejected += 1
+                    return False
+                self.state = HALF_OPEN
+                self._half_open_in_flight = 0
+            if self.state == HALF_OPEN:
+                if self._half_open_in_flight >= self.half_open_max_calls:
+                    self.rejected += 1
+                    return False
+                self._half_open_in_flight += 1
+            return True
+
+    def record(self, failed: bool, duration: float) -> None:
+        """Record the outcome of a call that was allowed through."""
+        slow = duration >= self.slow_call_seconds
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._half_open_in_flight = max(self._half_open_in_flight - 1, 0)
+                if failed or slow:
+                    self._open()
+                else:
+                    self.state = CLOSED
+                    self._calls.clear()
+                return
+
+            self._calls.append((failed, slow))
+            if self.state == CLOSED and len(self._calls) >= self.minimum_calls:
+                failure_rate, slow_rate = self._rates()
+                if failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_call_rate_threshold:
+                    self._open()
+
+    def cancel(self) -> None:
+        """Release an allowed call that never reached Payscribe."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._half_open_in_flight = max(self._half_open_in_flight - 1, 0)
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        self._calls.clear()
+
+    def _rates(self):
+        total = len(self._calls)
+        if not total:
+            return 0.0, 0.0
+        failures = sum(1 for failed, _ in self._calls if failed)
+        slow = sum(1 for _, is_slow in self._calls if is_slow)
+        return failures / total, slow / total
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get breaker state for metrics."""
+        with self._lock:
+            failure_rate, slow_rate = self._rates()
+            return {
+                "state": self.state,
+                "failure_rate": round(failure_rate, 3),
+                "slow_call_rate": round(slow_rate, 3),
+                "window_calls": len(self._calls),
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
+
+
+class Bulkhead:
+    """Concurrency cap for one endpoint/network route."""
+
+    def __init__(self, name: str, max_concurrent: int, max_wait_seconds: float = 0.0):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_wait_seconds = max_wait_seconds
+        self.in_flight = 0
+        self.rejected = 0
+        self._semaphore = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        """Take a slot, waiting at most max_wait_seconds."""
+        if self.max_wait_seconds > 0:
+            acquired = self._semaphore.acquire(timeout=self.max_wait_seconds)
+        else:
+            acquired = self._semaphore.acquire(blocking=False)
+        with self._lock:
+            if acquired:
+                self.in_flight += 1
+            else:
+                self.rejected += 1
+        return acquired
+
+    def release(self) -> None:
+        """Return a slot."""
+        with self._lock:
+            self.in_flight -= 1
+        self._semaphore.release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get bulkhead usage for metrics."""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+        }
+
+
+class CallOutcome:
+    """Outcome of a guarded call, filled in by the caller."""
+
+    def __init__(self):
+        self.status_code: Optional[int] = None
+
+    def record_status(self, status_code: int) -> None:
+        self.status_code = status_code
+
+    @property
+    def failed(self) -> bool:
+        return self.status_code is None or self.status_code >= 500
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_bulkheads: Dict[str, Bulkhead] = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(endpoint_key: str, config: Dict[str, Any]) -> CircuitBreaker:
+    """Get the circuit breaker for an endpoint group."""
+    breaker = _breakers.get(endpoint_key)
+    if breaker is None:
+        with _registry_lock:
+            breaker = _breakers.get(endpoint_key)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    name=endpoint_key,
+                    failure_rate_threshold=config.get("PAYSCRIBE_BREAKER_FAILURE_RATE", 0.5),
+                    slow_call_rate_threshold=config.get("PAYSCRIBE_BREAKER_SLOW_CALL_RATE", 0.8),
+                    slow_call_seconds=config.get("PAYSCRIBE_BREAKER_SLOW_CALL_SECONDS", 10.0),
+                    window_size=config.get("PAYSCRIBE_BREAKER_WINDOW_SIZE", 20),
+                    minimum_calls=config.get("PAYSCRIBE_BREAKER_MINIMUM_CALLS", 10),
+                    open_seconds=config.get("PAYSCRIBE_BREAKER_OPEN_SECONDS", 30.0),
+                )
+                _breakers[endpoint_key] = breaker
+    return breaker
+
+
+def get_bulkhead(endpoint_key: str, network: Optional[str], config: Dict[str, Any]) -> Bulkhead:
+    """Get the bulkhead for an endpoint group and network."""
+    name = f"{endpoint_key}:{network.lower()}" if network else endpoint_key
+    bulkhead = _bulkheads.get(name)
+    if bulkhead is None:
+        with _registry_lock:
+            bulkhead = _bulkheads.get(name)
+            if bulkhead is None:
+                limits = config.get("PAYSCRIBE_BULKHEAD_LIMITS", {})
+                bulkhead = Bulkhead(
+                    name=name,
+                    max_concurrent=limits.get(endpoint_key, config.get("PAYSCRIBE_BULKHEAD_DEFAULT_LIMIT", 10)),
+                    max_wait_seconds=config.get("PAYSCRIBE_BULKHEAD_MAX_WAIT_SECONDS", 0.0),
+                )
+                _bulkheads[name] = bulkhead
+    return bulkhead
+
+
+@contextmanager
+def guard_call(endpoint: str, network: Optional[str], config: Dict[str, Any]) -> Iterator[CallOutcome]:
+    """Run a Payscribe call behind its circuit breaker and bulkhead.
+
+    Raises PayscribeUnavailableException without calling out when the breaker
+    is open or the bulkhead is full. Exceptions raised inside the block and
+    5xx status codes count as failures.
+    """
+    endpoint_key = resolve_endpoint_key(endpoint)
+    breaker = get_breaker(endpoint_key, config)
+    if not breaker.allow_request():
+        raise PayscribeUnavailableException(f"Payscribe {endpoint_key} is temporarily unavailable")
+
+    bulkhead = get_bulkhead(endpoint_key, network, config)
+    if not bulkhead.acquire():
+        breaker.cancel()
+        raise PayscribeUnavailableException(f"Too many concurrent Payscribe {bulkhead.name} requests")
+
+    outcome = CallOutcome()
+    started = time.monotonic()
+    try:
+        yield outcome
+    except Exception:
+        outcome.status_code = None
+        raise
+    finally:
+        bulkhead.release()
+        breaker.record(failed=outcome.failed, duration=time.monotonic() - started)
+
+
+def get_resilience_stats() -> Dict[str, Any]:
+    """Get breaker states and bulkhead rejections for this process."""
+    return {
+        "breakers": {name: breaker.snapshot() for name, breaker in list(_breakers.items())},
+        "bulkheads": {name: bulkhead.snapshot() for name, bulkhead in list(_bulkheads.items())},
+    }
+
+
+register_metrics_provider("payscribe_resilience", get_resilience_stats)
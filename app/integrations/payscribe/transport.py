@@ -0,0 +1,115 @@
+"""Pooled keep-alive HTTP transport for Payscribe API calls."""
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from app.utils.metrics import register_metrics_provider
+
+# Known Payscribe endpoint groups, most specific first
+ENDPOINT_KEYS = [
+    "data/vend",
+    "data/lookup",
+    "airtime",
+    "customers",
+    "collections/virtual-accounts",
+    "requery",
+]
+
+_session: Optional[requests.Session] = None
+_session_pid: Optional[int] = None
+_pool_size: Optional[int] = None
+_lock = threading.Lock()
+_stats = {"requests": 0, "errors": 0}
+
+
+def resolve_endpoint_key(endpoint: str) -> str:
+    """Map a request path to its endpoint group (e.g. 'data/vend')."""
+    path = endpoint.lstrip("/")
+    for key in ENDPOINT_KEYS:
+        if path == key or path.startswith(f"{key}/"):
+            return key
+    return path.split("/", 1)[0]
+
+
+def get_session(pool_size: int = 10) -> requests.Session:
+    """Get the process-wide pooled session, creating it on first use.
+
+    The session is rebuilt after a fork so gunicorn workers never share
+    sockets with the master process.
+    """
+    global _session, _session_pid, _pool_size
+    pid = os.getpid()
+    if _session is not None and _session_pid == pid:
+        return _session
+
+    with _lock:
+        if _session is None or _session_pid != pid:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+            _session_pid = pid
+            _pool_size = pool_size
+    return _session
+
+
+def close_session() -> None:
+    """Close the pooled session and drop all kept-alive connections."""
+    global _session, _session_pid
+    with _lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        _session_pid = None
+
+
+def get_timeout(endpoint: str, config: Dict[str, Any]) -> Tuple[float, float]:
+    """Get the (connect, read) timeout for an endpoint from app config."""
+    connect_timeout = config.get("PAYSCRIBE_CONNECT_TIMEOUT", 5.0)
+    read_timeouts = config.get("PAYSCRIBE_READ_TIMEOUTS", {})
+    read_timeout = read_timeouts.get(
+        resolve_endpoint_key(endpoint),
+        config.get("PAYSCRIBE_READ_TIMEOUT", 30.0)
+    )
+    return connect_timeout, read_timeout
+
+
+def record_request(failed: bool = False) -> None:
+    """Count a request made through the transport."""
+    with _lock:
+        _stats["requests"] += 1
+        if failed:
+            _stats["errors"] += 1
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Get connection pool usage for the current process."""
+    stats = {
+        "pid": os.getpid(),
+        "pool_size": _pool_size,
+        "requests": _stats["requests"],
+        "errors": _stats["errors"],
+        "hosts": {},
+    }
+    session = _session if _session_pid == os.getpid() else None
+    if session is None:
+        return stats
+
+    adapter = session.get_adapter("https://")
+    pools = adapter.poolmanager.pools
+    for key in pools.keys():
+        pool = pools.get(key)
+        if pool is None:
+            continue
+        stats["hosts"][f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+            "connections_opened": pool.num_connections,
+            "requests": pool.num_requests,
+            "in_use": (pool.pool.maxsize - pool.pool.qsize()) if pool.pool else 0,
+            "max_size": pool.pool.maxsize if pool.pool else 0,
+        }
+    return stats
+
+
+register_metrics_provider("payscribe_pool", get_pool_stats)
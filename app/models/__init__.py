@@ -2,14 +2,35 @@
 from app.models.user import User
 from app.models.wallet import Wallet
 from app.models.transaction import Transaction
+from app.models.archived_transaction import ArchivedTransaction
 from app.models.beneficiary import Beneficiary
 from app.models.webhook_log import WebhookLog
+from app.models.webhook_dedup_key import WebhookDedupKey
+from app.models.data_plan import DataPlan
+from app.models.vend_job import VendJob
+from app.models.idempotency_key import IdempotencyKey
+from app.models.purchase_batch import PurchaseBatch
+from app.models.daily_spend_rollup import DailySpendRollup
+from app.models.funding_credit import FundingCredit
+from app.models.rows import TransactionRow, BatchLineRow, BeneficiaryRow, UserRow
 
 __all__ = [
     "User",
     "Wallet",
     "Transaction",
+    "ArchivedTransaction",
     "Beneficiary",
     "WebhookLog",
+    "WebhookDedupKey",
+    "DataPlan",
+    "VendJob",
+    "IdempotencyKey",
+    "PurchaseBatch",
+    "DailySpendRollup",
+    "FundingCredit",
+    "TransactionRow",
+    "BatchLineRow",
+    "BeneficiaryRow",
+    "UserRow",
 ]
 
@@ -0,0 +1,44 @@
+"""Archived transaction model."""
+from app.extensions import db
+from app.models.transaction import Transaction
+
+
+class ArchivedTransaction(db.Model):
+    """A finalized transaction moved out of the hot transactions table.
+
+    Same columns as Transaction. Rows are only written by
+    TransactionArchiveService and read back when a lookup or history page
+    misses the hot table, so the table carries just the indexes those reads
+    need.
+    """
+    __tablename__ = "transactions_archive"
+
+    id = db.Column(db.String(36), primary_key=True)
+    user_id = db.Column(db.String(36), db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    type = db.Column(db.String(20), nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    amount = db.Column(db.Numeric(10, 2), nullable=False)
+    reference = db.Column(db.String(100), nullable=False)
+    payscribe_transaction_id = db.Column(db.String(255), nullable=True)
+    payscribe_reference = db.Column(db.String(255), nullable=True)
+    batch_id = db.Column(db.String(36), db.ForeignKey("purchase_batches.id", ondelete="SET NULL"), nullable=True, index=True)
+    details = db.Column(db.JSON, nullable=True)
+    network = db.Column(db.String(20), nullable=True)
+    recipient_phone = db.Column(db.String(20), nullable=True)
+    description = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        # History pages that reach past the hot table, in the API's sort order
+        db.Index("ix_transactions_archive_user_id_created_at", "user_id", created_at.desc(), id.desc()),
+        # Late status webhooks and requeries for archived purchases
+        db.Index("ix_transactions_archive_reference", "reference"),
+        db.Index("ix_transactions_archive_payscribe_transaction_id", "payscribe_transaction_id"),
+    )
+
+    # Serialized exactly like a live transaction
+    to_dict = Transaction.to_dict
+
+    def __repr__(self):
+        return f"<ArchivedTransaction {self.reference} - {self.type} - {self.status}>"
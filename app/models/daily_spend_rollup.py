@@ -0,0 +1,25 @@
+"""Daily spend rollup model."""
+from datetime import datetime
+from app.extensions import db
+
+
+class DailySpendRollup(db.Model):
+    """Per-user daily totals by transaction type and network.
+
+    Kept in step with transactions by SpendRollupService in the same commit
+    as each purchase, refund and credit, so spending summaries read a few
+    dozen rows instead of aggregating a user's whole history. Days are UTC
+    dates of the transactions' created_at.
+    """
+    __tablename__ = "daily_spend_rollups"
+    
+    user_id = db.Column(db.String(36), db.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    type = db.Column(db.String(20), primary_key=True)  # airtime, data, credit
+    network = db.Column(db.String(20), primary_key=True, default="")  # "" for credits
+    amount = db.Column(db.Numeric(14, 2), default=0, nullable=False)
+    count = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<DailySpendRollup {self.user_id} {self.day} {self.type} {self.network}>"
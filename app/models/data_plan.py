@@ -0,0 +1,63 @@
+"""Data plan model."""
+from datetime import datetime
+from decimal import Decimal
+from app.extensions import db
+
+
+class DataPlan(db.Model):
+    """Data plan catalog synced from Payscribe."""
+    __tablename__ = "data_plans"
+
+    id = db.Column(db.String(36), primary_key=True)
+    network = db.Column(db.String(20), nullable=False)  # mtn, glo, airtel, 9mobile
+    plan_code = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(255), nullable=False)
+    category = db.Column(db.String(100), nullable=True)
+
+    # Parsed once at sync time from the plan name
+    size = db.Column(db.String(20), nullable=False, default="")
+    duration = db.Column(db.String(50), nullable=False, default="30 Days")
+    price = db.Column(db.Numeric(10, 2), nullable=False)
+
+    is_active = db.Column(db.Boolean, default=True, nullable=False)
+    synced_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    # Unique constraint doubles as the (network, plan_code) lookup index
+    __table_args__ = (db.UniqueConstraint("network", "plan_code", name="unique_network_plan_code"),)
+
+    def __init__(
+        self,
+        network: str,
+        plan_code: str,
+        name: str,
+        price: Decimal,
+        size: str = "",
+        duration: str = "30 Days",
+        category: str = None
+    ):
+        """Initialize data plan."""
+        from app.utils.helpers import generate_uuid
+        self.id = generate_uuid()
+        self.network = network.lower()
+        self.plan_code = plan_code
+        self.name = name
+        self.price = price
+        self.size = size
+        self.duration = duration
+        self.category = category
+        self.is_active = True
+
+    def to_dict(self) -> dict:
+        """Convert data plan to the /data/plans response format."""
+        return {
+            "id": self.plan_code,
+            "size": self.size,
+            "duration": self.duration,
+            "price": float(self.price),
+            "validity": self.duration
+        }
+
+    def __repr__(self):
+        return f"<DataPlan {self.network} - {self.plan_code}>"
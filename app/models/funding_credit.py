@@ -0,0 +1,22 @@
+"""Funding credit model."""
+from datetime import datetime
+from app.extensions import db
+
+
+class FundingCredit(db.Model):
+    """A Payscribe collection that has been credited to a wallet.
+
+    The primary key makes crediting a collection at most once an
+    INSERT ... ON CONFLICT DO NOTHING, which a unique index on the
+    partitioned transactions table cannot do (it would have to include
+    created_at).
+    """
+    __tablename__ = "funding_credits"
+    
+    payscribe_transaction_id = db.Column(db.String(255), primary_key=True)
+    transaction_id = db.Column(db.String(36), nullable=False)
+    user_id = db.Column(db.String(36), db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<FundingCredit {self.payscribe_transaction_id}>"
@@ -0,0 +1,27 @@
+"""Idempotency key model."""
+from datetime import datetime
+from app.extensions import db
+
+
+class IdempotencyKey(db.Model):
+    """Client-supplied Idempotency-Key with the stored response of its request."""
+    __tablename__ = "idempotency_keys"
+    
+    id = db.Column(db.String(36), primary_key=True)
+    user_id = db.Column(db.String(36), db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    fingerprint = db.Column(db.String(64), nullable=False)  # sha256 of method, path and body
+    status = db.Column(db.String(20), default="in_progress", nullable=False)  # in_progress, completed
+    response_code = db.Column(db.Integer, nullable=True)
+    response_body = db.Column(db.JSON, nullable=True)
+    # Reference of the purchase or batch its request debited, set in the debit's commit
+    transaction_reference = db.Column(db.String(100), nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    # Unique constraint: a key is scoped to the user that sent it
+    __table_args__ = (db.UniqueConstraint("user_id", "key", name="unique_user_idempotency_key"),)
+    
+    def __repr__(self):
+        return f"<IdempotencyKey {self.user_id} - {self.key}>"
@@ -0,0 +1,45 @@
+"""Purchase batch model."""
+from datetime import datetime
+from decimal import Decimal
+from app.extensions import db
+
+
+class PurchaseBatch(db.Model):
+    """Bulk airtime/data purchase; each line is a Transaction with this batch_id.
+
+    Line statuses live on the transactions, so progress is counted with a
+    GROUP BY status over the batch's lines (in transactions and
+    transactions_archive) and never goes out of sync with vend workers
+    finishing lines in async mode.
+    """
+    __tablename__ = "purchase_batches"
+    
+    id = db.Column(db.String(36), primary_key=True)
+    user_id = db.Column(db.String(36), db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    reference = db.Column(db.String(100), unique=True, nullable=False)
+    total_amount = db.Column(db.Numeric(12, 2), nullable=False)
+    item_count = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __init__(self, user_id: str, reference: str, total_amount: Decimal, item_count: int):
+        """Initialize purchase batch."""
+        from app.utils.helpers import generate_uuid
+        self.id = generate_uuid()
+        self.user_id = user_id
+        self.reference = reference
+        self.total_amount = total_amount
+        self.item_count = item_count
+        self.created_at = datetime.utcnow()
+    
+    def to_dict(self) -> dict:
+        """Convert purchase batch to dictionary."""
+        return {
+            "id": self.id,
+            "reference": self.reference,
+            "total_amount": float(self.total_amount),
+            "item_count": self.item_count,
+            "created_at": self.created_at.isoformat()
+        }
+    
+    def __repr__(self):
+        return f"<PurchaseBatch {self.reference} - {self.item_count} items>"
@@ -0,0 +1,171 @@
+"""Read-only row types for list and profile endpoints.
+
+Each type is a NamedTuple over exactly the columns its endpoint returns.
+``select_from`` builds the Core select and result rows are wrapped with
+``_make``, so reads skip the ORM identity map, change tracking and
+per-instance ``__dict__``. ``to_dict`` returns the same payload as the
+model's to_dict().
+"""
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, NamedTuple, Optional
+from sqlalchemy import Select, select
+from app.models.user import User
+from app.models.wallet import Wallet
+from app.models.beneficiary import Beneficiary
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+class TransactionRow(NamedTuple):
+    """A transaction as listed by GET /transactions."""
+    id: str
+    type: str
+    status: str
+    amount: Decimal
+    reference: str
+    payscribe_transaction_id: Optional[str]
+    payscribe_reference: Optional[str]
+    details: Optional[dict]
+    description: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+
+    @classmethod
+    def select_from(cls, model) -> Select:
+        """Select these columns from Transaction or ArchivedTransaction."""
+        return select(*[getattr(model, name) for name in cls._fields])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "type": self.type,
+            "status": self.status,
+            "amount": float(self.amount),
+            "reference": self.reference,
+            "payscribe_transaction_id": self.payscribe_transaction_id,
+            "payscribe_reference": self.payscribe_reference,
+            "details": self.details,
+            "description": self.description,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat()
+        }
+
+
+class BatchLineRow(NamedTuple):
+    """A bulk purchase line as listed by GET /bulk/<batch_id>."""
+    id: str
+    reference: str
+    type: str
+    network: Optional[str]
+    recipient_phone: Optional[str]
+    amount: Decimal
+    status: str
+
+    @classmethod
+    def select_from(cls, model) -> Select:
+        """Select these columns from Transaction or ArchivedTransaction."""
+        return select(*[getattr(model, name) for name in cls._fields])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "transaction_id": self.id,
+            "reference": self.reference,
+            "type": self.type,
+            "network": self.network,
+            "phone": self.recipient_phone,
+            "amount": float(self.amount),
+            "status": self.status,
+            "error": None
+        }
+
+
+class BeneficiaryRow(NamedTuple):
+    """A beneficiary as listed by GET /beneficiaries."""
+    id: str
+    phone: str
+    network: str
+    name: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+
+    @classmethod
+    def select_from(cls, model=Beneficiary) -> Select:
+        return select(*[getattr(model, name) for name in cls._fields])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "phone": self.phone,
+            "network": self.network,
+            "name": self.name,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat()
+        }
+
+
+class UserRow(NamedTuple):
+    """A user and their wallet as returned by GET /auth/me, read with one outer join."""
+    id: str
+    email: str
+    phone: str
+    first_name: str
+    last_name: str
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime
+    wallet_id: Optional[str]
+    wallet_balance: Optional[Decimal]
+    wallet_account_number: Optional[str]
+    wallet_bank_name: Optional[str]
+    wallet_bank_code: Optional[str]
+    wallet_virtual_account_status: Optional[str]
+    wallet_created_at: Optional[datetime]
+    wallet_updated_at: Optional[datetime]
+
+    @classmethod
+    def select_from(cls, model=User) -> Select:
+        return select(
+            model.id,
+            model.email,
+            model.phone,
+            model.first_name,
+            model.last_name,
+            model.is_active,
+            model.created_at,
+            model.updated_at,
+            Wallet.id,
+            Wallet.balance,
+            Wallet.payscribe_account_number,
+            Wallet.payscribe_bank_name,
+            Wallet.payscribe_bank_code,
+            Wallet.virtual_account_status,
+            Wallet.created_at,
+            Wallet.updated_at
+        ).outerjoin(Wallet, Wallet.user_id == model.id)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "id": self.id,
+            "email": self.email,
+            "phone": self.phone,
+            "first_name": self.first_name,
+            "last_name": self.last_name,
+            "is_active": self.is_active,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat()
+        }
+        if self.wallet_id is not None:
+            data["wallet"] = {
+                "id": self.wallet_id,
+                "balance": float(self.wallet_balance),
+                "account_number": self.wallet_account_number,
+                "bank_name": self.wallet_bank_name,
+                "bank_code": self.wallet_bank_code,
+                "virtual_account_status": self.wallet_virtual_account_status,
+                "created_at": _isoformat(self.wallet_created_at),
+                "updated_at": _isoformat(self.wallet_updated_at)
+            }
+        return data
@@ -10,27 +10,63 @@ class Transaction(db.Model):
     __tablename__ = "transactions"
     
     id = db.Column(db.String(36), primary_key=True)
-    user_id = db.Column(db.String(36), db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = db.Column(db.String(36), db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)  # indexed by the history indexes below
     type = db.Column(db.String(20), nullable=False, index=True)  # airtime, data, credit
     status = db.Column(db.String(20), default="pending", nullable=False, index=True)
     amount = db.Column(db.Numeric(10, 2), nullable=False)
-    reference = db.Column(db.String(100), unique=True, nullable=False, index=True)
+    # Not unique in the database: a partitioned table's unique indexes must include created_at.
+    # References are random (generate_ref) and looked up with TransactionService.find_transaction
+    reference = db.Column(db.String(100), nullable=False, index=True)
     
     # Payscribe transaction details
     payscribe_transaction_id = db.Column(db.String(255), nullable=True, index=True)
     payscribe_reference = db.Column(db.String(255), nullable=True)
     
+    # Bulk purchase this line belongs to, if any
+    batch_id = db.Column(db.String(36), db.ForeignKey("purchase_batches.id", ondelete="SET NULL"), nullable=True, index=True)
+    
     # Transaction-specific details (JSON)
     details = db.Column(db.JSON, nullable=True)
     
+    # Searchable copies of details["network"] / details["phone"] for airtime and data
+    network = db.Column(db.String(20), nullable=True)
+    recipient_phone = db.Column(db.String(20), nullable=True)
+    
     # Metadata
     description = db.Column(db.Text, nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    # Part of the table's primary key: PostgreSQL requires the partition key in it
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, primary_key=True, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
     # Relationships
     user = db.relationship("User", back_populates="transactions")
     
+    __table_args__ = (
+        # Transaction history pages: keyset scans in exactly the API's sort order
+        db.Index("ix_transactions_user_id_created_at", "user_id", created_at.desc(), id.desc()),
+        db.Index("ix_transactions_user_id_type_created_at", "user_id", "type", created_at.desc(), id.desc()),
+        db.Index("ix_transactions_user_id_network_created_at", "user_id", "network", created_at.desc(), id.desc()),
+        # Phone lookups (exact or prefix) across all users, e.g. by support staff
+        db.Index(
+            "ix_transactions_recipient_phone_created_at",
+            "recipient_phone",
+            created_at.desc(),
+            postgresql_ops={"recipient_phone": "varchar_pattern_ops"}
+        ),
+        # Reconciliation scans open purchases oldest first; partial so it stays small
+        db.Index(
+            "ix_transactions_status_created_at",
+            "status",
+            "created_at",
+            postgresql_where=db.text("status IN ('pending', 'processing')")
+        ),
+        # Monthly partitions are managed by app.utils.partitions (flask transactions partitions).
+        # Collections are credited once through funding_credits (FundingCredit) instead of a unique index here
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+    # Rows are still identified by id alone, so session.get(Transaction, id) works
+    __mapper_args__ = {"primary_key": [id]}
+    
     def __init__(
         self,
         user_id: str,
@@ -39,7 +75,8 @@ class Transaction(db.Model):
         reference: str,
         details: dict = None,
         description: str = None,
-        status: str = "pending"
+        status: str = "pending",
+        batch_id: str = None
     ):
         """Initialize transaction."""
         from app.utils.helpers import generate_uuid
@@ -55,7 +92,10 @@ class Transaction(db.Model):
         self.reference = reference
         self.status = status
         self.details = details or {}
+        self.network = self.details.get("network")
+        self.recipient_phone = self.details.get("phone")
         self.description = description
+        self.batch_id = batch_id
     
     def update_status(self, status: str):
         """Update transaction status."""
@@ -0,0 +1,60 @@
+"""Vend job model."""
+from datetime import datetime
+from app.extensions import db
+from app.utils.constants import VEND_JOB_STATUSES
+
+
+class VendJob(db.Model):
+    """Queued Payscribe vend for an async-mode purchase.
+
+    Rows are claimed by vend workers with SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+    __tablename__ = "vend_jobs"
+    
+    id = db.Column(db.String(36), primary_key=True)
+    # No foreign key: transactions is partitioned and its primary key is (id, created_at)
+    transaction_id = db.Column(db.String(36), unique=True, nullable=False)
+    payload = db.Column(db.JSON, nullable=False)  # kind, network, recipient, amount/plan, beneficiary
+    status = db.Column(db.String(20), default="queued", nullable=False)  # queued, processing, done, failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    # Workers scan queued jobs that are due
+    __table_args__ = (db.Index("ix_vend_jobs_status_run_after", "status", "run_after"),)
+    
+    def __init__(self, transaction_id: str, payload: dict):
+        """Initialize vend job."""
+        from app.utils.helpers import generate_uuid
+        self.id = generate_uuid()
+        self.transaction_id = transaction_id
+        self.payload = payload
+        self.status = "queued"
+        self.attempts = 0
+        self.run_after = datetime.utcnow()
+    
+    def update_status(self, status: str, error: str = None):
+        """Update job status."""
+        if status not in VEND_JOB_STATUSES:
+            raise ValueError(f"Invalid vend job status: {status}")
+        self.status = status
+        if error:
+            self.last_error = error
+    
+    def to_dict(self) -> dict:
+        """Convert vend job to dictionary."""
+        return {
+            "id": self.id,
+            "transaction_id": self.transaction_id,
+            "status": self.status,
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat()
+        }
+    
+    def __repr__(self):
+        return f"<VendJob {self.transaction_id} - {self.status}>"
@@ -0,0 +1,20 @@
+"""Webhook dedup key model."""
+from datetime import datetime
+from app.extensions import db
+
+
+class WebhookDedupKey(db.Model):
+    """Dedup key of a received webhook.
+
+    Lives outside the partitioned webhook_logs table because a unique index
+    there would have to include created_at, and a redelivery arrives with a
+    different created_at.
+    """
+    __tablename__ = "webhook_dedup_keys"
+    
+    dedup_key = db.Column(db.String(255), primary_key=True)  # see webhook_dedup_key()
+    webhook_log_id = db.Column(db.String(36), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"<WebhookDedupKey {self.dedup_key}>"
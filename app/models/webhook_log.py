@@ -10,18 +10,35 @@ class WebhookLog(db.Model):
     id = db.Column(db.String(36), primary_key=True)
     event_type = db.Column(db.String(100), nullable=False, index=True)
     payload = db.Column(db.JSON, nullable=False)
-    status = db.Column(db.String(20), default="pending", nullable=False, index=True)  # pending, processed, failed
+    dedup_key = db.Column(db.String(255), nullable=True)  # event type + Payscribe identifiers; see WebhookDedupKey
+    status = db.Column(db.String(20), default="pending", nullable=False, index=True)  # pending, processing, processed, failed, dead
     error_message = db.Column(db.Text, nullable=True)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    locked_at = db.Column(db.DateTime, nullable=True)
     processed_at = db.Column(db.DateTime, nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    # Part of the table's primary key: PostgreSQL requires the partition key in it
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, primary_key=True, index=True)
     
-    def __init__(self, event_type: str, payload: dict):
+    __table_args__ = (
+        # Webhook workers scan pending rows that are due
+        db.Index("ix_webhook_logs_status_next_attempt_at", "status", "next_attempt_at"),
+        # Monthly partitions are managed by app.utils.partitions (flask webhooks partitions)
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+    # Rows are still identified by id alone, so session.get(WebhookLog, id) works
+    __mapper_args__ = {"primary_key": [id]}
+    
+    def __init__(self, event_type: str, payload: dict, dedup_key: str = None):
         """Initialize webhook log."""
         from app.utils.helpers import generate_uuid
         self.id = generate_uuid()
         self.event_type = event_type
         self.payload = payload
+        self.dedup_key = dedup_key
         self.status = "pending"
+        self.attempts = 0
+        self.next_attempt_at = datetime.utcnow()
     
     def mark_processed(self):
         """Mark webhook as processed."""
@@ -34,6 +51,18 @@ class WebhookLog(db.Model):
         self.error_message = error_message
         self.processed_at = datetime.utcnow()
     
+    def schedule_retry(self, next_attempt_at: datetime):
+        """Put a failed webhook back in the queue."""
+        self.status = "pending"
+        self.next_attempt_at = next_attempt_at
+        self.locked_at = None
+    
+    def mark_dead(self):
+        """Dead-letter a webhook that exhausted its retries."""
+        self.status = "dead"
+        self.locked_at = None
+        self.processed_at = datetime.utcnow()
+    
     def to_dict(self) -> dict:
         """Convert webhook log to dictionary."""
         return {
@@ -41,6 +70,7 @@ class WebhookLog(db.Model):
             "event_type": self.event_type,
             "status": self.status,
             "error_message": self.error_message,
+            "attempts": self.attempts,
             "created_at": self.created_at.isoformat(),
             "processed_at": self.processed_at.isoformat() if self.processed_at else None
         }
@@ -4,7 +4,17 @@ from app.services.wallet_service import WalletService
 from app.services.airtime_service import AirtimeService
 from app.services.data_service import DataService
 from app.services.transaction_service import TransactionService
+from app.services.transaction_archive_service import TransactionArchiveService
+from app.services.spend_rollup_service import SpendRollupService
 from app.services.beneficiary_service import BeneficiaryService
+from app.services.purchase_service import PurchaseService
+from app.services.vend_queue_service import VendQueueService
+from app.services.bulk_purchase_service import BulkPurchaseService
+from app.services.reconciliation_service import ReconciliationService
+from app.services.funding_reconciliation_service import FundingReconciliationService
+from app.services.webhook_queue_service import WebhookQueueService
+from app.services.webhook_replay_service import WebhookReplayService
+from app.services.webhook_archive_service import WebhookArchiveService
 
 __all__ = [
     "AuthService",
@@ -12,6 +22,16 @@ __all__ = [
     "AirtimeService",
     "DataService",
     "TransactionService",
+    "TransactionArchiveService",
+    "SpendRollupService",
     "BeneficiaryService",
+    "PurchaseService",
+    "VendQueueService",
+    "BulkPurchaseService",
+    "ReconciliationService",
+    "FundingReconciliationService",
+    "WebhookQueueService",
+    "WebhookReplayService",
+    "WebhookArchiveService",
 ]
 
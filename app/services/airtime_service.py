@@ -2,13 +2,11 @@
 from typing import Dict, Any
 from decimal import Decimal
 from flask import current_app
-from app.extensions import db
-from app.models import Transaction, Beneficiary
 from app.integrations import PayscribeClient
-from app.services.wallet_service import WalletService
+from app.services.purchase_service import PurchaseService
 from app.utils.helpers import generate_ref, format_phone_number, detect_network
 from app.utils.constants import NETWORKS
-from app.errors.exceptions import ValidationException, InsufficientBalanceException, PayscribeAPIException
+from app.errors.exceptions import ValidationException, PayscribeAPIException
 
 
 class AirtimeService:
@@ -16,7 +14,7 @@ class AirtimeService:
     
     def __init__(self):
         self.payscribe_client = PayscribeClient()
-        self.wallet_service = WalletService()
+        self.purchase_service = PurchaseService()
     
     def purchase_airtime(
         self,
@@ -25,9 +23,14 @@ class AirtimeService:
         amount: Decimal,
         phone: str,
         save_beneficiary: bool = False,
-        beneficiary_name: str = None
+        beneficiary_name: str = None,
+        async_mode: bool = False
     ) -> Dict[str, Any]:
-        """Purchase airtime for a phone number."""
+        """Purchase airtime for a phone number.
+        
+        With ``async_mode`` the wallet is debited and a vend job is queued;
+        the transaction is returned as pending and a vend worker completes it.
+        """
         # Validate network
         network_lower = network.lower()
         if network_lower not in NETWORKS:
@@ -46,40 +49,45 @@ class AirtimeService:
             # Use detected network if different
             network_lower = detected_network
         
-        # Check wallet balance
-        wallet = self.wallet_service.get_wallet(user_id)
-        if not wallet.has_sufficient_balance(amount):
-            raise InsufficientBalanceException()
-        
         # Generate reference
         reference = generate_ref("AT")
         
-        # Create pending transaction
-        transaction = Transaction(
+        beneficiary = None
+        if save_beneficiary:
+            beneficiary = {"phone": formatted_phone, "network": network_lower, "name": beneficiary_name}
+        
+        vend_payload = None
+        if async_mode:
+            vend_payload = {
+                "kind": "airtime",
+                "network": network_lower,
+                "recipient": formatted_phone,
+                "amount": float(amount),
+                "beneficiary": beneficiary
+            }
+        
+        # Debit wallet and record pending transaction (one commit)
+        transaction = self.purchase_service.reserve(
             user_id=user_id,
-            type="airtime",
+            transaction_type="airtime",
             amount=amount,
             reference=reference,
-            status="pending",
             details={
                 "network": network_lower,
                 "phone": formatted_phone,
                 "amount": float(amount)
             },
-            description=f"Airtime purchase - {NETWORKS[network_lower]} {formatted_phone}"
+            description=f"Airtime purchase - {NETWORKS[network_lower]} {formatted_phone}",
+            vend_payload=vend_payload
         )
-        db.session.add(transaction)
-        db.session.flush()
+        
+        if async_mode:
+            return {
+                "transaction": self.purchase_service.public_snapshot(transaction),
+                "message": "Airtime purchase queued"
+            }
         
         try:
-            # Debit wallet
-            self.wallet_service.debit_wallet(
-                user_id=user_id,
-                amount=amount,
-                reference=reference,
-                description=f"Airtime purchase - {formatted_phone}"
-            )
-            
             # Call Payscribe API
             payscribe_response = self.payscribe_client.vend_airtime(
                 network=network_lower,
@@ -87,62 +95,24 @@ class AirtimeService:
                 recipient=formatted_phone,
                 ref=reference
             )
-            
-            # Update transaction based on response
-            if payscribe_response.get("status"):
-                transaction.status = "success"
-                transaction.payscribe_transaction_id = payscribe_response.get("message", {}).get("details", {}).get("trans_id")
-                transaction.payscribe_reference = payscribe_response.get("message", {}).get("details", {}).get("ref")
-            else:
-                transaction.status = "failed"
-                # Refund wallet
-                wallet = self.wallet_service.get_wallet(user_id)
-                wallet.credit(amount)
-                db.session.commit()
-                raise PayscribeAPIException(payscribe_response.get("description", "Airtime purchase failed"))
-            
-            db.session.commit()
-            
-            # Save beneficiary if requested
-            if save_beneficiary:
-                self._save_beneficiary(user_id, formatted_phone, network_lower, beneficiary_name)
-            
-            return {
-                "transaction": transaction.to_dict(),
-                "message": "Airtime purchased successfully"
-            }
-        except Exception as e:
-            db.session.rollback()
-            # Refund if wallet was debited
-            try:
-                wallet = self.wallet_service.get_wallet(user_id)
-                if transaction and transaction.status in ["pending", "processing"]:
-                    wallet.credit(amount)
-                    transaction.status = "failed"
-                    db.session.commit()
-            except Exception as refund_error:
-                db.session.rollback()
-                current_app.logger.error(f"Error refunding wallet: {str(refund_error)}")
-            raise e
-    
-    def _save_beneficiary(
-        self,
-        user_id: str,
-        phone: str,
-        network: str,
-        name: str = None
-    ):
-        """Save beneficiary if not exists."""
-        from app.models import Beneficiary
+        except Exception:
+            self._refund(transaction)
+            raise
         
-        existing = Beneficiary.query.filter_by(user_id=user_id, phone=phone).first()
-        if not existing:
-            beneficiary = Beneficiary(
-                user_id=user_id,
-                phone=phone,
-                network=network,
-                name=name
-            )
-            db.session.add(beneficiary)
-            db.session.commit()
-
+        # Update transaction based on response
+        if not payscribe_response.get("status"):
+            self._refund(transaction)
+            raise PayscribeAPIException(payscribe_response.get("description", "Airtime purchase failed"))
+        
+        # Mark success and save beneficiary if requested (one commit)
+        return {
+            "transaction": self.purchase_service.complete(transaction, payscribe_response, beneficiary=beneficiary),
+            "message": "Airtime purchased successfully"
+        }
+    
+    def _refund(self, transaction: Dict[str, Any]):
+        """Mark purchase failed and refund wallet, logging refund errors."""
+        try:
+            self.purchase_service.fail(transaction)
+        except Exception as refund_error:
+            current_app.logger.error(f"Error refunding wallet: {str(refund_error)}")
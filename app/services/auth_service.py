@@ -2,7 +2,7 @@
 from typing import Dict, Any, Optional
 from decimal import Decimal
 from app.extensions import db
-from app.models import User, Wallet
+from app.models import User, Wallet, UserRow
 from app.integrations import PayscribeClient
 from app.services.wallet_service import WalletService
 from app.utils.security import generate_token, verify_pin
@@ -90,9 +90,10 @@ class AuthService:
     
     def get_user(self, user_id: str) -> Dict[str, Any]:
         """Get user details."""
-        user = User.query.get(user_id)
-        if not user:
+        # One outer-joined row of just the returned columns instead of two ORM loads
+        row = db.session.execute(UserRow.select_from().where(User.id == user_id)).first()
+        if not row:
             raise NotFoundException("User not found")
         
-        return user.to_dict(include_wallet=True)
+        return UserRow._make(row).to_dict()
 
@@ -1,7 +1,7 @@
 """Beneficiary service."""
 from typing import Dict, Any, List
 from app.extensions import db
-from app.models import Beneficiary
+from app.models import Beneficiary, BeneficiaryRow
 from app.utils.helpers import format_phone_number, detect_network
 from app.errors.exceptions import ValidationException, NotFoundException
 
@@ -11,8 +11,10 @@ class BeneficiaryService:
     
     def get_beneficiaries(self, user_id: str) -> List[Dict[str, Any]]:
         """Get all beneficiaries for a user."""
-        beneficiaries = Beneficiary.query.filter_by(user_id=user_id).order_by(Beneficiary.created_at.desc()).all()
-        return [b.to_dict() for b in beneficiaries]
+        statement = BeneficiaryRow.select_from().where(
+            Beneficiary.user_id == user_id
+        ).order_by(Beneficiary.created_at.desc())
+        return [BeneficiaryRow._make(row).to_dict() for row in db.session.execute(statement)]
     
     def create_beneficiary(
         self,
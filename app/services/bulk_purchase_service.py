@@ -0,0 +1,266 @@
+"""Bulk airtime/data purchase service."""
+import asyncio
+from typing import Dict, Any, List
+from decimal import Decimal, InvalidOperation
+from flask import current_app
+from sqlalchemy import select, func, union_all
+from app.extensions import db
+from app.models import PurchaseBatch, Transaction, ArchivedTransaction, BatchLineRow
+from app.integrations import AsyncPayscribeClient
+from app.services.purchase_service import PurchaseService
+from app.services.data_service import DataService
+from app.utils.helpers import generate_ref, format_phone_number, detect_network, validate_phone_number
+from app.utils.constants import NETWORKS
+from app.errors.exceptions import ValidationException, NotFoundException, PayscribeUnavailableException
+
+
+class BulkPurchaseService:
+    """Service for bulk airtime and data purchases.
+
+    A batch is validated in one pass, reserved with a single wallet debit,
+    then vended concurrently (at most BULK_PURCHASE_CONCURRENCY calls in
+    flight) and finalized with one UPDATE for failures and one for successes.
+    Batches over BULK_PURCHASE_SYNC_MAX_ITEMS are always queued (see
+    ``should_queue``) so a request never waits on hundreds of vends.
+    """
+
+    def __init__(self):
+        self.purchase_service = PurchaseService()
+        self.data_service = DataService()
+
+    def should_queue(self, items: List[Dict[str, Any]], async_mode: bool = False) -> bool:
+        """True if the batch goes through the vend queue: requested, or too large to vend in the request."""
+        return async_mode or len(items) > current_app.config.get("BULK_PURCHASE_SYNC_MAX_ITEMS", 20)
+
+    def purchase_bulk(self, user_id: str, items: List[Dict[str, Any]], async_mode: bool = False) -> Dict[str, Any]:
+        """Purchase airtime/data for a list of recipients.
+
+        With ``async_mode`` every line is queued for the vend workers and the
+        batch is returned with its lines pending; poll it with ``get_batch``.
+        """
+        lines = self._prepare_lines(items)
+        total = sum((line["amount"] for line in lines), Decimal("0"))
+        batch = PurchaseBatch(
+            user_id=user_id,
+            reference=generate_ref("BK"),
+            total_amount=total,
+            item_count=len(lines)
+        )
+        batch_dict = batch.to_dict()
+
+        # One debit and one commit for the whole batch
+        snapshots = self.purchase_service.reserve_batch(batch, lines, async_mode=async_mode)
+
+        if async_mode:
+            return self._batch_result(batch_dict, snapshots, {})
+
+        responses = asyncio.run(self._vend_all(lines))
+
+        succeeded, failed, errors = [], [], {}
+        for snapshot, response in zip(snapshots, responses):
+            if isinstance(response, PayscribeUnavailableException):
+                # Rejected by a breaker or bulkhead before reaching Payscribe
+                errors[snapshot["id"]] = response.message
+                failed.append(snapshot)
+            elif isinstance(response, Exception):
+                # Timeouts and 5xx say nothing about the vend: left pending for reconciliation
+                errors[snapshot["id"]] = getattr(response, "message", str(response))
+            elif not response.get("status"):
+                errors[snapshot["id"]] = response.get("description", "Vend failed")
+                failed.append(snapshot)
+            else:
+                succeeded.append((snapshot, response))
+
+        # Refunds first, so a failure settling the vended lines never skips them
+        try:
+            self.purchase_service.fail_many(failed)
+        except Exception as refund_error:
+            current_app.logger.error(f"Error refunding bulk purchase {batch_dict['reference']}: {str(refund_error)}")
+        try:
+            self.purchase_service.complete_many(succeeded)
+        except Exception as settle_error:
+            # The lines were vended: they stay pending for reconciliation, and the
+            # batch is still answered normally so a retry replays it instead of vending again
+            current_app.logger.error(f"Error settling bulk purchase {batch_dict['reference']}: {str(settle_error)}")
+            for snapshot, _ in succeeded:
+                snapshot["status"] = "pending"
+
+        return self._batch_result(batch_dict, snapshots, errors)
+
+    def get_batch(self, user_id: str, batch_id: str) -> Dict[str, Any]:
+        """Get a batch with per-line statuses."""
+        batch = PurchaseBatch.query.filter_by(id=batch_id, user_id=user_id).first()
+        if not batch:
+            raise NotFoundException("Batch not found")
+
+        # Lines of old batches may have been archived, so both tables are read
+        statuses = union_all(
+            select(Transaction.status).where(Transaction.batch_id == batch.id),
+            select(ArchivedTransaction.status).where(ArchivedTransaction.batch_id == batch.id)
+        ).subquery()
+        counts = dict(db.session.execute(
+            select(statuses.c.status, func.count()).group_by(statuses.c.status)
+        ).all())
+        lines = db.session.execute(
+            union_all(
+                BatchLineRow.select_from(Transaction).where(Transaction.batch_id == batch.id),
+                BatchLineRow.select_from(ArchivedTransaction).where(ArchivedTransaction.batch_id == batch.id)
+            ).order_by("reference")
+        )
+        return self._batch_response(batch.to_dict(), [BatchLineRow._make(line).to_dict() for line in lines], counts)
+
+    def _prepare_lines(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Validate and normalize every line, reporting all invalid lines at once."""
+        if not items:
+            raise ValidationException("items must be a non-empty list")
+
+        max_items = current_app.config.get("BULK_PURCHASE_MAX_ITEMS", 500)
+        if len(items) > max_items:
+            raise ValidationException(f"A bulk purchase can have at most {max_items} items")
+
+        plan_catalogs = {}
+        lines, errors = [], []
+        for index, item in enumerate(items, start=1):
+            try:
+                lines.append(self._prepare_line(item, plan_catalogs))
+            except ValidationException as e:
+                errors.append(f"item {index}: {e.message}")
+
+        if errors:
+            raise ValidationException("; ".join(errors))
+        return lines
+
+    def _prepare_line(self, item: Dict[str, Any], plan_catalogs: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Validate and normalize one line into the shape reserve_batch expects."""
+        kind = (item.get("type") or "airtime").lower()
+        network_lower = (item.get("network") or "").lower()
+        phone = item.get("phone")
+
+        if kind not in ("airtime", "data"):
+            raise ValidationException("type must be airtime or data")
+        if network_lower not in NETWORKS:
+            raise ValidationException(f"Invalid network. Must be one of: {', '.join(NETWORKS.keys())}")
+        if not phone or not validate_phone_number(phone):
+            raise ValidationException("Invalid phone number")
+
+        formatted_phone = format_phone_number(phone)
+        detected_network = detect_network(formatted_phone)
+        if kind == "airtime" and detected_network and detected_network != network_lower:
+            network_lower = detected_network
+
+        if kind == "airtime":
+            try:
+                amount = Decimal(str(item.get("amount")))
+            except (InvalidOperation, ValueError):
+                raise ValidationException("amount is required for airtime")
+            if amount < Decimal("50.00"):
+                raise ValidationException("Minimum airtime purchase is NGN 50")
+
+            return {
+                "transaction_type": "airtime",
+                "amount": amount,
+                "reference": generate_ref("AT"),
+                "details": {"network": network_lower, "phone": formatted_phone, "amount": float(amount)},
+                "description": f"Airtime purchase - {NETWORKS[network_lower]} {formatted_phone}",
+                "vend_payload": {
+                    "kind": "airtime",
+                    "network": network_lower,
+                    "recipient": formatted_phone,
+                    "amount": float(amount),
+                    "beneficiary": None
+                },
+            }
+
+        # Plan catalogs are loaded once per network for the whole batch
+        plan_id = item.get("plan_id")
+        if network_lower not in plan_catalogs:
+            plan_catalogs[network_lower] = {plan["id"]: plan for plan in self.data_service.get_data_plans(network_lower)}
+        plan = plan_catalogs[network_lower].get(plan_id)
+        if not plan:
+            raise ValidationException("Invalid data plan")
+
+        amount = Decimal(str(plan["price"]))
+        return {
+            "transaction_type": "data",
+            "amount": amount,
+            "reference": generate_ref("DT"),
+            "details": {
+                "network": network_lower,
+                "phone": formatted_phone,
+                "plan_id": plan_id,
+                "plan_size": plan.get("size", ""),
+                "amount": float(amount)
+            },
+            "description": f"Data purchase - {plan.get('size', '')} for {formatted_phone}",
+            "vend_payload": {
+                "kind": "data",
+                "network": network_lower,
+                "recipient": formatted_phone,
+                "plan": plan_id,
+                "beneficiary": None
+            },
+        }
+
+    async def _vend_all(self, lines: List[Dict[str, Any]]) -> List[Any]:
+        """Vend every line concurrently with a bounded number of calls in flight."""
+        semaphore = asyncio.Semaphore(current_app.config.get("BULK_PURCHASE_CONCURRENCY", 5))
+
+        async with AsyncPayscribeClient() as client:
+            async def vend(line):
+                payload = line["vend_payload"]
+                async with semaphore:
+                    if payload["kind"] == "airtime":
+                        return await client.vend_airtime(
+                            network=payload["network"],
+                            amount=payload["amount"],
+                            recipient=payload["recipient"],
+                            ref=line["reference"]
+                        )
+                    return await client.vend_data(
+                        network=payload["network"],
+                        plan=payload["plan"],
+                        recipient=payload["recipient"],
+                        ref=line["reference"]
+                    )
+
+            return await asyncio.gather(*(vend(line) for line in lines), return_exceptions=True)
+
+    def _batch_result(
+        self,
+        batch: Dict[str, Any],
+        snapshots: List[Dict[str, Any]],
+        errors: Dict[str, str]
+    ) -> Dict[str, Any]:
+        """Build the batch response from line snapshots, counting statuses in Python."""
+        counts = {}
+        results = []
+        for snapshot in snapshots:
+            counts[snapshot["status"]] = counts.get(snapshot["status"], 0) + 1
+            results.append({
+                "transaction_id": snapshot["id"],
+                "reference": snapshot["reference"],
+                "type": snapshot["type"],
+                "network": snapshot["details"].get("network"),
+                "phone": snapshot["details"].get("phone"),
+                "amount": snapshot["amount"],
+                "status": snapshot["status"],
+                "error": errors.get(snapshot["id"])
+            })
+        return self._batch_response(batch, results, counts)
+
+    def _batch_response(
+        self,
+        batch: Dict[str, Any],
+        results: List[Dict[str, Any]],
+        counts: Dict[str, int]
+    ) -> Dict[str, Any]:
+        """Build the batch response with per-line results and status counts."""
+        in_flight = counts.get("pending", 0) + counts.get("processing", 0)
+        return {
+            "batch": {
+                **batch,
+                "status": "processing" if in_flight else "completed",
+                "counts": counts
+            },
+            "results": results
+        }
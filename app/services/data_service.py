@@ -1,14 +1,20 @@
 """Data service."""
+import asyncio
 from typing import Dict, Any, List
+from datetime import datetime
 from decimal import Decimal
 from flask import current_app
 from app.extensions import db
-from app.models import Transaction, Beneficiary
-from app.integrations import PayscribeClient
-from app.services.wallet_service import WalletService
+from app.models import DataPlan
+from app.integrations import PayscribeClient, AsyncPayscribeClient
+from app.services.purchase_service import PurchaseService
 from app.utils.helpers import generate_ref, format_phone_number, detect_network
 from app.utils.constants import NETWORKS
-from app.errors.exceptions import ValidationException, InsufficientBalanceException, PayscribeAPIException
+from app.utils.cache import TTLCache, with_app_context
+from app.errors.exceptions import ValidationException, PayscribeAPIException
+
+# Plan catalog cache keyed by (network, category), shared by all requests in a worker
+_plan_cache = TTLCache("data_plans")
 
 
 class DataService:
@@ -16,53 +22,170 @@ class DataService:
     
     def __init__(self):
         self.payscribe_client = PayscribeClient()
-        self.wallet_service = WalletService()
+        self.purchase_service = PurchaseService()
     
     def get_data_plans(self, network: str, category: str = None) -> List[Dict[str, Any]]:
-        """Get available data plans for a network."""
+        """Get available data plans for a network.
+        
+        Plans come from the synced data_plans table, falling back to a live
+        Payscribe lookup when the table has none for the network/category.
+        Results are served from the plan catalog cache; see
+        DATA_PLAN_CACHE_TTL and DATA_PLAN_CACHE_STALE_TTL.
+        """
         network_lower = network.lower()
         if network_lower not in NETWORKS:
             raise ValidationException(f"Invalid network. Must be one of: {', '.join(NETWORKS.keys())}")
         
+        return _plan_cache.get_or_load(
+            (network_lower, category or None),
+            with_app_context(lambda: self._load_data_plans(network_lower, category)),
+            ttl=current_app.config.get("DATA_PLAN_CACHE_TTL", 300),
+            stale_ttl=current_app.config.get("DATA_PLAN_CACHE_STALE_TTL", 3600)
+        )
+    
+    def _load_data_plans(self, network_lower: str, category: str = None) -> List[Dict[str, Any]]:
+        """Load plans from the catalog table, or from Payscribe if not synced yet."""
+        query = DataPlan.query.filter_by(network=network_lower, is_active=True)
+        if category:
+            query = query.filter_by(category=category)
+        plans = query.order_by(DataPlan.price).all()
+        if plans:
+            return [plan.to_dict() for plan in plans]
+        return self._fetch_data_plans(network_lower, category)
+    
+    def _fetch_data_plans(self, network_lower: str, category: str = None) -> List[Dict[str, Any]]:
+        """Fetch and format data plans from Payscribe."""
         try:
             response = self.payscribe_client.lookup_data_plans(
                 network=network_lower,
                 category=category
             )
             
-            if not response.get("status"):
-                raise PayscribeAPIException(response.get("description", "Failed to fetch data plans"))
-            
-            # Response structure: message.details is an array with network objects
-            # Each network object has a "plans" array
-            details = response.get("message", {}).get("details", [])
-            
-            if not details:
-                raise PayscribeAPIException("No data plans found")
-            
-            # Extract plans from the first network object (should match the requested network)
-            network_data = details[0] if isinstance(details, list) else details
-            plans = network_data.get("plans", [])
-            
-            if not plans:
-                raise PayscribeAPIException("No plans found for this network")
-            
             # Format plans for frontend
-            formatted_plans = []
-            for plan in plans:
-                plan_name = plan.get("name", "")
-                formatted_plans.append({
-                    "id": plan.get("plan_code"),  # Use plan_code, not plan_id
-                    "size": self._extract_size(plan_name),
-                    "duration": self._extract_duration(plan_name) or "30 Days",  # Default duration
-                    "price": float(plan.get("amount", 0)),
-                    "validity": self._extract_duration(plan_name) or "30 Days"
-                })
-            
-            return formatted_plans
+            return [self._format_plan(plan) for plan in self._parse_plans(response)]
         except Exception as e:
             raise PayscribeAPIException(f"Failed to fetch data plans: {str(e)}")
     
+    def _parse_plans(self, response: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Extract the raw plan list from a data/lookup response."""
+        if not response.get("status"):
+            raise PayscribeAPIException(response.get("description", "Failed to fetch data plans"))
+        
+        # Response structure: message.details is an array with network objects
+        # Each network object has a "plans" array
+        details = response.get("message", {}).get("details", [])
+        
+        if not details:
+            raise PayscribeAPIException("No data plans found")
+        
+        # Extract plans from the first network object (should match the requested network)
+        network_data = details[0] if isinstance(details, list) else details
+        plans = network_data.get("plans", [])
+        
+        if not plans:
+            raise PayscribeAPIException("No plans found for this network")
+        
+        return plans
+    
+    def _format_plan(self, plan: Dict[str, Any]) -> Dict[str, Any]:
+        """Format a raw Payscribe plan for the frontend."""
+        plan_name = plan.get("name", "")
+        duration = self._extract_duration(plan_name) or "30 Days"  # Default duration
+        return {
+            "id": plan.get("plan_code"),  # Use plan_code, not plan_id
+            "size": self._extract_size(plan_name),
+            "duration": duration,
+            "price": float(plan.get("amount", 0)),
+            "validity": duration
+        }
+    
+    def sync_data_plans(self, networks: List[str] = None) -> Dict[str, Any]:
+        """Sync the data_plans table with Payscribe for the given networks.
+        
+        All networks are looked up concurrently. Size and duration are parsed
+        once here; only new, changed and withdrawn plans are written.
+        """
+        networks = [n.lower() for n in (networks or NETWORKS.keys())]
+        responses = asyncio.run(self._lookup_all_plans(networks))
+        
+        summary = {}
+        for network_lower, response in zip(networks, responses):
+            try:
+                if isinstance(response, Exception):
+                    raise response
+                summary[network_lower] = self._sync_network_plans(network_lower, self._parse_plans(response))
+            except Exception as e:
+                current_app.logger.error(f"Data plan sync failed for {network_lower}: {str(e)}")
+                summary[network_lower] = {"error": str(e)}
+        
+        db.session.commit()
+        _plan_cache.invalidate()
+        return summary
+    
+    async def _lookup_all_plans(self, networks: List[str]) -> List[Any]:
+        """Look up plans for several networks concurrently."""
+        async with AsyncPayscribeClient() as client:
+            return await asyncio.gather(
+                *(client.lookup_data_plans(network=network) for network in networks),
+                return_exceptions=True
+            )
+    
+    def _sync_network_plans(self, network_lower: str, plans: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Diff one network's upstream plans against stored rows and apply changes."""
+        existing = {plan.plan_code: plan for plan in DataPlan.query.filter_by(network=network_lower).all()}
+        now = datetime.utcnow()
+        created = updated = 0
+        seen = set()
+        
+        for plan in plans:
+            plan_code = plan.get("plan_code")
+            if not plan_code or plan_code in seen:
+                continue
+            seen.add(plan_code)
+            
+            formatted = self._format_plan(plan)
+            fields = {
+                "name": plan.get("name", ""),
+                "category": plan.get("category"),
+                "size": formatted["size"],
+                "duration": formatted["duration"],
+                "price": Decimal(str(plan.get("amount", 0))).quantize(Decimal("0.01")),
+            }
+            
+            row = existing.get(plan_code)
+            if row is None:
+                row = DataPlan(network=network_lower, plan_code=plan_code, **fields)
+                row.synced_at = now
+                db.session.add(row)
+                created += 1
+                continue
+            
+            changed = not row.is_active or any(getattr(row, key) != value for key, value in fields.items())
+            if changed:
+                for key, value in fields.items():
+                    setattr(row, key, value)
+                row.is_active = True
+                row.synced_at = now
+                updated += 1
+        
+        deactivated = 0
+        for plan_code, row in existing.items():
+            if plan_code not in seen and row.is_active:
+                row.is_active = False
+                row.synced_at = now
+                deactivated += 1
+        
+        return {"created": created, "updated": updated, "deactivated": deactivated, "unchanged": len(seen) - created - updated}
+    
+    def _get_plan(self, network_lower: str, plan_id: str) -> Dict[str, Any]:
+        """Get one plan by code from the catalog table, falling back to the cached lookup."""
+        plan = DataPlan.query.filter_by(network=network_lower, plan_code=plan_id, is_active=True).first()
+        if plan:
+            return plan.to_dict()
+        
+        plans = self.get_data_plans(network_lower)
+        return next((p for p in plans if p["id"] == plan_id), None)
+    
     def purchase_data(
         self,
         user_id: str,
@@ -70,17 +193,21 @@ class DataService:
         plan_id: str,
         phone: str,
         save_beneficiary: bool = False,
-        beneficiary_name: str = None
+        beneficiary_name: str = None,
+        async_mode: bool = False
     ) -> Dict[str, Any]:
-        """Purchase data bundle for a phone number."""
+        """Purchase data bundle for a phone number.
+        
+        With ``async_mode`` the wallet is debited and a vend job is queued;
+        the transaction is returned as pending and a vend worker completes it.
+        """
         # Validate network
         network_lower = network.lower()
         if network_lower not in NETWORKS:
             raise ValidationException(f"Invalid network. Must be one of: {', '.join(NETWORKS.keys())}")
         
         # Get plan details to get amount
-        plans = self.get_data_plans(network_lower)
-        plan = next((p for p in plans if p["id"] == plan_id), None)
+        plan = self._get_plan(network_lower, plan_id)
         
         if not plan:
             raise ValidationException("Invalid data plan")
@@ -95,21 +222,29 @@ class DataService:
         if detected_network and detected_network != network_lower:
             network_lower = detected_network
         
-        # Check wallet balance
-        wallet = self.wallet_service.get_wallet(user_id)
-        if not wallet.has_sufficient_balance(amount):
-            raise InsufficientBalanceException()
-        
         # Generate reference
         reference = generate_ref("DT")
         
-        # Create pending transaction
-        transaction = Transaction(
+        beneficiary = None
+        if save_beneficiary:
+            beneficiary = {"phone": formatted_phone, "network": network_lower, "name": beneficiary_name}
+        
+        vend_payload = None
+        if async_mode:
+            vend_payload = {
+                "kind": "data",
+                "network": network_lower,
+                "recipient": formatted_phone,
+                "plan": plan_id,
+                "beneficiary": beneficiary
+            }
+        
+        # Debit wallet and record pending transaction (one commit)
+        transaction = self.purchase_service.reserve(
             user_id=user_id,
-            type="data",
+            transaction_type="data",
             amount=amount,
             reference=reference,
-            status="pending",
             details={
                 "network": network_lower,
                 "phone": formatted_phone,
@@ -117,20 +252,17 @@ class DataService:
                 "plan_size": plan.get("size", ""),
                 "amount": float(amount)
             },
-            description=f"Data purchase - {plan.get('size', '')} for {formatted_phone}"
+            description=f"Data purchase - {plan.get('size', '')} for {formatted_phone}",
+            vend_payload=vend_payload
         )
-        db.session.add(transaction)
-        db.session.flush()
+        
+        if async_mode:
+            return {
+                "transaction": self.purchase_service.public_snapshot(transaction),
+                "message": "Data purchase queued"
+            }
         
         try:
-            # Debit wallet
-            self.wallet_service.debit_wallet(
-                user_id=user_id,
-                amount=amount,
-                reference=reference,
-                description=f"Data purchase - {formatted_phone}"
-            )
-            
             # Call Payscribe API
             payscribe_response = self.payscribe_client.vend_data(
                 network=network_lower,
@@ -138,43 +270,27 @@ class DataService:
                 recipient=formatted_phone,
                 ref=reference
             )
-            
-            # Update transaction based on response
-            if payscribe_response.get("status"):
-                transaction.status = "success"
-                transaction.payscribe_transaction_id = payscribe_response.get("message", {}).get("details", {}).get("trans_id")
-                transaction.payscribe_reference = payscribe_response.get("message", {}).get("details", {}).get("ref")
-            else:
-                transaction.status = "failed"
-                # Refund wallet
-                wallet = self.wallet_service.get_wallet(user_id)
-                wallet.credit(amount)
-                db.session.commit()
-                raise PayscribeAPIException(payscribe_response.get("description", "Data purchase failed"))
-            
-            db.session.commit()
-            
-            # Save beneficiary if requested
-            if save_beneficiary:
-                self._save_beneficiary(user_id, formatted_phone, network_lower, beneficiary_name)
-            
-            return {
-                "transaction": transaction.to_dict(),
-                "message": "Data purchased successfully"
-            }
-        except Exception as e:
-            db.session.rollback()
-            # Refund if wallet was debited
-            try:
-                wallet = self.wallet_service.get_wallet(user_id)
-                if transaction and transaction.status in ["pending", "processing"]:
-                    wallet.credit(amount)
-                    transaction.status = "failed"
-                    db.session.commit()
-            except Exception as refund_error:
-                db.session.rollback()
-                current_app.logger.error(f"Error refunding wallet: {str(refund_error)}")
-            raise e
+        except Exception:
+            self._refund(transaction)
+            raise
+        
+        # Update transaction based on response
+        if not payscribe_response.get("status"):
+            self._refund(transaction)
+            raise PayscribeAPIException(payscribe_response.get("description", "Data purchase failed"))
+        
+        # Mark success and save beneficiary if requested (one commit)
+        return {
+            "transaction": self.purchase_service.complete(transaction, payscribe_response, beneficiary=beneficiary),
+            "message": "Data purchased successfully"
+        }
+    
+    def _refund(self, transaction: Dict[str, Any]):
+        """Mark purchase failed and refund wallet, logging refund errors."""
+        try:
+            self.purchase_service.fail(transaction)
+        except Exception as refund_error:
+            current_app.logger.error(f"Error refunding wallet: {str(refund_error)}")
     
     def _extract_size(self, plan_name: str) -> str:
         """Extract data size from plan name (e.g., '1GB', '500MB')."""
@@ -193,25 +309,3 @@ class DataService:
         if match:
             return match.group(0)
         return ""
-    
-    def _save_beneficiary(
-        self,
-        user_id: str,
-        phone: str,
-        network: str,
-        name: str = None
-    ):
-        """Save beneficiary if not exists."""
-        from app.models import Beneficiary
-        
-        existing = Beneficiary.query.filter_by(user_id=user_id, phone=phone).first()
-        if not existing:
-            beneficiary = Beneficiary(
-                user_id=user_id,
-                phone=phone,
-                network=network,
-                name=name
-            )
-            db.session.add(beneficiary)
-            db.session.commit()
-
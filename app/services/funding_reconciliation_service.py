@@ -0,0 +1,188 @@
+"""Reconciliation of virtual-account funding against Payscribe collections."""
+import asyncio
+from typing import Dict, Any, List, Optional
+from datetime import datetime, timedelta
+from decimal import Decimal
+from flask import current_app
+from app.extensions import db
+from app.models import Wallet, FundingCredit
+from app.integrations import AsyncPayscribeClient
+from app.services.wallet_service import WalletService
+from app.utils.metrics import register_metrics_provider
+
+# Summary of the last funding reconciliation run in this process
+_last_run: Dict[str, Any] = {}
+
+
+class FundingReconciliationService:
+    """Credits collections whose funding webhook never arrived.
+
+    Active virtual accounts are read in keyset pages of ``page_size``
+    wallets, so memory stays bounded however many accounts exist. Each
+    page's collections are pulled concurrently, compared against existing
+    credit transactions with one ``IN`` query, and only the missing ones
+    are credited through WalletService.credit_collection, the same
+    idempotent path the webhook uses.
+    """
+
+    def __init__(self):
+        self.wallet_service = WalletService()
+
+    def reconcile_funding(self, lookback_hours: int = 24, page_size: int = 500) -> Dict[str, int]:
+        """Credit collections from the last ``lookback_hours`` that have no credit transaction."""
+        summary = {"accounts": 0, "collections": 0, "credited": 0, "errors": 0}
+        end_date = datetime.utcnow()
+        start_date = end_date - timedelta(hours=lookback_hours)
+        cursor = None
+
+        while True:
+            accounts = self._account_page(page_size, cursor)
+            if not accounts:
+                break
+            cursor = accounts[-1]["id"]
+
+            results = asyncio.run(self._fetch_all(accounts, start_date, end_date))
+            collections = []
+            for account, result in zip(accounts, results):
+                if isinstance(result, Exception):
+                    current_app.logger.warning(
+                        f"Collection lookup failed for {account['payscribe_account_number']}: {str(result)}"
+                    )
+                    summary["errors"] += 1
+                    continue
+                collections.extend(result)
+
+            summary["accounts"] += len(accounts)
+            summary["collections"] += len(collections)
+            summary["credited"] += self._credit_missing(collections)
+
+        _last_run.clear()
+        _last_run.update(summary, finished_at=datetime.utcnow().isoformat())
+        return summary
+
+    def _account_page(self, limit: int, cursor: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Read the next page of active virtual accounts in id order."""
+        query = db.session.query(Wallet.id, Wallet.user_id, Wallet.payscribe_account_number).filter(
+            Wallet.payscribe_account_number.isnot(None),
+            Wallet.virtual_account_status == "active"
+        )
+        if cursor:
+            query = query.filter(Wallet.id > cursor)
+        try:
+            rows = query.order_by(Wallet.id).limit(limit).all()
+        finally:
+            db.session.close()
+        return [row._asdict() for row in rows]
+
+    async def _fetch_all(
+        self,
+        accounts: List[Dict[str, Any]],
+        start_date: datetime,
+        end_date: datetime
+    ) -> List[Any]:
+        """Pull every account's successful collections with bounded concurrency."""
+        semaphore = asyncio.Semaphore(current_app.config.get("FUNDING_RECONCILE_CONCURRENCY", 5))
+
+        async with AsyncPayscribeClient() as client:
+            async def fetch(account):
+                async with semaphore:
+                    return await self._fetch_collections(client, account, start_date, end_date)
+
+            return await asyncio.gather(*(fetch(account) for account in accounts), return_exceptions=True)
+
+    async def _fetch_collections(
+        self,
+        client: AsyncPayscribeClient,
+        account: Dict[str, Any],
+        start_date: datetime,
+        end_date: datetime,
+        page_size: int = 100
+    ) -> List[Dict[str, Any]]:
+        """Page through one account's collections and keep the successful ones.
+
+        Stops at FUNDING_RECONCILE_MAX_PAGES, or when a page repeats the
+        previous one (the API ignored ``page``), so a run always finishes.
+        """
+        collections = []
+        max_pages = current_app.config.get("FUNDING_RECONCILE_MAX_PAGES", 50)
+        previous_ids = None
+        for page in range(1, max_pages + 1):
+            response = await client.list_collections(
+                account_number=account["payscribe_account_number"],
+                start_date=start_date.strftime("%Y-%m-%d"),
+                end_date=end_date.strftime("%Y-%m-%d"),
+                page=page,
+                page_size=page_size
+            )
+            details = response.get("message", {}).get("details", [])
+            items = details.get("transactions", []) if isinstance(details, dict) else details
+            page_ids = [item.get("trans_id") or item.get("transaction_id") for item in items]
+            if page_ids == previous_ids:
+                current_app.logger.warning(
+                    f"Collections page {page} for account {account['payscribe_account_number']} "
+                    f"repeats page {page - 1}; stopping"
+                )
+                return collections
+            previous_ids = page_ids
+            for item in items:
+                trans_id = item.get("trans_id") or item.get("transaction_id")
+                status = str(item.get("status", "")).lower()
+                if trans_id and item.get("amount") and status in ("success", "successful", "completed"):
+                    collections.append({
+                        "user_id": account["user_id"],
+                        "account_number": account["payscribe_account_number"],
+                        "trans_id": str(trans_id),
+                        "amount": Decimal(str(item["amount"])),
+                    })
+            if len(items) < page_size:
+                return collections
+        current_app.logger.warning(
+            f"Collections for account {account['payscribe_account_number']} exceed {max_pages} pages; "
+            f"the rest are picked up by a later run"
+        )
+        return collections
+
+    def _credit_missing(self, collections: List[Dict[str, Any]]) -> int:
+        """Credit the collections that have no credit transaction yet."""
+        if not collections:
+            return 0
+
+        trans_ids = list({collection["trans_id"] for collection in collections})
+        try:
+            credited = {
+                trans_id for (trans_id,) in db.session.query(FundingCredit.payscribe_transaction_id).filter(
+                    FundingCredit.payscribe_transaction_id.in_(trans_ids)
+                )
+            }
+        finally:
+            db.session.close()
+
+        count = 0
+        for collection in collections:
+            if collection["trans_id"] in credited:
+                continue
+            try:
+                # The funding_credits claim still guards a webhook landing meanwhile
+                if self.wallet_service.credit_collection(
+                    user_id=collection["user_id"],
+                    amount=collection["amount"],
+                    payscribe_trans_id=collection["trans_id"],
+                    account_number=collection["account_number"]
+                ):
+                    current_app.logger.info(
+                        f"Reconciled missing funding {collection['trans_id']} for {collection['user_id']}"
+                    )
+                    count += 1
+                credited.add(collection["trans_id"])
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f"Failed to credit collection {collection['trans_id']}: {str(e)}")
+        return count
+
+
+def get_funding_reconciliation_stats() -> Dict[str, Any]:
+    """Get the last funding reconciliation run summary."""
+    return {"last_run": dict(_last_run)}
+
+
+register_metrics_provider("funding_reconciliation", get_funding_reconciliation_stats)
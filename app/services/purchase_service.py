@@ -0,0 +1,324 @@
+"""Purchase unit of work shared by airtime and data purchases."""
+from typing import Dict, Any, Optional, List, Tuple
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import update, bindparam, or_
+from sqlalchemy.dialects.postgresql import insert
+from app.extensions import db
+from app.models import Transaction, Beneficiary, VendJob, PurchaseBatch
+from app.services.wallet_service import WalletService
+from app.services.spend_rollup_service import SpendRollupService, RollupEntry
+from app.utils.helpers import generate_uuid
+from app.utils.idempotency import track_debits, link_reservation
+
+# Statuses a purchase can still move out of
+OPEN_STATUSES = ["pending", "processing"]
+
+# What a refund UPDATE returns: enough to credit the wallet and reverse the spend rollup
+REFUND_COLUMNS = (Transaction.user_id, Transaction.amount, Transaction.created_at, Transaction.type, Transaction.network)
+
+
+def _snapshot_created_at(snapshot: Dict[str, Any]) -> datetime:
+    """The partition key of a snapshot's row, whether serialized or not."""
+    created_at = snapshot["created_at"]
+    return datetime.fromisoformat(created_at) if isinstance(created_at, str) else created_at
+
+
+class PurchaseService:
+    """Unit of work for a single airtime or data purchase.
+
+    A purchase always runs the same small set of statements in two short
+    database phases with the Payscribe call in between:
+
+    1. ``reserve``: conditional wallet debit UPDATE + transaction INSERT +
+       spend rollup upsert, commit, then the session is closed so its pooled connection goes back
+       to the pool.
+    2. The caller vends with Payscribe holding only the plain-dict snapshot;
+       no connection is checked out and no transaction is open.
+    3. ``complete``: transaction UPDATE (+ beneficiary INSERT ... ON CONFLICT
+       DO NOTHING when requested), commit; or ``fail``: conditional
+       transaction UPDATE + refund UPDATE + rollup upsert, commit. Both check out a
+       connection afresh and address the row by id and created_at, so the
+       UPDATE only touches the row's monthly partition.
+
+    The response is built from the snapshot, so no refresh SELECTs are
+    issued after expire-on-commit. Committed debits and refunds are reported
+    to ``track_debits`` so an Idempotency-Key is never released while a
+    debit stands, and the debit commit links the key to the purchase
+    (``link_reservation``) so a retry never debits it again.
+    """
+
+    def __init__(self):
+        self.wallet_service = WalletService()
+        self.rollup_service = SpendRollupService()
+
+    def reserve(
+        self,
+        user_id: str,
+        transaction_type: str,
+        amount: Decimal,
+        reference: str,
+        details: Dict[str, Any],
+        description: str,
+        vend_payload: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Debit the wallet and record a pending transaction in one commit.
+
+        When ``vend_payload`` is given, a VendJob is queued in the same commit
+        so a vend worker performs the Payscribe call (async purchase mode).
+        """
+        try:
+            # Conditional debit first: a short balance costs one statement
+            self.wallet_service.debit_balance(user_id, amount)
+
+            transaction = Transaction(
+                user_id=user_id,
+                type=transaction_type,
+                amount=amount,
+                reference=reference,
+                status="pending",
+                details=details,
+                description=description
+            )
+            db.session.add(transaction)
+            if vend_payload is not None:
+                db.session.add(VendJob(transaction_id=transaction.id, payload=vend_payload))
+            db.session.flush()
+            self.rollup_service.record([self._rollup_entry(transaction)])
+            link_reservation(reference)
+            snapshot = transaction.to_dict()
+            snapshot["user_id"] = user_id
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            # Return the connection to the pool before the caller goes out to Payscribe
+            db.session.close()
+        track_debits(1)
+        return snapshot
+
+    def complete(
+        self,
+        snapshot: Dict[str, Any],
+        payscribe_response: Dict[str, Any],
+        beneficiary: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Mark a reserved purchase successful and optionally save the beneficiary.
+
+        A vend Payscribe reports as still pending (HTTP 201) is marked
+        processing instead and left to the reconciliation worker.
+        """
+        now = datetime.utcnow()
+        values = self._vend_values(payscribe_response, now)
+        try:
+            db.session.execute(
+                update(Transaction)
+                .where(
+                    Transaction.id == snapshot["id"],
+                    Transaction.created_at == _snapshot_created_at(snapshot),
+                    Transaction.status.in_(OPEN_STATUSES)
+                )
+                .values(**values)
+            )
+            if beneficiary:
+                self._save_beneficiary(user_id=snapshot["user_id"], **beneficiary)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        snapshot.update(values, updated_at=now.isoformat())
+        return self.public_snapshot(snapshot)
+
+    def fail(self, snapshot: Dict[str, Any]) -> bool:
+        """Mark a reserved purchase failed and refund it, at most once.
+
+        Returns True if this call performed the refund.
+        """
+        now = datetime.utcnow()
+        try:
+            row = db.session.execute(
+                update(Transaction)
+                .where(
+                    Transaction.id == snapshot["id"],
+                    Transaction.created_at == _snapshot_created_at(snapshot),
+                    Transaction.status.in_(OPEN_STATUSES)
+                )
+                .values(status="failed", updated_at=now)
+                .returning(*REFUND_COLUMNS)
+            ).first()
+            refunded = row is not None
+            if refunded:
+                self.wallet_service.credit_balance(snapshot["user_id"], Decimal(str(snapshot["amount"])))
+                self.rollup_service.record([self._rollup_entry(row, refund=True)])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        if refunded:
+            track_debits(-1)
+        snapshot.update(status="failed", updated_at=now.isoformat())
+        return refunded
+
+    def reserve_batch(
+        self,
+        batch: PurchaseBatch,
+        lines: List[Dict[str, Any]],
+        async_mode: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Debit a bulk purchase total once and record every line in one commit.
+
+        Each line dict carries ``transaction_type``, ``reference``, ``details``,
+        ``description``, ``amount`` and ``vend_payload``; the line transactions
+        are inserted in a single executemany. With ``async_mode`` a VendJob is
+        queued per line in the same commit.
+        """
+        try:
+            self.wallet_service.debit_balance(batch.user_id, batch.total_amount)
+            db.session.add(batch)
+
+            transactions = [
+                Transaction(
+                    user_id=batch.user_id,
+                    type=line["transaction_type"],
+                    amount=line["amount"],
+                    reference=line["reference"],
+                    status="pending",
+                    details=line["details"],
+                    description=line["description"],
+                    batch_id=batch.id
+                )
+                for line in lines
+            ]
+            db.session.add_all(transactions)
+            if async_mode:
+                db.session.add_all(
+                    VendJob(transaction_id=transaction.id, payload=line["vend_payload"])
+                    for transaction, line in zip(transactions, lines)
+                )
+            db.session.flush()
+            self.rollup_service.record(self._rollup_entry(transaction) for transaction in transactions)
+            link_reservation(batch.reference)
+
+            snapshots = []
+            for transaction in transactions:
+                snapshot = transaction.to_dict()
+                snapshot["user_id"] = batch.user_id
+                snapshots.append(snapshot)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            db.session.close()
+        track_debits(len(snapshots))
+        return snapshots
+
+    def complete_many(self, results: List[Tuple[Dict[str, Any], Dict[str, Any]]]):
+        """Mark many reserved purchases successful in one executemany UPDATE.
+
+        ``results`` pairs each snapshot with its Payscribe response. Rows
+        that are no longer pending/processing are left untouched.
+        """
+        if not results:
+            return
+        now = datetime.utcnow()
+        rows = []
+        for snapshot, payscribe_response in results:
+            values = self._vend_values(payscribe_response, now)
+            rows.append({"_id": snapshot["id"], "_created_at": _snapshot_created_at(snapshot), **values})
+            snapshot.update(values, updated_at=now.isoformat())
+        table = Transaction.__table__
+        try:
+            db.session.execute(
+                update(table)
+                .where(
+                    table.c.id == bindparam("_id"),
+                    table.c.created_at == bindparam("_created_at"),
+                    # Spelled out: expanding IN parameters can't be used with executemany
+                    or_(*(table.c.status == status for status in OPEN_STATUSES))
+                )
+                .values({key: bindparam(key) for key in rows[0] if not key.startswith("_")}),
+                rows
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def fail_many(self, snapshots: List[Dict[str, Any]]) -> int:
+        """Mark many reserved purchases failed and refund them, at most once each.
+
+        One conditional UPDATE marks the lines failed; refunds are summed per
+        user into one balance UPDATE each. Returns the number of lines refunded.
+        """
+        if not snapshots:
+            return 0
+        now = datetime.utcnow()
+        try:
+            refunded = db.session.execute(
+                update(Transaction)
+                .where(
+                    Transaction.id.in_([snapshot["id"] for snapshot in snapshots]),
+                    # Prunes the scan to the partitions the lines live in
+                    Transaction.created_at.in_(sorted({_snapshot_created_at(snapshot) for snapshot in snapshots})),
+                    Transaction.status.in_(OPEN_STATUSES)
+                )
+                .values(status="failed", updated_at=now)
+                .returning(*REFUND_COLUMNS)
+            ).all()
+            refunds = defaultdict(Decimal)
+            for row in refunded:
+                refunds[row.user_id] += row.amount
+            for user_id, amount in refunds.items():
+                self.wallet_service.credit_balance(user_id, amount)
+            self.rollup_service.record(self._rollup_entry(row, refund=True) for row in refunded)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        track_debits(-len(refunded))
+
+        for snapshot in snapshots:
+            snapshot.update(status="failed", updated_at=now.isoformat())
+        return len(refunded)
+
+    def _rollup_entry(self, row, refund: bool = False) -> RollupEntry:
+        """Spend rollup entry for a reserved purchase, or its reversal for a refund."""
+        sign = -1 if refund else 1
+        return (row.user_id, row.created_at, row.type, row.network, sign * row.amount, sign)
+
+    def _vend_values(self, payscribe_response: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+        """Column values for an accepted vend: success, or processing if still pending."""
+        response_details = payscribe_response.get("message", {}).get("details", {})
+        pending = str(response_details.get("status", "")).lower() in ("pending", "processing")
+        return {
+            "status": "processing" if pending else "success",
+            "payscribe_transaction_id": response_details.get("trans_id"),
+            "payscribe_reference": response_details.get("ref"),
+            "updated_at": now,
+        }
+
+    def _save_beneficiary(self, user_id: str, phone: str, network: str, name: str = None):
+        """Save beneficiary if not exists, in a single INSERT."""
+        now = datetime.utcnow()
+        db.session.execute(
+            insert(Beneficiary.__table__)
+            .values(
+                id=generate_uuid(),
+                user_id=user_id,
+                phone=phone,
+                network=network.lower(),
+                name=name,
+                created_at=now,
+                updated_at=now
+            )
+            .on_conflict_do_nothing(index_elements=["user_id", "phone"])
+        )
+
+    def public_snapshot(self, snapshot: Dict[str, Any]) -> Dict[str, Any]:
+        """Strip internal keys from a snapshot before returning it to clients."""
+        return {key: value for key, value in snapshot.items() if key != "user_id"}
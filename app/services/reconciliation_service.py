@@ -0,0 +1,195 @@
+"""Reconciliation of open purchases against Payscribe."""
+import asyncio
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func, tuple_, or_, and_
+from app.extensions import db
+from app.models import Transaction, VendJob
+from app.integrations import AsyncPayscribeClient
+from app.services.purchase_service import PurchaseService, OPEN_STATUSES
+from app.utils.metrics import register_metrics_provider
+
+# Summary of the last reconciliation run in this process
+_last_run: Dict[str, Any] = {}
+
+# How Payscribe's requery says it has no transaction for our ref (the clients
+# hand an HTTP 404 back as a status: false body with status_code 404)
+NOT_FOUND_CODES = {404, "404"}
+NOT_FOUND_PHRASES = ("not found", "does not exist", "no record")
+
+
+def _is_not_found(response: Dict[str, Any]) -> bool:
+    """True if a ``status: false`` requery body explicitly reports an unknown transaction."""
+    if response.get("status_code") in NOT_FOUND_CODES or response.get("code") in NOT_FOUND_CODES:
+        return True
+    text = " ".join(
+        str(response.get(field)) for field in ("description", "message") if isinstance(response.get(field), str)
+    ).lower()
+    return any(phrase in text for phrase in NOT_FOUND_PHRASES)
+
+
+def classify_requery(response: Dict[str, Any]) -> str:
+    """Read a requery answer as success, failed, pending, not_found or refused.
+
+    ``refused`` is a ``status: false`` answer that says nothing about the vend.
+    """
+    if not response.get("status"):
+        return "not_found" if _is_not_found(response) else "refused"
+    details = response.get("message", {}).get("details", {})
+    status = str(details.get("status", "")).lower()
+    if status in ("success", "successful", "completed"):
+        return "success"
+    if status in ("failed", "error", "reversed", "refunded"):
+        return "failed"
+    return "pending"
+
+
+class ReconciliationService:
+    """Resolves airtime/data purchases stuck in pending or processing.
+
+    Purchases stay open when Payscribe answers 201 (pending) or a status
+    webhook is lost. Stale open rows are read in keyset order off the
+    partial (status, created_at) index, requeried concurrently, and moved
+    to success or failed through PurchaseService, whose conditional UPDATEs
+    make every transition (and refund) happen at most once.
+    """
+
+    def __init__(self):
+        self.purchase_service = PurchaseService()
+
+    def reconcile_pending(self, batch_size: int = 100, max_batches: Optional[int] = None) -> Dict[str, int]:
+        """Requery and resolve stale open purchases, ``batch_size`` at a time."""
+        summary = {"checked": 0, "succeeded": 0, "failed": 0, "still_pending": 0, "errors": 0}
+        cutoff = datetime.utcnow() - timedelta(seconds=current_app.config.get("RECONCILE_MIN_AGE_SECONDS", 300))
+        cursor = None
+        batches = 0
+
+        while max_batches is None or batches < max_batches:
+            snapshots = self._stale_batch(cutoff, batch_size, cursor)
+            if not snapshots:
+                break
+            cursor = (snapshots[-1]["created_at"], snapshots[-1]["id"])
+
+            # No connection is held while the requeries are in flight
+            responses = asyncio.run(self._requery_all(snapshots))
+            for key, count in self._apply(snapshots, responses).items():
+                summary[key] += count
+            summary["checked"] += len(snapshots)
+            batches += 1
+
+        _last_run.clear()
+        _last_run.update(summary, finished_at=datetime.utcnow().isoformat())
+        return summary
+
+    def _stale_batch(
+        self,
+        cutoff: datetime,
+        limit: int,
+        cursor: Optional[Tuple[datetime, str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Read the next page of open purchases created before ``cutoff``.
+
+        Purchases whose vend job is still queued or running are skipped; the
+        vend worker owns those. A job locked longer than
+        VEND_QUEUE_LOCK_TIMEOUT_SECONDS belongs to a dead worker, so its
+        purchase is requeried like any other.
+        """
+        stale = datetime.utcnow() - timedelta(seconds=current_app.config.get("VEND_QUEUE_LOCK_TIMEOUT_SECONDS", 300))
+        queued = db.session.query(VendJob.id).filter(
+            VendJob.transaction_id == Transaction.id,
+            or_(
+                VendJob.status == "queued",
+                and_(VendJob.status == "processing", VendJob.locked_at >= stale)
+            )
+        ).exists()
+        query = db.session.query(
+            Transaction.id,
+            Transaction.user_id,
+            Transaction.amount,
+            Transaction.reference,
+            Transaction.payscribe_transaction_id,
+            Transaction.created_at
+        ).filter(
+            Transaction.status.in_(OPEN_STATUSES),
+            Transaction.created_at < cutoff,
+            Transaction.type.in_(["airtime", "data"]),
+            ~queued
+        )
+        if cursor:
+            query = query.filter(tuple_(Transaction.created_at, Transaction.id) > cursor)
+        try:
+            rows = query.order_by(Transaction.created_at, Transaction.id).limit(limit).all()
+        finally:
+            db.session.close()
+        return [row._asdict() for row in rows]
+
+    async def _requery_all(self, snapshots: List[Dict[str, Any]]) -> List[Any]:
+        """Requery a batch concurrently with a bounded number of calls in flight."""
+        semaphore = asyncio.Semaphore(current_app.config.get("RECONCILE_CONCURRENCY", 5))
+
+        async with AsyncPayscribeClient() as client:
+            async def requery(snapshot):
+                async with semaphore:
+                    return await client.requery_transaction(
+                        trans_id=snapshot["payscribe_transaction_id"],
+                        ref=snapshot["reference"]
+                    )
+
+            return await asyncio.gather(*(requery(snapshot) for snapshot in snapshots), return_exceptions=True)
+
+    def _apply(self, snapshots: List[Dict[str, Any]], responses: List[Any]) -> Dict[str, int]:
+        """Apply requery results: one UPDATE for successes, one for failures."""
+        not_found_cutoff = datetime.utcnow() - timedelta(
+            seconds=current_app.config.get("RECONCILE_NOT_FOUND_FAIL_SECONDS", 3600)
+        )
+        succeeded, failed = [], []
+        still_pending = errors = 0
+
+        for snapshot, response in zip(snapshots, responses):
+            if isinstance(response, Exception):
+                # Transport errors and breaker rejections are retried next run
+                current_app.logger.warning(f"Requery failed for {snapshot['reference']}: {str(response)}")
+                errors += 1
+                continue
+
+            # Every vend sends our ref, so an unknown ref never reached Payscribe;
+            # any other refusal says nothing about the vend and is retried next run
+            outcome = classify_requery(response)
+            if outcome == "refused":
+                current_app.logger.warning(
+                    f"Requery for {snapshot['reference']} returned status false: "
+                    f"{response.get('description') or response.get('message')}"
+                )
+                still_pending += 1
+            elif outcome == "success":
+                succeeded.append((snapshot, response))
+            elif outcome == "failed" or (outcome == "not_found" and snapshot["created_at"] < not_found_cutoff):
+                failed.append(snapshot)
+            else:
+                still_pending += 1
+
+        self.purchase_service.complete_many(succeeded)
+        refunded = self.purchase_service.fail_many(failed)
+        return {
+            "succeeded": len(succeeded),
+            "failed": refunded,
+            "still_pending": still_pending,
+            "errors": errors,
+        }
+
+
+def get_reconciliation_stats() -> Dict[str, Any]:
+    """Get size and age of the open purchase backlog, and the last run summary."""
+    count, oldest = db.session.query(func.count(Transaction.id), func.min(Transaction.created_at)).filter(
+        Transaction.status.in_(OPEN_STATUSES),
+        Transaction.type.in_(["airtime", "data"])
+    ).one()
+    return {
+        "open_purchases": count,
+        "oldest_open_age_seconds": (datetime.utcnow() - oldest).total_seconds() if oldest else 0,
+        "last_run": dict(_last_run),
+    }
+
+
+register_metrics_provider("reconciliation", get_reconciliation_stats)
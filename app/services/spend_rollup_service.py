@@ -0,0 +1,182 @@
+"""Per-user daily spend rollups."""
+from typing import Dict, Any, Iterable, Optional, Tuple
+from collections import defaultdict
+from datetime import datetime, date, timedelta
+from decimal import Decimal
+from sqlalchemy import and_, or_, delete, func, literal, select, text, true, union_all
+from sqlalchemy.dialects.postgresql import insert
+from app.extensions import db
+from app.models import DailySpendRollup, Transaction, ArchivedTransaction
+
+# Purchases count as spent from the debit on; failing one refunds it and subtracts it again
+SPEND_TYPES = ["airtime", "data"]
+SPENT_STATUSES = ["pending", "processing", "success"]
+
+# (user_id, created_at, type, network, amount, count)
+RollupEntry = Tuple[str, datetime, str, Optional[str], Decimal, int]
+
+
+class SpendRollupService:
+    """Maintains daily_spend_rollups and answers spending summaries from it.
+
+    Purchase, refund and credit paths call ``record`` inside their own
+    transaction, so a rollup never disagrees with committed transactions.
+    ``rebuild`` recomputes rows from transactions for backfills and repairs.
+    """
+
+    def record(self, entries: Iterable[RollupEntry]) -> None:
+        """Add entries to their rollup rows with one INSERT ... ON CONFLICT DO UPDATE.
+
+        Refunds are entries with a negative amount and count. Entries for the
+        same row are summed first (a statement cannot update a row twice).
+        Does not commit.
+        """
+        totals = defaultdict(lambda: [Decimal("0"), 0])
+        for user_id, created_at, transaction_type, network, amount, count in entries:
+            total = totals[(user_id, created_at.date(), transaction_type, network or "")]
+            total[0] += Decimal(str(amount))
+            total[1] += count
+        if not totals:
+            return
+
+        now = datetime.utcnow()
+        # Sorted so concurrent writers lock shared rows in the same order
+        rows = [
+            {
+                "user_id": user_id,
+                "day": day,
+                "type": transaction_type,
+                "network": network,
+                "amount": amount,
+                "count": count,
+                "updated_at": now,
+            }
+            for (user_id, day, transaction_type, network), (amount, count) in sorted(totals.items())
+        ]
+        table = DailySpendRollup.__table__
+        statement = insert(table).values(rows)
+        db.session.execute(
+            statement.on_conflict_do_update(
+                index_elements=["user_id", "day", "type", "network"],
+                set_={
+                    "amount": table.c.amount + statement.excluded.amount,
+                    "count": table.c.count + statement.excluded.count,
+                    "updated_at": statement.excluded.updated_at,
+                }
+            )
+        )
+
+    def get_summary(self, user_id: str, today: Optional[date] = None) -> Dict[str, Any]:
+        """Spending and funding for the current week (from Monday) and month, by type and network.
+
+        Reads at most about a month of rollup rows, whatever the history size.
+        """
+        today = today or datetime.utcnow().date()
+        periods = {
+            "week": today - timedelta(days=today.weekday()),
+            "month": today.replace(day=1),
+        }
+        rows = db.session.query(
+            DailySpendRollup.day,
+            DailySpendRollup.type,
+            DailySpendRollup.network,
+            DailySpendRollup.amount,
+            DailySpendRollup.count
+        ).filter(
+            DailySpendRollup.user_id == user_id,
+            DailySpendRollup.day >= min(periods.values()),
+            DailySpendRollup.day <= today,
+            # Skip rows whose purchases were all refunded
+            DailySpendRollup.count != 0
+        ).all()
+
+        summary = {}
+        for name, start in periods.items():
+            spent = {"amount": Decimal("0"), "count": 0, "by_type": {}, "by_network": {}}
+            credited = {"amount": Decimal("0"), "count": 0}
+            for row in rows:
+                if row.day < start:
+                    continue
+                if row.type == "credit":
+                    credited["amount"] += row.amount
+                    credited["count"] += row.count
+                    continue
+                spent["amount"] += row.amount
+                spent["count"] += row.count
+                for group, key in (("by_type", row.type), ("by_network", row.network)):
+                    bucket = spent[group].setdefault(key, {"amount": Decimal("0"), "count": 0})
+                    bucket["amount"] += row.amount
+                    bucket["count"] += row.count
+            summary[name] = {
+                "start_date": start.isoformat(),
+                "spent": self._serialize(spent),
+                "credited": self._serialize(credited),
+            }
+        return summary
+
+    def _serialize(self, totals: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert Decimal amounts to floats, recursively, like the models' to_dict()."""
+        return {
+            key: float(value) if isinstance(value, Decimal)
+            else self._serialize(value) if isinstance(value, dict)
+            else value
+            for key, value in totals.items()
+        }
+
+    def rebuild(self, since: Optional[date] = None) -> int:
+        """Recompute rollups from transactions, for all days or from ``since`` on.
+
+        Runs as one DELETE and one INSERT ... SELECT in a single commit,
+        after locking daily_spend_rollups in SHARE ROW EXCLUSIVE mode. The
+        lock waits for open transactions that already called ``record`` and
+        makes new ``record`` calls wait until the rebuild commits, so a
+        purchase committing mid-rebuild is neither lost nor counted twice.
+        Purchases stall for the rebuild's duration; use ``since`` to keep it
+        short on a live system. Reads archived transactions too. Returns the
+        number of rows written.
+        """
+        counted = union_all(*[
+            select(
+                model.user_id,
+                model.created_at,
+                model.type,
+                model.network,
+                model.amount
+            ).where(or_(
+                and_(model.type.in_(SPEND_TYPES), model.status.in_(SPENT_STATUSES)),
+                and_(model.type == "credit", model.status == "success")
+            )).where(
+                model.created_at >= datetime.combine(since, datetime.min.time()) if since else true()
+            )
+            for model in (Transaction, ArchivedTransaction)
+        ]).subquery()
+        day = func.date(counted.c.created_at)
+        network = func.coalesce(counted.c.network, "")
+        source = select(
+            counted.c.user_id,
+            day,
+            counted.c.type,
+            network,
+            func.sum(counted.c.amount),
+            func.count(),
+            literal(datetime.utcnow())
+        ).group_by(counted.c.user_id, day, counted.c.type, network)
+
+        clear = delete(DailySpendRollup)
+        if since:
+            clear = clear.where(DailySpendRollup.day >= since)
+
+        try:
+            db.session.execute(text(f"LOCK TABLE {DailySpendRollup.__tablename__} IN SHARE ROW EXCLUSIVE MODE"))
+            db.session.execute(clear)
+            written = db.session.execute(
+                DailySpendRollup.__table__.insert().from_select(
+                    ["user_id", "day", "type", "network", "amount", "count", "updated_at"],
+                    source
+                )
+            ).rowcount
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return written
@@ -1,43 +1,364 @@
 """Transaction service."""
-from typing import Dict, Any, List, Optional
-from datetime import datetime
-from app.models import Transaction
-from app.errors.exceptions import NotFoundException
+import io
+import csv
+import json
+import heapq
+from itertools import islice
+from typing import Dict, Any, List, Optional, Iterator, Mapping, Tuple, Union
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from flask import current_app
+from sqlalchemy import bindparam, func, select, tuple_, update
+from app.extensions import db
+from app.models import Transaction, ArchivedTransaction, TransactionRow
+from app.errors.exceptions import NotFoundException, ValidationException
+from app.utils.cache import TTLCache, with_app_context
+from app.utils.pagination import encode_cursor, decode_cursor, clamp_limit
+from app.utils.partitions import ensure_default_partition, ensure_monthly_partitions
+from app.utils.helpers import format_phone_number
+from app.utils.constants import TRANSACTION_TYPES, TRANSACTION_STATUSES, NETWORKS
+
+EXPORT_FORMATS = ("csv", "ndjson")
+EXPORT_COLUMNS = [
+    "id", "created_at", "type", "status", "amount", "reference",
+    "network", "phone", "payscribe_transaction_id", "description"
+]
+
+# Per-user transaction counts keyed by (user_id, filters); counting a long history is a full range scan.
+# Bounded, since every user and filter combination adds a key in every worker process.
+COUNT_CACHE_MAX_ENTRIES = 10000
+_count_cache = TTLCache("transaction_counts", max_entries=COUNT_CACHE_MAX_ENTRIES)
 
 
 class TransactionService:
     """Service for transaction operations."""
     
+    def parse_filters(self, args: Mapping[str, str]) -> Dict[str, Any]:
+        """Validate history filters from query parameters into typed values.
+        
+        Supported: type, status, network, phone (full number or prefix, any
+        format), start_date/end_date (ISO 8601, end exclusive) and
+        min_amount/max_amount.
+        """
+        filters = {}
+        for name, allowed in (("type", TRANSACTION_TYPES), ("status", TRANSACTION_STATUSES), ("network", NETWORKS)):
+            value = (args.get(name) or "").lower()
+            if value:
+                if value not in allowed:
+                    raise ValidationException(f"Invalid {name}. Must be one of: {', '.join(allowed)}")
+                filters[name] = value
+        
+        if args.get("phone"):
+            phone = format_phone_number(args["phone"])
+            if len(phone) <= 3:
+                raise ValidationException("Invalid phone")
+            filters["phone"] = phone
+        
+        for name in ("start_date", "end_date"):
+            if args.get(name):
+                try:
+                    filters[name] = datetime.fromisoformat(args[name])
+                except ValueError:
+                    raise ValidationException(f"{name} must be an ISO 8601 date or datetime")
+        
+        for name in ("min_amount", "max_amount"):
+            if args.get(name):
+                try:
+                    filters[name] = Decimal(args[name])
+                except InvalidOperation:
+                    raise ValidationException(f"{name} must be a number")
+        return filters
+    
+    def _filtered(self, query, user_id: str, filters: Dict[str, Any], model=Transaction):
+        """Apply the user scope and parse_filters() filters to a Query or select() on ``model``.
+        
+        ``model`` is Transaction or ArchivedTransaction, which share their columns.
+        """
+        query = query.where(model.user_id == user_id)
+        if filters.get("type"):
+            query = query.where(model.type == filters["type"])
+        if filters.get("status"):
+            query = query.where(model.status == filters["status"])
+        if filters.get("network"):
+            query = query.where(model.network == filters["network"])
+        if filters.get("phone"):
+            # A full number is an exact match; a shorter one a prefix match, both on the pattern_ops index
+            if len(filters["phone"]) >= 13:
+                query = query.where(model.recipient_phone == filters["phone"])
+            else:
+                query = query.where(model.recipient_phone.startswith(filters["phone"], autoescape=True))
+        if filters.get("start_date"):
+            query = query.where(model.created_at >= filters["start_date"])
+        if filters.get("end_date"):
+            query = query.where(model.created_at < filters["end_date"])
+        if filters.get("min_amount") is not None:
+            query = query.where(model.amount >= filters["min_amount"])
+        if filters.get("max_amount") is not None:
+            query = query.where(model.amount <= filters["max_amount"])
+        return query
+    
     def get_transactions(
         self,
         user_id: str,
-        transaction_type: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None,
         limit: int = 50,
-        offset: int = 0
+        cursor: Optional[str] = None,
+        offset: int = 0,
+        include_total: bool = False
     ) -> Dict[str, Any]:
-        """Get user transactions with optional filtering."""
-        query = Transaction.query.filter_by(user_id=user_id)
+        """Get a page of user transactions, newest first.
         
-        if transaction_type:
-            query = query.filter_by(type=transaction_type)
+        Pages are keyset-paginated on (created_at, id): pass the previous
+        page's ``next_cursor`` as ``cursor``. Each page is a bounded range
+        scan of the (user_id[, type|network], created_at DESC, id DESC)
+        indexes however deep it is; ``filters`` come from parse_filters().
+        ``offset`` is still honoured for old clients when no cursor is
+        given. The total is only counted when asked for, and cached for
+        TRANSACTION_COUNT_CACHE_TTL seconds.
         
-        # Order by created_at descending
-        query = query.order_by(Transaction.created_at.desc())
+        Archived transactions are merged in only when a page reaches back
+        to the user's newest archived row, so recent pages never touch
+        transactions_archive.
+        """
+        filters = filters or {}
+        limit = clamp_limit(limit)
+        position = decode_cursor(cursor) if cursor else None
+        if cursor:
+            offset = 0
         
-        total = query.count()
-        transactions = query.limit(limit).offset(offset).all()
+        # One extra row tells whether another page exists
+        window = limit + 1
+        transactions = self._history(Transaction, user_id, filters, position, offset=offset, limit=window)
+        archived_until = self._archived_until(user_id)
+        if archived_until and (len(transactions) < window or transactions[-1].created_at <= archived_until):
+            if offset:
+                transactions = self._history(Transaction, user_id, filters, position, limit=offset + window)
+            archived = self._history(ArchivedTransaction, user_id, filters, position, limit=offset + window)
+            transactions = list(islice(
+                heapq.merge(transactions, archived, key=lambda t: (t.created_at, t.id), reverse=True),
+                offset,
+                offset + window
+            ))
+        has_more = len(transactions) > limit
+        transactions = transactions[:limit]
         
-        return {
+        result = {
             "transactions": [t.to_dict() for t in transactions],
-            "total": total,
             "limit": limit,
-            "offset": offset
+            "next_cursor": encode_cursor(transactions[-1].created_at, transactions[-1].id) if has_more else None,
+            "has_more": has_more
         }
+        if offset and not cursor:
+            result["offset"] = offset
+        if include_total:
+            result["total"] = self.count_transactions(user_id, filters)
+        return result
     
-    def get_transaction(self, transaction_id: str, user_id: str) -> Transaction:
-        """Get a specific transaction."""
-        transaction = Transaction.query.filter_by(id=transaction_id, user_id=user_id).first()
+    def _history(
+        self,
+        model,
+        user_id: str,
+        filters: Dict[str, Any],
+        position: Optional[Tuple[datetime, str]],
+        offset: int = 0,
+        limit: int = 50
+    ) -> List[TransactionRow]:
+        """Read history rows from ``model`` in page order, starting after the decoded cursor ``position``.
+        
+        Selects only the listed columns into TransactionRow tuples; pages
+        are read-only, so they skip the ORM.
+        """
+        statement = self._filtered(TransactionRow.select_from(model), user_id, filters, model)
+        statement = statement.order_by(model.created_at.desc(), model.id.desc())
+        if position:
+            # The plain created_at bound lets the planner skip newer partitions
+            statement = statement.where(
+                model.created_at <= position[0],
+                tuple_(model.created_at, model.id) < position
+            )
+        if offset:
+            statement = statement.offset(offset)
+        return [TransactionRow._make(row) for row in db.session.execute(statement.limit(limit))]
+    
+    def _archived_until(self, user_id: str) -> Optional[datetime]:
+        """Creation time of the user's newest archived transaction (one index probe)."""
+        return db.session.query(func.max(ArchivedTransaction.created_at)).filter(
+            ArchivedTransaction.user_id == user_id
+        ).scalar()
+    
+    def count_transactions(self, user_id: str, filters: Optional[Dict[str, Any]] = None) -> int:
+        """Count a user's transactions matching ``filters``, cached briefly."""
+        filters = filters or {}
+        
+        def load():
+            return sum(
+                self._filtered(model.query, user_id, filters, model).count()
+                for model in (Transaction, ArchivedTransaction)
+            )
+        
+        return _count_cache.get_or_load(
+            (user_id, tuple(sorted(filters.items()))),
+            with_app_context(load),
+            ttl=current_app.config.get("TRANSACTION_COUNT_CACHE_TTL", 60)
+        )
+    
+    def export_transactions(
+        self,
+        user_id: str,
+        export_format: str = "csv",
+        filters: Optional[Dict[str, Any]] = None,
+        chunk_rows: int = 500
+    ) -> Iterator[str]:
+        """Stream a user's transaction history as CSV or NDJSON, newest first.
+        
+        ``filters`` come from parse_filters(). Only the exported columns are selected and rows are fetched from a
+        server-side cursor ``chunk_rows`` at a time, so memory stays flat
+        however long the history is. Output is yielded in chunks of
+        ``chunk_rows`` rows; the CSV header is yielded before the query runs.
+        """
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationException(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+        # Validated eagerly: a generator would only raise once the response had started
+        return self._stream_export(user_id, export_format, filters or {}, chunk_rows)
+    
+    def _stream_export(
+        self,
+        user_id: str,
+        export_format: str,
+        filters: Dict[str, Any],
+        chunk_rows: int
+    ) -> Iterator[str]:
+        """Generate the export chunks for export_transactions.
+        
+        Live transactions are exported first, then archived ones (which are
+        older than all but a few long-open purchases).
+        """
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS) if export_format == "csv" else None
+        if writer:
+            writer.writeheader()
+            yield buffer.getvalue()
+        
+        for model in (Transaction, ArchivedTransaction):
+            statement = select(
+                model.id,
+                model.created_at,
+                model.type,
+                model.status,
+                model.amount,
+                model.reference,
+                model.network,
+                model.recipient_phone,
+                model.payscribe_transaction_id,
+                model.description
+            )
+            statement = self._filtered(statement, user_id, filters, model).order_by(model.created_at.desc(), model.id.desc())
+            
+            result = db.session.execute(statement.execution_options(yield_per=chunk_rows))
+            try:
+                for rows in result.partitions():
+                    buffer.seek(0)
+                    buffer.truncate()
+                    for row in rows:
+                        record = self._export_record(row)
+                        if writer:
+                            writer.writerow(record)
+                        else:
+                            buffer.write(json.dumps(record) + "\n")
+                    yield buffer.getvalue()
+            finally:
+                # Also runs when the client disconnects mid-download
+                result.close()
+    
+    def _export_record(self, row) -> Dict[str, Any]:
+        """Flatten one exported row."""
+        return {
+            "id": row.id,
+            "created_at": row.created_at.isoformat(),
+            "type": row.type,
+            "status": row.status,
+            "amount": str(row.amount),
+            "reference": row.reference,
+            "network": row.network,
+            "phone": row.recipient_phone,
+            "payscribe_transaction_id": row.payscribe_transaction_id,
+            "description": row.description
+        }
+    
+    def backfill_search_columns(self, batch_size: int = 1000) -> int:
+        """Copy network and phone from details into their columns for older purchases.
+        
+        Walks airtime/data transactions in id order, one batch per commit.
+        Returns the number of rows updated.
+        """
+        updated = 0
+        cursor = ""
+        while True:
+            rows = db.session.query(Transaction.id, Transaction.details).filter(
+                Transaction.type.in_(["airtime", "data"]),
+                Transaction.recipient_phone.is_(None),
+                Transaction.id > cursor
+            ).order_by(Transaction.id).limit(batch_size).all()
+            if not rows:
+                return updated
+            cursor = rows[-1].id
+            
+            values = [
+                {"_id": row.id, "network": (row.details or {}).get("network"), "recipient_phone": (row.details or {}).get("phone")}
+                for row in rows
+                if (row.details or {}).get("phone")
+            ]
+            if values:
+                db.session.execute(
+                    update(Transaction.__table__).where(Transaction.id == bindparam("_id")),
+                    values
+                )
+            db.session.commit()
+            updated += len(values)
+    
+    def find_transaction(
+        self,
+        reference: Optional[str] = None,
+        payscribe_transaction_id: Optional[str] = None
+    ) -> Optional[Union[Transaction, ArchivedTransaction]]:
+        """Find a transaction by reference or Payscribe trans_id, trying recent partitions first.
+        
+        Status webhooks and requeries almost always concern purchases from
+        the last few days, so the first lookup is limited to the recent
+        partitions; older months are only scanned when that misses, and the
+        archive last. Archived transactions are always final.
+        """
+        if payscribe_transaction_id:
+            column = "payscribe_transaction_id"
+            value = payscribe_transaction_id
+        elif reference:
+            column = "reference"
+            value = reference
+        else:
+            return None
+        
+        condition = getattr(Transaction, column) == value
+        recent_since = datetime.utcnow() - timedelta(days=current_app.config.get("TRANSACTION_LOOKUP_RECENT_DAYS", 31))
+        transaction = Transaction.query.filter(condition, Transaction.created_at >= recent_since).first()
+        if transaction is None:
+            transaction = Transaction.query.filter(condition, Transaction.created_at < recent_since).first()
+        if transaction is None:
+            transaction = ArchivedTransaction.query.filter(getattr(ArchivedTransaction, column) == value).first()
+        return transaction
+    
+    def ensure_partitions(self, months_ahead: Optional[int] = None) -> List[str]:
+        """Create the default partition and monthly transactions partitions up to ``months_ahead`` months from now."""
+        if months_ahead is None:
+            months_ahead = current_app.config.get("TRANSACTION_PARTITION_MONTHS_AHEAD", 3)
+        ensure_default_partition(Transaction.__tablename__)
+        return ensure_monthly_partitions(Transaction.__tablename__, datetime.utcnow(), months_ahead)
+    
+    def get_transaction(self, transaction_id: str, user_id: str) -> Union[Transaction, ArchivedTransaction]:
+        """Get a specific transaction, from the archive if it has been archived."""
+        transaction = (
+            Transaction.query.filter_by(id=transaction_id, user_id=user_id).first()
+            or ArchivedTransaction.query.filter_by(id=transaction_id, user_id=user_id).first()
+        )
         if not transaction:
             raise NotFoundException("Transaction not found")
         return transaction
-
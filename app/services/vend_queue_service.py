@@ -0,0 +1,192 @@
+"""Vend queue service for async-mode purchases."""
+from typing import Dict, Any, List, Optional
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func, or_, and_
+from app.extensions import db
+from app.models import VendJob, Transaction
+from app.integrations import PayscribeClient
+from app.services.purchase_service import PurchaseService
+from app.services.reconciliation_service import classify_requery
+from app.utils.metrics import register_metrics_provider
+from app.errors.exceptions import PayscribeAPIException, PayscribeUnavailableException
+
+
+class VendQueueService:
+    """Claims queued vend jobs and performs the Payscribe call for each."""
+
+    def __init__(self):
+        self.payscribe_client = PayscribeClient()
+        self.purchase_service = PurchaseService()
+
+    def claim_jobs(self, limit: int = 5) -> List[Dict[str, Any]]:
+        """Claim up to ``limit`` due jobs with FOR UPDATE SKIP LOCKED.
+
+        Claimed jobs are moved to processing and committed before any vend
+        starts, so the row locks are held only for the claim itself. Jobs
+        left in processing longer than VEND_QUEUE_LOCK_TIMEOUT_SECONDS (a
+        worker died mid-vend) are claimed again as ``reclaimed``, unless
+        their transaction has moved on from pending meanwhile.
+        """
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=current_app.config.get("VEND_QUEUE_LOCK_TIMEOUT_SECONDS", 300))
+        try:
+            rows = (
+                db.session.query(VendJob, Transaction)
+                .join(Transaction, Transaction.id == VendJob.transaction_id)
+                .filter(or_(
+                    and_(VendJob.status == "queued", VendJob.run_after <= now),
+                    and_(VendJob.status == "processing", VendJob.locked_at < stale)
+                ))
+                .order_by(VendJob.run_after)
+                .limit(limit)
+                .with_for_update(skip_locked=True, of=VendJob)
+                .all()
+            )
+            claimed = []
+            for job, transaction in rows:
+                if transaction.status != "pending":
+                    # Payscribe accepted it or reconciliation settled it: vending again could double-vend
+                    job.update_status("failed" if transaction.status in ("failed", "refunded") else "done")
+                    job.locked_at = None
+                    continue
+                reclaimed = job.status == "processing"
+                job.status = "processing"
+                job.locked_at = now
+                job.attempts += 1
+                snapshot = transaction.to_dict()
+                snapshot["user_id"] = transaction.user_id
+                claimed.append({
+                    "id": job.id,
+                    "attempts": job.attempts,
+                    "reclaimed": reclaimed,
+                    "payload": job.payload,
+                    "transaction": snapshot,
+                })
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            db.session.close()
+        return claimed
+
+    def process_job(self, job: Dict[str, Any]) -> str:
+        """Vend one claimed job and finalize its transaction.
+
+        Only an explicit ``status: false`` answer (or running out of retries
+        for calls rejected before reaching Payscribe) fails and refunds the
+        purchase. Returns the job's new status.
+        """
+        payload = job["payload"]
+        transaction = job["transaction"]
+        if job.get("reclaimed"):
+            status = self._settle_reclaimed(job)
+            if status is not None:
+                return status
+        try:
+            if payload["kind"] == "airtime":
+                response = self.payscribe_client.vend_airtime(
+                    network=payload["network"],
+                    amount=payload["amount"],
+                    recipient=payload["recipient"],
+                    ref=transaction["reference"]
+                )
+            else:
+                response = self.payscribe_client.vend_data(
+                    network=payload["network"],
+                    plan=payload["plan"],
+                    recipient=payload["recipient"],
+                    ref=transaction["reference"]
+                )
+        except PayscribeUnavailableException as e:
+            # Rejected before reaching Payscribe: safe to retry later
+            if job["attempts"] < current_app.config.get("VEND_QUEUE_MAX_ATTEMPTS", 5):
+                return self._retry(job, str(e))
+            return self._fail(job, str(e))
+        except PayscribeAPIException as e:
+            # Timeouts and 5xx say nothing about the vend: the job stays in processing
+            # and is requeried by _settle_reclaimed once its lock times out
+            current_app.logger.warning(f"Vend job {job['id']} outcome unknown: {e.message}")
+            self._set_status(job["id"], "processing", e.message)
+            return "processing"
+
+        if not response.get("status"):
+            return self._fail(job, response.get("description", "Vend failed"))
+
+        self.purchase_service.complete(transaction, response, beneficiary=payload.get("beneficiary"))
+        self._set_status(job["id"], "done")
+        return "done"
+
+    def run_once(self, batch_size: int = 5) -> int:
+        """Claim and process one batch of jobs. Returns the number processed."""
+        jobs = self.claim_jobs(batch_size)
+        for job in jobs:
+            try:
+                self.process_job(job)
+            except Exception as e:
+                current_app.logger.error(f"Vend job {job['id']} failed: {str(e)}", exc_info=True)
+        return len(jobs)
+
+    def _settle_reclaimed(self, job: Dict[str, Any]) -> Optional[str]:
+        """Settle a job reclaimed from a dead worker from Payscribe's requery answer.
+
+        The dead worker may have vended already, so the job is vended again
+        only after an explicit not-found; returns None in that case, else the
+        job's new status. Without a final answer the job stays in processing
+        and is requeried when its lock times out again.
+        """
+        transaction = job["transaction"]
+        try:
+            response = self.payscribe_client.requery_transaction(
+                trans_id=transaction.get("payscribe_transaction_id"),
+                ref=transaction["reference"]
+            )
+        except PayscribeAPIException as e:
+            current_app.logger.warning(f"Requery for reclaimed vend job {job['id']} failed: {e.message}")
+            return "processing"
+
+        outcome = classify_requery(response)
+        if outcome == "not_found":
+            return None
+        if outcome == "success":
+            self.purchase_service.complete(transaction, response, beneficiary=job["payload"].get("beneficiary"))
+            self._set_status(job["id"], "done")
+            return "done"
+        if outcome == "failed":
+            return self._fail(job, "Payscribe reports the vend failed")
+        return "processing"
+
+    def _retry(self, job: Dict[str, Any], error: str) -> str:
+        backoff = current_app.config.get("VEND_QUEUE_RETRY_BACKOFF", 15) * (2 ** (job["attempts"] - 1))
+        self._set_status(job["id"], "queued", error, run_after=datetime.utcnow() + timedelta(seconds=backoff))
+        return "queued"
+
+    def _fail(self, job: Dict[str, Any], error: str) -> str:
+        current_app.logger.warning(f"Vend job {job['id']} failed: {error}")
+        self.purchase_service.fail(job["transaction"])
+        self._set_status(job["id"], "failed", error)
+        return "failed"
+
+    def _set_status(self, job_id: str, status: str, error: str = None, run_after: datetime = None):
+        job = db.session.get(VendJob, job_id)
+        job.update_status(status, error)
+        if run_after:
+            job.run_after = run_after
+        db.session.commit()
+
+
+def get_vend_queue_stats() -> Dict[str, Any]:
+    """Get queue depth and age of the oldest queued job."""
+    count, oldest = db.session.query(func.count(VendJob.id), func.min(VendJob.created_at)).filter(
+        VendJob.status == "queued"
+    ).one()
+    processing = db.session.query(func.count(VendJob.id)).filter(VendJob.status == "processing").scalar()
+    return {
+        "queued": count,
+        "processing": processing,
+        "oldest_queued_age_seconds": (datetime.utcnow() - oldest).total_seconds() if oldest else 0,
+    }
+
+
+register_metrics_provider("vend_queue", get_vend_queue_stats)
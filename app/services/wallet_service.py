@@ -1,11 +1,15 @@
 """Wallet service."""
 from typing import Dict, Any, Optional
+from datetime import datetime
 from decimal import Decimal
 from flask import current_app
+from sqlalchemy import update, values, column, String, Numeric
+from sqlalchemy.dialects.postgresql import insert
 from app.extensions import db
-from app.models import Wallet, User, Transaction
+from app.models import Wallet, User, Transaction, FundingCredit
 from app.integrations import PayscribeClient
-from app.utils.helpers import generate_ref
+from app.services.spend_rollup_service import SpendRollupService
+from app.utils.helpers import generate_ref, generate_uuid
 from app.errors.exceptions import NotFoundException, ValidationException, InsufficientBalanceException
 
 
@@ -14,6 +18,7 @@ class WalletService:
     
     def __init__(self):
         self.payscribe_client = PayscribeClient()
+        self.rollup_service = SpendRollupService()
     
     def create_wallet_with_virtual_account(self, user_id: str) -> Wallet:
         """Create wallet and Payscribe virtual account for user."""
@@ -114,6 +119,50 @@ class WalletService:
         wallet = self.get_wallet(user_id)
         return wallet.to_dict()
     
+    def debit_balance(self, user_id: str, amount: Decimal) -> Decimal:
+        """Atomically debit wallet balance and return the new balance.
+        
+        Runs a single conditional UPDATE ... WHERE balance >= amount RETURNING
+        balance, so concurrent debits can never overdraw the wallet. Does not
+        commit.
+        """
+        if amount <= 0:
+            raise ValidationException("Invalid debit amount")
+        
+        new_balance = db.session.execute(
+            update(Wallet)
+            .where(Wallet.user_id == user_id, Wallet.balance >= amount)
+            .values(balance=Wallet.balance - amount)
+            .returning(Wallet.balance)
+        ).scalar_one_or_none()
+        
+        if new_balance is None:
+            # Only reached on failure: tell a missing wallet apart from a short balance
+            if not db.session.query(Wallet.id).filter_by(user_id=user_id).first():
+                raise NotFoundException("Wallet not found")
+            raise InsufficientBalanceException()
+        return new_balance
+    
+    def credit_balance(self, user_id: str, amount: Decimal) -> Decimal:
+        """Atomically credit wallet balance and return the new balance.
+        
+        Runs a single UPDATE ... SET balance = balance + amount RETURNING
+        balance. Does not commit.
+        """
+        if amount <= 0:
+            raise ValidationException("Invalid credit amount")
+        
+        new_balance = db.session.execute(
+            update(Wallet)
+            .where(Wallet.user_id == user_id)
+            .values(balance=Wallet.balance + amount)
+            .returning(Wallet.balance)
+        ).scalar_one_or_none()
+        
+        if new_balance is None:
+            raise NotFoundException("Wallet not found")
+        return new_balance
+    
     def credit_wallet(
         self,
         user_id: str,
@@ -123,10 +172,7 @@ class WalletService:
         payscribe_trans_id: Optional[str] = None
     ) -> Transaction:
         """Credit wallet balance."""
-        wallet = self.get_wallet(user_id)
-        
-        if not wallet.credit(amount):
-            raise ValidationException("Invalid credit amount")
+        self.credit_balance(user_id, amount)
         
         # Create credit transaction
         transaction = Transaction(
@@ -140,10 +186,91 @@ class WalletService:
         transaction.payscribe_transaction_id = payscribe_trans_id
         
         db.session.add(transaction)
+        db.session.flush()
+        self.rollup_service.record([(user_id, transaction.created_at, "credit", None, amount, 1)])
         db.session.commit()
         
         return transaction
     
+    def credit_balances(self, credits: Dict[str, Decimal]) -> int:
+        """Credit many wallets in one UPDATE ... FROM (VALUES ...) statement.
+        
+        ``credits`` maps user_id to the total amount to add. Does not commit.
+        Returns the number of wallets updated.
+        """
+        if not credits:
+            return 0
+        if any(amount <= 0 for amount in credits.values()):
+            raise ValidationException("Invalid credit amount")
+        
+        credit_values = values(
+            column("user_id", String),
+            column("amount", Numeric(12, 2)),
+            name="credits"
+        ).data(list(credits.items()))
+        return db.session.execute(
+            update(Wallet)
+            .where(Wallet.user_id == credit_values.c.user_id)
+            .values(balance=Wallet.balance + credit_values.c.amount)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    
+    def credit_collection(
+        self,
+        user_id: str,
+        amount: Decimal,
+        payscribe_trans_id: str,
+        account_number: str
+    ) -> Optional[str]:
+        """Credit a virtual-account collection once per Payscribe trans_id.
+        
+        Shared by the funding webhook and funding reconciliation. The
+        collection is claimed in funding_credits with INSERT ... ON CONFLICT
+        DO NOTHING, and the credit transaction and balance update only happen
+        if the claim went through, all in one commit, so concurrent
+        deliveries cannot double-credit. Returns the credit transaction id,
+        or None if the collection was already credited.
+        """
+        if amount <= 0:
+            raise ValidationException("Invalid credit amount")
+        
+        now = datetime.utcnow()
+        try:
+            transaction_id = db.session.execute(
+                insert(FundingCredit.__table__)
+                .values(
+                    payscribe_transaction_id=payscribe_trans_id,
+                    transaction_id=generate_uuid(),
+                    user_id=user_id,
+                    created_at=now
+                )
+                .on_conflict_do_nothing(index_elements=["payscribe_transaction_id"])
+                .returning(FundingCredit.transaction_id)
+            ).scalar()
+            if transaction_id:
+                db.session.execute(
+                    insert(Transaction.__table__).values(
+                        id=transaction_id,
+                        user_id=user_id,
+                        type="credit",
+                        status="success",
+                        amount=amount,
+                        reference=generate_ref("CR"),
+                        payscribe_transaction_id=payscribe_trans_id,
+                        details={},
+                        description=f"Wallet funding via virtual account {account_number}",
+                        created_at=now,
+                        updated_at=now
+                    )
+                )
+                self.credit_balance(user_id, amount)
+                self.rollup_service.record([(user_id, now, "credit", None, amount, 1)])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return transaction_id
+    
     def debit_wallet(
         self,
         user_id: str,
@@ -152,14 +279,7 @@ class WalletService:
         description: str = "Wallet debit"
     ) -> bool:
         """Debit wallet balance."""
-        wallet = self.get_wallet(user_id)
-        
-        if not wallet.has_sufficient_balance(amount):
-            raise InsufficientBalanceException()
-        
-        if not wallet.debit(amount):
-            raise ValidationException("Failed to debit wallet")
-        
+        self.debit_balance(user_id, amount)
         db.session.commit()
         return True
     
@@ -0,0 +1,160 @@
+"""Webhook log partition maintenance, retention and archival."""
+import os
+import gzip
+import json
+from typing import Dict, Any, List, Optional
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import MetaData, DateTime, Table, delete, select, text
+from sqlalchemy.dialects.postgresql import insert
+from app.extensions import db
+from app.models import WebhookLog, WebhookDedupKey
+from app.utils.partitions import (
+    Partition,
+    add_months,
+    month_start,
+    partition_name,
+    list_partitions,
+    ensure_default_partition,
+    ensure_monthly_partitions,
+    detach_partition,
+    drop_partition
+)
+
+TABLE = WebhookLog.__tablename__
+# Audit restores land here, never in webhook_logs, so workers cannot pick them up
+RESTORED_TABLE = "webhook_logs_restored"
+
+
+def _table_like(name: str) -> Table:
+    """A Core table with webhook_logs' columns under another name (a partition or the restore table)."""
+    return WebhookLog.__table__.to_metadata(MetaData(), name=name)
+
+
+def _encode(value: Any) -> str:
+    """JSON fallback for archived column values."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class WebhookArchiveService:
+    """Keeps webhook_logs bounded: monthly partitions, retention and NDJSON archives.
+
+    A month whose partition ended more than WEBHOOK_LOG_RETENTION_DAYS ago is
+    detached (cheap, no row-by-row DELETE and no vacuum debt), streamed to
+    ``<WEBHOOK_ARCHIVE_DIR>/webhook_logs_YYYY_MM.ndjson.gz`` and dropped. A
+    partition is only dropped once its archive file is complete, and a
+    detached partition left by an interrupted run is archived by the next one.
+    """
+
+    def __init__(self, archive_dir: Optional[str] = None):
+        self.archive_dir = archive_dir or current_app.config.get("WEBHOOK_ARCHIVE_DIR", "archives/webhook_logs")
+
+    def ensure_partitions(self, months_ahead: Optional[int] = None) -> List[str]:
+        """Create the default partition and monthly partitions up to ``months_ahead`` months from now."""
+        if months_ahead is None:
+            months_ahead = current_app.config.get("WEBHOOK_PARTITION_MONTHS_AHEAD", 3)
+        ensure_default_partition(TABLE)
+        return ensure_monthly_partitions(TABLE, datetime.utcnow(), months_ahead)
+
+    def expired_partitions(self, retention_days: Optional[int] = None) -> List[Partition]:
+        """Monthly partitions that ended before the retention window."""
+        return [partition for partition in list_partitions(TABLE) if partition.end <= self._cutoff(retention_days)]
+
+    def archive_expired(self, retention_days: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Archive and drop every expired partition. Returns one summary per partition."""
+        cutoff = self._cutoff(retention_days)
+        archived = []
+        for partition in self.expired_partitions(retention_days):
+            if partition.attached:
+                detach_partition(TABLE, partition.name)
+            path, rows = self._export(partition.name)
+            drop_partition(partition.name)
+            current_app.logger.info(f"Archived {rows} webhook logs from {partition.name} to {path}")
+            archived.append({"partition": partition.name, "rows": rows, "path": path})
+
+        # Redeliveries come within days; keys of archived webhooks are not needed
+        self._purge_dedup_keys(cutoff)
+        return archived
+
+    def restore(self, since: datetime, until: datetime, batch_size: int = 1000) -> int:
+        """Load archived webhook logs created in [since, until) into webhook_logs_restored.
+
+        Restoring the same range twice does not duplicate rows. Returns the
+        number of rows read from the archives.
+        """
+        db.session.execute(text(f"CREATE TABLE IF NOT EXISTS {RESTORED_TABLE} (LIKE {TABLE} INCLUDING ALL)"))
+        db.session.commit()
+
+        target = _table_like(RESTORED_TABLE)
+        datetime_columns = [column.name for column in target.columns if isinstance(column.type, DateTime)]
+        restored = 0
+        batch = []
+        month = month_start(since)
+        while month < until:
+            path = self._archive_path(partition_name(TABLE, month))
+            month = add_months(month, 1)
+            if not os.path.exists(path):
+                continue
+            with gzip.open(path, "rt", encoding="utf-8") as archive:
+                for line in archive:
+                    row = json.loads(line)
+                    for name in datetime_columns:
+                        if row.get(name):
+                            row[name] = datetime.fromisoformat(row[name])
+                    if not since <= row["created_at"] < until:
+                        continue
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        restored += self._insert_restored(target, batch)
+                        batch = []
+        if batch:
+            restored += self._insert_restored(target, batch)
+        return restored
+
+    def _insert_restored(self, target: Table, rows: List[Dict[str, Any]]) -> int:
+        db.session.execute(insert(target).values(rows).on_conflict_do_nothing())
+        db.session.commit()
+        return len(rows)
+
+    def _export(self, name: str):
+        """Stream a detached partition to its gzipped NDJSON archive. Returns (path, rows)."""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = self._archive_path(name)
+        tmp_path = f"{path}.tmp"
+        source = _table_like(name)
+        rows = 0
+        with db.engine.connect() as connection, gzip.open(tmp_path, "wt", encoding="utf-8") as archive:
+            result = connection.execution_options(yield_per=2000).execute(
+                select(source).order_by(source.c.created_at, source.c.id)
+            )
+            for row in result.mappings():
+                archive.write(json.dumps(dict(row), default=_encode) + "\n")
+                rows += 1
+        # The archive only appears under its final name once fully written
+        os.replace(tmp_path, path)
+        return path, rows
+
+    def _purge_dedup_keys(self, cutoff: datetime, batch_size: int = 1000) -> int:
+        """Delete dedup keys older than ``cutoff`` in batches. Returns the number deleted."""
+        total = 0
+        while True:
+            expired_keys = db.session.query(WebhookDedupKey.dedup_key).filter(
+                WebhookDedupKey.created_at < cutoff
+            ).limit(batch_size).subquery()
+            deleted = db.session.execute(
+                delete(WebhookDedupKey).where(WebhookDedupKey.dedup_key.in_(select(expired_keys.c.dedup_key)))
+            ).rowcount
+            db.session.commit()
+            total += deleted
+            if deleted < batch_size:
+                return total
+
+    def _archive_path(self, name: str) -> str:
+        return os.path.join(self.archive_dir, f"{name}.ndjson.gz")
+
+    def _cutoff(self, retention_days: Optional[int]) -> datetime:
+        if retention_days is None:
+            retention_days = current_app.config.get("WEBHOOK_LOG_RETENTION_DAYS", 90)
+        return datetime.utcnow() - timedelta(days=retention_days)
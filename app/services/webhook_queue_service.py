@@ -0,0 +1,228 @@
+"""Webhook queue service for asynchronous webhook processing."""
+from typing import Dict, Any, List
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from flask import current_app
+from sqlalchemy import func, or_, and_, update
+from sqlalchemy.dialects.postgresql import insert
+from app.extensions import db
+from app.models import WebhookLog, Wallet, Transaction, FundingCredit
+from app.services.wallet_service import WalletService
+from app.services.spend_rollup_service import SpendRollupService
+from app.services.webhook_service import (
+    process_payscribe_webhook,
+    is_funding_event,
+    parse_funding_payload,
+    verify_funding_hash
+)
+from app.utils.helpers import generate_ref, generate_uuid
+from app.utils.metrics import register_metrics_provider
+
+
+class WebhookQueueService:
+    """Claims pending webhook logs and processes them off the request path.
+
+    Rows stuck in processing longer than WEBHOOK_LOCK_TIMEOUT_SECONDS (a
+    worker died mid-batch) are claimed again; handlers are idempotent on
+    trans_id, so reprocessing is safe.
+    """
+
+    def __init__(self):
+        self.wallet_service = WalletService()
+        self.rollup_service = SpendRollupService()
+
+    def claim_logs(self, limit: int = 10) -> List[str]:
+        """Claim up to ``limit`` due webhook logs with FOR UPDATE SKIP LOCKED."""
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=current_app.config.get("WEBHOOK_LOCK_TIMEOUT_SECONDS", 300))
+        try:
+            logs = (
+                WebhookLog.query
+                .filter(or_(
+                    and_(WebhookLog.status == "pending", WebhookLog.next_attempt_at <= now),
+                    and_(WebhookLog.status == "processing", WebhookLog.locked_at < stale)
+                ))
+                .order_by(WebhookLog.next_attempt_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            claimed = []
+            for webhook_log in logs:
+                webhook_log.status = "processing"
+                webhook_log.locked_at = now
+                webhook_log.attempts += 1
+                claimed.append(webhook_log.id)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return claimed
+
+    def process_log(self, log_id: str) -> str:
+        """Process one claimed webhook log, scheduling a retry or dead-lettering it on failure.
+
+        Returns the log's new status.
+        """
+        webhook_log = db.session.get(WebhookLog, log_id)
+        process_payscribe_webhook(webhook_log)
+
+        if webhook_log.status == "failed":
+            if webhook_log.attempts < current_app.config.get("WEBHOOK_MAX_ATTEMPTS", 5):
+                backoff = current_app.config.get("WEBHOOK_RETRY_BACKOFF", 30) * (2 ** (webhook_log.attempts - 1))
+                webhook_log.schedule_retry(datetime.utcnow() + timedelta(seconds=backoff))
+            else:
+                current_app.logger.error(f"Webhook {webhook_log.id} dead-lettered: {webhook_log.error_message}")
+                webhook_log.mark_dead()
+            db.session.commit()
+        return webhook_log.status
+
+    def run_once(self, batch_size: int = 10) -> int:
+        """Claim and process one batch of webhook logs. Returns the number processed."""
+        log_ids = self.claim_logs(batch_size)
+        for log_id in log_ids:
+            try:
+                self.process_log(log_id)
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f"Webhook {log_id} processing failed: {str(e)}", exc_info=True)
+        return len(log_ids)
+
+    def run_batch(self, batch_size: int = 100) -> int:
+        """Claim a batch of webhook logs and process funding events set-wise.
+
+        Funding events in the batch cost a fixed number of statements
+        whatever the batch size: one wallet lookup, one multi-row credit
+        INSERT ... ON CONFLICT DO NOTHING that also rejects duplicates, one
+        balance UPDATE for all wallets, one spend rollup upsert and one
+        UPDATE marking the logs processed, all in one commit. Other events,
+        and funding events that fail validation, go through process_log.
+        Returns the number of logs claimed.
+        """
+        log_ids = self.claim_logs(batch_size)
+        if not log_ids:
+            return 0
+
+        logs = WebhookLog.query.filter(WebhookLog.id.in_(log_ids)).all()
+        funding_logs = [webhook_log for webhook_log in logs if is_funding_event(webhook_log.event_type)]
+        fallback_ids = [webhook_log.id for webhook_log in logs if not is_funding_event(webhook_log.event_type)]
+
+        try:
+            fallback_ids.extend(self._process_funding_batch(funding_logs))
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Batched funding processing failed, falling back: {str(e)}", exc_info=True)
+            fallback_ids.extend(webhook_log.id for webhook_log in funding_logs)
+
+        for log_id in fallback_ids:
+            try:
+                self.process_log(log_id)
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f"Webhook {log_id} processing failed: {str(e)}", exc_info=True)
+        return len(log_ids)
+
+    def _process_funding_batch(self, logs: List[WebhookLog]) -> List[str]:
+        """Credit a batch of funding webhooks. Returns ids of logs left for process_log."""
+        payments, fallback_ids = [], []
+        for webhook_log in logs:
+            payment = parse_funding_payload(webhook_log.payload)
+            if payment["account_number"] and payment["amount"] and payment["trans_id"] and payment["successful"]:
+                payments.append((webhook_log, payment))
+            else:
+                fallback_ids.append(webhook_log.id)
+        if not payments:
+            return fallback_ids
+
+        account_numbers = {payment["account_number"] for _, payment in payments}
+        wallets = dict(
+            db.session.query(Wallet.payscribe_account_number, Wallet.user_id)
+            .filter(Wallet.payscribe_account_number.in_(account_numbers))
+            .all()
+        )
+
+        now = datetime.utcnow()
+        credit_rows, processed_ids = [], []
+        for webhook_log, payment in payments:
+            user_id = wallets.get(payment["account_number"])
+            if not user_id or not verify_funding_hash(payment):
+                fallback_ids.append(webhook_log.id)
+                continue
+
+            processed_ids.append(webhook_log.id)
+            credit_rows.append({
+                "id": generate_uuid(),
+                "user_id": user_id,
+                "type": "credit",
+                "status": "success",
+                "amount": Decimal(str(payment["amount"])),
+                "reference": generate_ref("CR"),
+                "payscribe_transaction_id": str(payment["trans_id"]),
+                "details": {},
+                "description": f"Wallet funding via virtual account {payment['account_number']}",
+                "created_at": now,
+                "updated_at": now,
+            })
+
+        # Claiming trans_ids in funding_credits drops already-credited ones
+        # (also repeats inside this batch); only claimed rows are credited
+        credits = defaultdict(Decimal)
+        inserted = []
+        if credit_rows:
+            claims = {}
+            for row in credit_rows:
+                claims.setdefault(row["payscribe_transaction_id"], {
+                    "payscribe_transaction_id": row["payscribe_transaction_id"],
+                    "transaction_id": row["id"],
+                    "user_id": row["user_id"],
+                    "created_at": now,
+                })
+            claimed = set(db.session.execute(
+                insert(FundingCredit.__table__)
+                .values(list(claims.values()))
+                .on_conflict_do_nothing(index_elements=["payscribe_transaction_id"])
+                .returning(FundingCredit.transaction_id)
+            ).scalars())
+            inserted = [row for row in credit_rows if row["id"] in claimed]
+        if inserted:
+            db.session.execute(insert(Transaction.__table__).values(inserted))
+            for row in inserted:
+                credits[row["user_id"]] += row["amount"]
+            self.rollup_service.record((row["user_id"], now, "credit", None, row["amount"], 1) for row in inserted)
+        self.wallet_service.credit_balances(credits)
+        if processed_ids:
+            db.session.execute(
+                update(WebhookLog.__table__)
+                .where(WebhookLog.id.in_(processed_ids))
+                .values(status="processed", processed_at=now, locked_at=None)
+            )
+        db.session.commit()
+
+        if credits:
+            current_app.logger.info(f"Credited {len(inserted)} fundings across {len(credits)} wallets")
+        return fallback_ids
+
+
+def get_webhook_queue_stats() -> Dict[str, Any]:
+    """Get webhook backlog, processing lag and dead-letter count."""
+    rows = db.session.query(
+        WebhookLog.status,
+        func.count(WebhookLog.id),
+        func.min(WebhookLog.created_at)
+    ).filter(
+        WebhookLog.status.in_(["pending", "processing", "dead"])
+    ).group_by(WebhookLog.status).all()
+    counts = {status: (count, oldest) for status, count, oldest in rows}
+
+    backlog = [oldest for status, (count, oldest) in counts.items() if status != "dead" and oldest]
+    return {
+        "pending": counts.get("pending", (0, None))[0],
+        "processing": counts.get("processing", (0, None))[0],
+        "dead": counts.get("dead", (0, None))[0],
+        # Age of the oldest unprocessed webhook, i.e. how far behind the workers are
+        "processing_lag_seconds": (datetime.utcnow() - min(backlog)).total_seconds() if backlog else 0,
+    }
+
+
+register_metrics_provider("webhook_queue", get_webhook_queue_stats)
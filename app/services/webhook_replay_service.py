@@ -0,0 +1,166 @@
+"""Bulk replay of stored webhooks."""
+import json
+import os
+import multiprocessing
+from typing import Dict, Any, List, Optional, Iterator, Tuple
+from datetime import datetime
+from flask import Flask, current_app
+from sqlalchemy import func, tuple_
+from app.extensions import db
+from app.models import WebhookLog
+from app.services.webhook_service import process_payscribe_webhook
+
+# App inherited by forked replay workers; see _init_worker
+_worker_app: Optional[Flask] = None
+
+
+def _init_worker():
+    """Give a forked worker its own database connections."""
+    with _worker_app.app_context():
+        # Connections inherited from the parent must not be reused across processes
+        db.engine.dispose(close=False)
+
+
+def _replay_chunk(log_ids: List[str]) -> Dict[str, int]:
+    """Reprocess one chunk of webhook logs in a worker process."""
+    counts = {}
+    with _worker_app.app_context():
+        try:
+            for log_id in log_ids:
+                try:
+                    webhook_log = db.session.get(WebhookLog, log_id)
+                    if webhook_log is None:
+                        continue
+                    webhook_log.attempts += 1
+                    process_payscribe_webhook(webhook_log)
+                    status = webhook_log.status
+                except Exception as e:
+                    db.session.rollback()
+                    current_app.logger.error(f"Webhook {log_id} replay failed: {str(e)}", exc_info=True)
+                    status = "errors"
+                counts[status] = counts.get(status, 0) + 1
+        finally:
+            db.session.remove()
+    return counts
+
+
+class WebhookReplayService:
+    """Selects stored webhooks by status, event type and time window and reprocesses them.
+
+    Matching rows are read as keyset pages of ids ordered by (created_at, id)
+    and fanned out to worker processes. Pages are consumed in order, so
+    after each page the (created_at, id) of its last row is written to the
+    checkpoint file and an interrupted replay resumes right after it.
+    """
+
+    def __init__(
+        self,
+        statuses: List[str],
+        event_type: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ):
+        self.statuses = statuses
+        self.event_type = event_type
+        self.since = since
+        self.until = until
+
+    @property
+    def filters(self) -> Dict[str, Any]:
+        """Selection criteria, stored in the checkpoint so a resume can be checked against it."""
+        return {
+            "statuses": sorted(self.statuses),
+            "event_type": self.event_type,
+            "since": self.since.isoformat() if self.since else None,
+            "until": self.until.isoformat() if self.until else None,
+        }
+
+    def _query(self, cursor: Optional[Tuple[datetime, str]] = None):
+        query = db.session.query(WebhookLog.id, WebhookLog.created_at).filter(WebhookLog.status.in_(self.statuses))
+        if self.event_type:
+            query = query.filter(WebhookLog.event_type == self.event_type)
+        if self.since:
+            query = query.filter(WebhookLog.created_at >= self.since)
+        if self.until:
+            query = query.filter(WebhookLog.created_at < self.until)
+        if cursor:
+            query = query.filter(tuple_(WebhookLog.created_at, WebhookLog.id) > cursor)
+        return query
+
+    def count(self, cursor: Optional[Tuple[datetime, str]] = None) -> int:
+        """Count matching webhook logs after ``cursor``."""
+        return self._query(cursor).with_entities(func.count(WebhookLog.id)).scalar()
+
+    def count_by_event_type(self, cursor: Optional[Tuple[datetime, str]] = None) -> Dict[str, int]:
+        """Count matching webhook logs after ``cursor`` per event type (for dry runs)."""
+        rows = self._query(cursor).with_entities(
+            WebhookLog.event_type, func.count(WebhookLog.id)
+        ).group_by(WebhookLog.event_type).all()
+        return dict(rows)
+
+    def iter_pages(
+        self,
+        page_size: int,
+        cursor: Optional[Tuple[datetime, str]] = None
+    ) -> Iterator[Tuple[List[str], Tuple[datetime, str]]]:
+        """Yield (ids, cursor after the page) for every page of matching logs."""
+        while True:
+            rows = self._query(cursor).order_by(WebhookLog.created_at, WebhookLog.id).limit(page_size).all()
+            db.session.close()
+            if not rows:
+                return
+            cursor = (rows[-1].created_at, rows[-1].id)
+            yield [row.id for row in rows], cursor
+
+    def replay(
+        self,
+        workers: int = 4,
+        page_size: int = 500,
+        checkpoint_path: Optional[str] = None,
+        progress=None
+    ) -> Dict[str, int]:
+        """Reprocess every matching webhook log with ``workers`` processes.
+
+        ``progress`` is called after each page with (done, total, counts).
+        Returns counts of the resulting webhook statuses.
+        """
+        global _worker_app
+        cursor = self.load_checkpoint(checkpoint_path)
+        total = self.count(cursor)
+        done = 0
+        counts: Dict[str, int] = {}
+
+        _worker_app = current_app._get_current_object()
+        # Each page is split so every worker gets a share of it
+        chunk_size = max(1, -(-page_size // workers))
+        context = multiprocessing.get_context("fork")
+        with context.Pool(workers, initializer=_init_worker) as pool:
+            for log_ids, page_cursor in self.iter_pages(page_size, cursor):
+                chunks = [log_ids[i:i + chunk_size] for i in range(0, len(log_ids), chunk_size)]
+                for chunk_counts in pool.map(_replay_chunk, chunks):
+                    for status, count in chunk_counts.items():
+                        counts[status] = counts.get(status, 0) + count
+                done += len(log_ids)
+                self.save_checkpoint(checkpoint_path, page_cursor)
+                if progress:
+                    progress(done, total, counts)
+        return counts
+
+    def load_checkpoint(self, path: Optional[str]) -> Optional[Tuple[datetime, str]]:
+        """Read the resume cursor from ``path``, if it exists and matches these filters."""
+        if not path or not os.path.exists(path):
+            return None
+        with open(path) as checkpoint_file:
+            checkpoint = json.load(checkpoint_file)
+        if checkpoint.get("filters") != self.filters:
+            raise ValueError(f"Checkpoint {path} was written for different filters: {checkpoint.get('filters')}")
+        return datetime.fromisoformat(checkpoint["created_at"]), checkpoint["id"]
+
+    def save_checkpoint(self, path: Optional[str], cursor: Tuple[datetime, str]):
+        """Atomically write the resume cursor to ``path``."""
+        if not path:
+            return
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as checkpoint_file:
+            json.dump({"filters": self.filters, "created_at": cursor[0].isoformat(), "id": cursor[1]}, checkpoint_file)
+        os.replace(tmp_path, path)
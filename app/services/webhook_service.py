@@ -1,21 +1,150 @@
 """Synchronous webhook processing."""
+from typing import Optional
+from datetime import datetime
 from decimal import Decimal
 from flask import current_app
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
 from app.extensions import db
-from app.models import WebhookLog, Wallet, Transaction
+from app.models import WebhookLog, WebhookDedupKey, Wallet
 from app.services.wallet_service import WalletService
+from app.services.purchase_service import PurchaseService, OPEN_STATUSES
+from app.services.transaction_service import TransactionService
 from app.utils.security import verify_webhook_hash
-from app.utils.helpers import generate_ref
+from app.utils.helpers import generate_uuid
 from app.errors.exceptions import ValidationException
 
 
+def webhook_dedup_key(event_type: str, payload: dict) -> Optional[str]:
+    """Build the key that identifies redeliveries of the same webhook.
+
+    Funding events are keyed by trans_id; status events by trans_id/ref and
+    status, so each status change is still delivered once. Payloads with no
+    identifier get no key and are never deduplicated.
+    """
+    trans_id = payload.get("trans_id") or payload.get("transaction_id")
+    if is_funding_event(event_type):
+        return f"{event_type}:{trans_id}"[:255] if trans_id else None
+
+    identifier = trans_id or payload.get("ref") or payload.get("reference")
+    if not identifier:
+        return None
+    return f"{event_type}:{identifier}:{payload.get('status', '')}"[:255]
+
+
+def record_webhook(event_type: str, payload: dict) -> Optional[str]:
+    """Store an incoming webhook unless the same webhook was already received.
+
+    The dedup key is claimed with INSERT ... ON CONFLICT DO NOTHING in the
+    same transaction as the log row. A redelivery of a webhook whose log
+    ended failed or dead puts that log back in the queue with the new
+    payload; other redeliveries are dropped. Returns the id of the log to
+    process, or None for a dropped redelivery.
+    """
+    now = datetime.utcnow()
+    log_id = generate_uuid()
+    dedup_key = webhook_dedup_key(event_type, payload)
+    try:
+        if dedup_key:
+            claimed = db.session.execute(
+                insert(WebhookDedupKey.__table__)
+                .values(dedup_key=dedup_key, webhook_log_id=log_id, created_at=now)
+                .on_conflict_do_nothing(index_elements=["dedup_key"])
+                .returning(WebhookDedupKey.dedup_key)
+            ).scalar()
+            if not claimed:
+                requeued = _requeue_failed_webhook(dedup_key, payload, now)
+                db.session.commit()
+                return requeued
+
+        db.session.execute(
+            insert(WebhookLog.__table__).values(
+                id=log_id,
+                event_type=event_type,
+                payload=payload,
+                dedup_key=dedup_key,
+                status="pending",
+                attempts=0,
+                next_attempt_at=now,
+                created_at=now
+            )
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return log_id
+
+
+def _requeue_failed_webhook(dedup_key: str, payload: dict, now: datetime) -> Optional[str]:
+    """Reset the failed or dead log holding ``dedup_key`` to pending. Returns its id, or None."""
+    return db.session.execute(
+        update(WebhookLog.__table__)
+        .where(
+            WebhookLog.id == select(WebhookDedupKey.webhook_log_id)
+            .where(WebhookDedupKey.dedup_key == dedup_key)
+            .scalar_subquery(),
+            WebhookLog.status.in_(["failed", "dead"])
+        )
+        .values(
+            payload=payload,
+            status="pending",
+            error_message=None,
+            attempts=0,
+            next_attempt_at=now,
+            locked_at=None,
+            processed_at=None
+        )
+        .returning(WebhookLog.id)
+    ).scalar()
+
+
+def is_funding_event(event_type: str) -> bool:
+    """Check whether a webhook event type is a virtual account payment."""
+    return event_type == "accounts.payment.status" or "payment" in event_type.lower()
+
+
+def parse_funding_payload(payload: dict) -> dict:
+    """Extract the fields of a virtual account payment from its webhook payload."""
+    transaction_data = payload.get("transaction", {})
+    customer_data = payload.get("customer", {})
+    status = payload.get("status", "").lower() or transaction_data.get("status", "").lower()
+
+    return {
+        "account_number": customer_data.get("number") or payload.get("account_number") or payload.get("virtual_account"),
+        "amount": payload.get("amount"),
+        "trans_id": payload.get("trans_id") or payload.get("transaction_id"),
+        "sender_account": transaction_data.get("sender_account") or payload.get("sender_account") or payload.get("sender"),
+        "bank_code": transaction_data.get("bank_code") or payload.get("bank_code") or payload.get("bank"),
+        "transaction_hash": payload.get("transaction_hash") or payload.get("hash"),
+        "status": status,
+        "successful": status == "success" or status == "completed" or payload.get("status_code") == 200,
+    }
+
+
+def verify_funding_hash(payment: dict) -> bool:
+    """Verify a parsed payment's transaction hash, when both hash and secret are set."""
+    secret_key = current_app.config.get("PAYSCRIBE_SECRET_KEY", "")
+    if not payment["transaction_hash"] or not secret_key:
+        return True
+    return verify_webhook_hash(
+        secret_key=secret_key,
+        sender_account=payment["sender_account"] or "",
+        virtual_account=payment["account_number"],
+        bank_code=payment["bank_code"] or "",
+        amount=str(payment["amount"]),
+        trans_id=payment["trans_id"] or "",
+        received_hash=payment["transaction_hash"],
+    )
+
+
 def process_payscribe_webhook(webhook_log: WebhookLog) -> None:
     """Process Payscribe webhook synchronously."""
     try:
         payload = webhook_log.payload
         event_type = webhook_log.event_type
 
-        if event_type == "accounts.payment.status" or "payment" in event_type.lower():
+        if is_funding_event(event_type):
             _handle_virtual_account_payment(payload, webhook_log)
         elif "transaction" in event_type.lower() or "status" in event_type.lower():
             _handle_transaction_status(payload, webhook_log)
@@ -32,19 +161,17 @@ def process_payscribe_webhook(webhook_log: WebhookLog) -> None:
 def _handle_virtual_account_payment(payload: dict, webhook_log: WebhookLog) -> None:
     """Handle virtual account payment webhook."""
     try:
-        transaction_data = payload.get("transaction", {})
-        customer_data = payload.get("customer", {})
-
-        account_number = customer_data.get("number") or payload.get("account_number") or payload.get("virtual_account")
-        amount = payload.get("amount")
-        trans_id = payload.get("trans_id") or payload.get("transaction_id")
-        sender_account = transaction_data.get("sender_account") or payload.get("sender_account") or payload.get("sender")
-        bank_code = transaction_data.get("bank_code") or payload.get("bank_code") or payload.get("bank")
-        transaction_hash = payload.get("transaction_hash") or payload.get("hash")
-        status = payload.get("status", "").lower() or transaction_data.get("status", "").lower()
+        payment = parse_funding_payload(payload)
+        account_number = payment["account_number"]
+        amount = payment["amount"]
+        trans_id = payment["trans_id"]
 
         if not account_number or not amount:
             raise ValidationException("Missing required payment fields")
+        if not trans_id:
+            # funding_credits dedups on trans_id; funding reconciliation credits the
+            # payment from Payscribe's collection record instead
+            raise ValidationException("Missing trans_id: payment cannot be deduplicated")
 
         wallet = Wallet.query.filter_by(payscribe_account_number=account_number).first()
         if not wallet:
@@ -53,48 +180,28 @@ def _handle_virtual_account_payment(payload: dict, webhook_log: WebhookLog) -> N
             db.session.commit()
             return
 
-        secret_key = current_app.config.get("PAYSCRIBE_SECRET_KEY", "")
-        if transaction_hash and secret_key:
-            if not verify_webhook_hash(
-                secret_key=secret_key,
-                sender_account=sender_account or "",
-                virtual_account=account_number,
-                bank_code=bank_code or "",
-                amount=str(amount),
-                trans_id=trans_id or "",
-                received_hash=transaction_hash,
-            ):
-                current_app.logger.warning(f"Invalid transaction hash for account: {account_number}")
-                webhook_log.mark_failed("Invalid transaction hash")
-                db.session.commit()
-                return
-
-        existing_transaction = Transaction.query.filter_by(
-            payscribe_transaction_id=trans_id,
-            type="credit",
-        ).first()
-        if existing_transaction:
-            current_app.logger.info(f"Transaction already processed: {trans_id}")
-            webhook_log.mark_processed()
+        if not verify_funding_hash(payment):
+            current_app.logger.warning(f"Invalid transaction hash for account: {account_number}")
+            webhook_log.mark_failed("Invalid transaction hash")
             db.session.commit()
             return
 
-        if status == "success" or status == "completed" or payload.get("status_code") == 200:
-            wallet_service = WalletService()
-            reference = generate_ref("CR")
-            wallet_service.credit_wallet(
+        if payment["successful"]:
+            credit = WalletService().credit_collection(
                 user_id=wallet.user_id,
                 amount=Decimal(str(amount)),
-                reference=reference,
-                description=f"Wallet funding via virtual account {account_number}",
                 payscribe_trans_id=trans_id,
+                account_number=account_number,
             )
-            current_app.logger.info(f"Wallet credited: {wallet.user_id}, Amount: {amount}")
+            if credit:
+                current_app.logger.info(f"Wallet credited: {wallet.user_id}, Amount: {amount}")
+            else:
+                current_app.logger.info(f"Transaction already processed: {trans_id}")
             webhook_log.mark_processed()
             db.session.commit()
         else:
-            current_app.logger.warning(f"Payment not successful. Status: {status}")
-            webhook_log.mark_failed(f"Payment status: {status}")
+            current_app.logger.warning(f"Payment not successful. Status: {payment['status']}")
+            webhook_log.mark_failed(f"Payment status: {payment['status']}")
             db.session.commit()
     except Exception as e:
         current_app.logger.error(f"Error handling virtual account payment: {str(e)}")
@@ -112,11 +219,12 @@ def _handle_transaction_status(payload: dict, webhook_log: WebhookLog) -> None:
         if not trans_id and not ref:
             raise ValidationException("Missing transaction identifier")
 
+        transaction_service = TransactionService()
         transaction = None
         if trans_id:
-            transaction = Transaction.query.filter_by(payscribe_transaction_id=trans_id).first()
+            transaction = transaction_service.find_transaction(payscribe_transaction_id=trans_id)
         if not transaction and ref:
-            transaction = Transaction.query.filter_by(reference=ref).first()
+            transaction = transaction_service.find_transaction(reference=ref)
 
         if not transaction:
             current_app.logger.warning(f"Transaction not found: {trans_id or ref}")
@@ -124,14 +232,22 @@ def _handle_transaction_status(payload: dict, webhook_log: WebhookLog) -> None:
             db.session.commit()
             return
 
-        if status == "success" or status == "completed":
+        if transaction.status not in OPEN_STATUSES:
+            # Already final (e.g. resolved by the reconciliation worker, or archived)
+            pass
+        elif status == "success" or status == "completed":
             transaction.update_status("success")
         elif status == "failed" or status == "error":
-            transaction.update_status("failed")
             if transaction.type in ["airtime", "data"]:
-                wallet = Wallet.query.filter_by(user_id=transaction.user_id).first()
-                if wallet:
-                    wallet.credit(transaction.amount)
+                # Conditional fail + refund, so a repeated webhook cannot refund twice
+                PurchaseService().fail({
+                    "id": transaction.id,
+                    "user_id": transaction.user_id,
+                    "amount": transaction.amount,
+                    "created_at": transaction.created_at
+                })
+            else:
+                transaction.update_status("failed")
         elif status == "pending" or status == "processing":
             transaction.update_status("processing")
 
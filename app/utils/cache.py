@@ -0,0 +1,141 @@
+"""In-process TTL cache with stale-while-revalidate and single-flight loads."""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+from flask import current_app
+from app.utils.metrics import register_metrics_provider
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """A load in progress that concurrent callers wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class TTLCache:
+    """Per-process cache for slow upstream lookups.
+
+    An entry younger than ``ttl`` is served as is. Between ``ttl`` and
+    ``ttl + stale_ttl`` it is still served, and one background refresh is
+    started. Older or missing entries are loaded inline; concurrent misses
+    for the same key share a single loader call.
+
+    With ``max_entries`` the cache is bounded: when a write finds it full,
+    entries past their serving window are dropped first, then the least
+    recently used ones.
+    """
+
+    def __init__(self, name: str, max_entries: Optional[int] = None):
+        self.name = name
+        self.max_entries = max_entries
+        # key -> (value, loaded_at, expires_at), least recently used first
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "loads": 0, "load_errors": 0, "evictions": 0}
+        register_metrics_provider(f"cache:{name}", self.stats)
+
+    def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Any],
+        ttl: float,
+        stale_ttl: float = 0.0
+    ) -> Any:
+        """Get a cached value, loading it with ``loader`` when needed."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, loaded_at, _ = entry
+                age = now - loaded_at
+                if age < ttl + stale_ttl:
+                    self._entries.move_to_end(key)
+                if age < ttl:
+                    self._stats["hits"] += 1
+                    return value
+                if age < ttl + stale_ttl:
+                    self._stats["stale_hits"] += 1
+                    if key not in self._flights:
+                        self._flights[key] = _Flight()
+                        threading.Thread(
+                            target=self._load, args=(key, loader, self._flights[key], ttl + stale_ttl), daemon=True
+                        ).start()
+                    return value
+
+            self._stats["misses"] += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if leader:
+            self._load(key, loader, flight, ttl + stale_ttl)
+        else:
+            flight.done.wait()
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def _load(self, key: Hashable, loader: Callable[[], Any], flight: _Flight, lifetime: float) -> None:
+        try:
+            flight.value = loader()
+            with self._lock:
+                loaded_at = time.monotonic()
+                self._entries[key] = (flight.value, loaded_at, loaded_at + lifetime)
+                self._entries.move_to_end(key)
+                self._evict(loaded_at)
+                self._stats["loads"] += 1
+        except Exception as e:
+            logger.warning("Cache %s failed to load %r: %s", self.name, key, e)
+            flight.error = e
+            with self._lock:
+                self._stats["load_errors"] += 1
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _evict(self, now: float) -> None:
+        """Bring the cache back under ``max_entries``. Call with the lock held."""
+        if self.max_entries is None or len(self._entries) <= self.max_entries:
+            return
+        expired = [key for key, (_, _, expires_at) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+        self._stats["evictions"] += len(expired)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one entry, or every entry when no key is given."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters for metrics."""
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), loads_in_flight=len(self._flights))
+
+
+def with_app_context(func: Callable[[], Any]) -> Callable[[], Any]:
+    """Bind a loader to the current app so it can run on a refresh thread."""
+    app = current_app._get_current_object()
+
+    def wrapper():
+        with app.app_context():
+            return func()
+
+    return wrapper
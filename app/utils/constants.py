@@ -24,3 +24,6 @@ TRANSACTION_STATUSES = ["pending", "processing", "success", "failed", "refunded"
 # Virtual Account Status
 VIRTUAL_ACCOUNT_STATUSES = ["active", "deactivated"]
 
+
+# Vend Job Statuses (async purchase queue)
+VEND_JOB_STATUSES = ["queued", "processing", "done", "failed"]
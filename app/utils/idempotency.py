@@ -0,0 +1,308 @@
+"""Idempotency-Key handling for non-idempotent POST endpoints."""
+import json
+import time
+import hashlib
+from datetime import datetime, timedelta
+from functools import wraps
+from typing import Optional, Tuple
+from flask import request, current_app, g, has_request_context
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.postgresql import insert
+from app.extensions import db
+from app.models import IdempotencyKey, PurchaseBatch
+from app.utils.helpers import generate_uuid
+from app.errors.exceptions import IdempotencyConflictException
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+# Stored for a request that raised after debiting the wallet
+DEBITED_ERROR_MESSAGE = "An error occurred after the wallet was debited; the purchase will be settled by reconciliation"
+
+# Answered for a key whose request debited the wallet and then died
+RESERVED_MESSAGE = "A purchase was already submitted with this Idempotency-Key; it will be settled by reconciliation"
+
+# Debits the current request committed and has not refunded (see track_debits)
+_OPEN_DEBITS = "idempotency_open_debits"
+# Key claimed by the current request, and whether another request debited under it first
+_KEY_ID = "idempotency_key_id"
+_SUPERSEDED = "idempotency_superseded"
+
+
+def request_fingerprint() -> str:
+    """Hash the method, path and JSON body of the current request."""
+    body = request.get_json(silent=True)
+    payload = json.dumps(
+        [request.method, request.path, body, request.headers.get("Prefer", "")],
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _claim_key(user_id: str, key: str, fingerprint: str) -> Optional[str]:
+    """Insert an in-progress key row. Returns its id, or None if the key exists."""
+    now = datetime.utcnow()
+    ttl = current_app.config.get("IDEMPOTENCY_KEY_TTL", 86400)
+    try:
+        key_id = db.session.execute(
+            insert(IdempotencyKey.__table__)
+            .values(
+                id=generate_uuid(),
+                user_id=user_id,
+                key=key,
+                fingerprint=fingerprint,
+                status="in_progress",
+                expires_at=now + timedelta(seconds=ttl),
+                created_at=now,
+                updated_at=now
+            )
+            .on_conflict_do_nothing(index_elements=["user_id", "key"])
+            .returning(IdempotencyKey.id)
+        ).scalar()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        db.session.close()
+    return key_id
+
+
+def _stale_cutoff() -> datetime:
+    """In-progress claims last touched before this belong to a request that died."""
+    return datetime.utcnow() - timedelta(seconds=current_app.config.get("IDEMPOTENCY_STALE_SECONDS", 300))
+
+
+def _wait_for_key(user_id: str, key: str) -> Optional[IdempotencyKey]:
+    """Poll an existing key until its first request completes or the wait times out.
+
+    Returns None if the key expired and was removed, so it can be claimed again.
+    A stale in-progress key is returned straight away. The session is closed
+    between polls so no connection is held while waiting.
+    """
+    deadline = time.monotonic() + current_app.config.get("IDEMPOTENCY_WAIT_SECONDS", 10)
+    while True:
+        try:
+            record = IdempotencyKey.query.filter_by(user_id=user_id, key=key).first()
+            if record and record.expires_at <= datetime.utcnow():
+                db.session.delete(record)
+                db.session.commit()
+                return None
+            stale = record is not None and record.status == "in_progress" and record.updated_at <= _stale_cutoff()
+            if record is None or record.status == "completed" or stale or time.monotonic() >= deadline:
+                if record:
+                    db.session.expunge(record)
+                return record
+        finally:
+            db.session.close()
+        time.sleep(0.1)
+
+
+def _take_over_key(key_id: str) -> Optional[str]:
+    """Claim a stale in-progress key left by a request that died. Returns its id, or None if it is live.
+
+    Only a key whose request never debited can be taken over. The UPDATE is
+    conditional, so of several retries racing for the key only one wins.
+    """
+    try:
+        taken = db.session.execute(
+            update(IdempotencyKey)
+            .where(
+                IdempotencyKey.id == key_id,
+                IdempotencyKey.status == "in_progress",
+                IdempotencyKey.transaction_reference.is_(None),
+                IdempotencyKey.updated_at <= _stale_cutoff()
+            )
+            .values(updated_at=datetime.utcnow())
+            .returning(IdempotencyKey.id)
+        ).scalar()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        db.session.close()
+    return taken
+
+
+def _reserved_response(user_id: str, reference: str):
+    """Current state of the purchase or batch a dead request debited, as a replayed response.
+
+    Returns None if it cannot be found.
+    """
+    # Imported here: the purchase services import this module
+    from app.services.bulk_purchase_service import BulkPurchaseService
+    from app.services.transaction_service import TransactionService
+
+    try:
+        batch = PurchaseBatch.query.filter_by(reference=reference, user_id=user_id).first()
+        if batch:
+            data = BulkPurchaseService().get_batch(user_id, batch.id)
+        else:
+            transaction = TransactionService().find_transaction(reference=reference)
+            if transaction is None or transaction.user_id != user_id:
+                return None
+            data = {"transaction": transaction.to_dict(), "message": RESERVED_MESSAGE}
+    finally:
+        db.session.close()
+    return {"status": True, "message": RESERVED_MESSAGE, "data": data}, 200, {"Idempotent-Replayed": "true"}
+
+
+def _store_response(key_id: str, body, status_code: int):
+    """Persist the response of the request that claimed the key."""
+    try:
+        db.session.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.id == key_id)
+            .values(
+                status="completed",
+                response_code=status_code,
+                response_body=body,
+                updated_at=datetime.utcnow()
+            )
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def _release_key(key_id: str):
+    """Remove a key whose request failed without a debit left standing, so the client can retry with it."""
+    try:
+        db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.id == key_id))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        current_app.logger.error(f"Failed to release idempotency key {key_id}", exc_info=True)
+
+
+def link_reservation(reference: str):
+    """Tie the current request's Idempotency-Key to the purchase or batch it is debiting.
+
+    Called by PurchaseService inside the debit's transaction, so the link
+    commits with the debit. A key linked this way is never run again: a
+    retry after the request died gets the purchase's current state. Raises
+    IdempotencyConflictException, rolling the debit back, if a request that
+    took the key over already debited under it. Outside an idempotent
+    request it does nothing.
+    """
+    key_id = g.get(_KEY_ID) if has_request_context() else None
+    if key_id is None:
+        return
+    linked = db.session.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.id == key_id, IdempotencyKey.transaction_reference.is_(None))
+        .values(transaction_reference=reference, updated_at=datetime.utcnow())
+    ).rowcount
+    if not linked:
+        setattr(g, _SUPERSEDED, True)
+        raise IdempotencyConflictException()
+
+
+def track_debits(count: int):
+    """Record wallet debits committed (positive) or refunded (negative) by the current request.
+
+    Called by PurchaseService after each commit; outside a request it does nothing.
+    """
+    if has_request_context():
+        setattr(g, _OPEN_DEBITS, g.get(_OPEN_DEBITS, 0) + count)
+
+
+def _split_response(result) -> Tuple[dict, int]:
+    """Split a Resource method return value into (body, status code)."""
+    if isinstance(result, tuple):
+        return result[0], result[1] if len(result) > 1 else 200
+    return result, 200
+
+
+def idempotent(f):
+    """Decorator making a Resource method safe to retry with an Idempotency-Key.
+
+    Apply below ``@token_required``. The first request with a key runs the
+    endpoint and stores its response; replays with the same key and body get
+    the stored response without running the endpoint again, and concurrent
+    duplicates wait for the first request to finish. A 5xx response or an
+    exception releases the key so a retry runs the endpoint again, but only
+    when no wallet debit is left standing (rejected before the debit, or
+    refunded); otherwise the 5xx is stored and replayed like any response.
+    A key left in progress by a request that died is taken over after
+    ``IDEMPOTENCY_STALE_SECONDS`` only if that request never debited;
+    otherwise the retry gets the current state of the purchase it debited
+    (see ``link_reservation``). Requests without the header are not
+    affected.
+    """
+    @wraps(f)
+    def decorated(self, current_user_id, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return f(self, current_user_id, *args, **kwargs)
+
+        if len(key) > MAX_KEY_LENGTH:
+            return {"status": False, "message": f"{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters"}, 400
+
+        fingerprint = request_fingerprint()
+        key_id = _claim_key(current_user_id, key, fingerprint)
+        while key_id is None:
+            record = _wait_for_key(current_user_id, key)
+            if record is None:
+                key_id = _claim_key(current_user_id, key, fingerprint)
+                continue
+            if record.fingerprint != fingerprint:
+                return {"status": False, "message": f"{IDEMPOTENCY_HEADER} was already used for a different request"}, 422
+            if record.status == "completed":
+                return record.response_body, record.response_code, {"Idempotent-Replayed": "true"}
+            if record.transaction_reference and record.updated_at <= _stale_cutoff():
+                reserved = _reserved_response(current_user_id, record.transaction_reference)
+                if reserved is not None:
+                    return reserved
+            key_id = _take_over_key(record.id)
+            if key_id is None:
+                return {"status": False, "message": f"A request with this {IDEMPOTENCY_HEADER} is still being processed"}, 409
+
+        # g outlives the request when an app context was already pushed
+        setattr(g, _OPEN_DEBITS, 0)
+        setattr(g, _SUPERSEDED, False)
+        setattr(g, _KEY_ID, key_id)
+        try:
+            result = f(self, current_user_id, *args, **kwargs)
+        except Exception:
+            db.session.rollback()
+            if g.get(_SUPERSEDED):
+                raise
+            if g.get(_OPEN_DEBITS, 0) > 0:
+                _store_response(key_id, {"status": False, "message": DEBITED_ERROR_MESSAGE}, 500)
+            else:
+                _release_key(key_id)
+            raise
+        finally:
+            setattr(g, _KEY_ID, None)
+
+        body, status_code = _split_response(result)
+        if g.get(_SUPERSEDED):
+            # The key belongs to the request that debited under it
+            return result
+        if status_code >= 500 and g.get(_OPEN_DEBITS, 0) <= 0:
+            _release_key(key_id)
+        else:
+            _store_response(key_id, body, status_code)
+        return result
+
+    return decorated
+
+
+def purge_expired_keys(batch_size: int = 1000) -> int:
+    """Delete expired idempotency keys in batches. Returns the number deleted."""
+    total = 0
+    while True:
+        expired_ids = db.session.query(IdempotencyKey.id).filter(
+            IdempotencyKey.expires_at <= datetime.utcnow()
+        ).limit(batch_size).subquery()
+        deleted = db.session.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.id.in_(db.select(expired_ids.c.id)))
+        ).rowcount
+        db.session.commit()
+        total += deleted
+        if deleted < batch_size:
+            return total
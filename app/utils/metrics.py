@@ -0,0 +1,20 @@
+"""In-process metrics registry."""
+from typing import Any, Callable, Dict
+
+_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_metrics_provider(name: str, provider: Callable[[], Dict[str, Any]]) -> None:
+    """Register a callable returning a snapshot of metrics under a name."""
+    _providers[name] = provider
+
+
+def collect_metrics() -> Dict[str, Any]:
+    """Collect a snapshot from every registered metrics provider."""
+    snapshot = {}
+    for name, provider in _providers.items():
+        try:
+            snapshot[name] = provider()
+        except Exception as e:
+            snapshot[name] = {"error": str(e)}
+    return snapshot
@@ -0,0 +1,29 @@
+"""Opaque keyset cursors for paginated endpoints."""
+import json
+import base64
+from datetime import datetime
+from typing import Tuple
+from app.errors.exceptions import ValidationException
+
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    """Encode the (created_at, id) of the last row of a page as an opaque cursor."""
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decode a cursor from encode_cursor. Raises ValidationException if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(row_id)
+    except (ValueError, TypeError):
+        raise ValidationException("Invalid cursor")
+
+
+def clamp_limit(limit: int) -> int:
+    """Keep a requested page size between 1 and MAX_PAGE_SIZE."""
+    return max(1, min(limit, MAX_PAGE_SIZE))
@@ -0,0 +1,134 @@
+"""Monthly range partition maintenance for PostgreSQL tables.
+
+A table partitioned with ``PARTITION BY RANGE (created_at)`` gets one
+partition per calendar month, named ``<table>_YYYY_MM``, plus a
+``<table>_default`` partition that catches rows no monthly partition covers
+(so an insert never fails because maintenance fell behind).
+"""
+import re
+from datetime import datetime
+from typing import List, NamedTuple
+from sqlalchemy import text
+from app.extensions import db
+
+
+class Partition(NamedTuple):
+    """A monthly partition table, attached or detached."""
+    name: str
+    start: datetime
+    end: datetime
+    attached: bool
+
+
+def month_start(value: datetime) -> datetime:
+    """Truncate a datetime to the first instant of its month."""
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    """Shift a month start by ``months`` (may be negative)."""
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, start: datetime) -> str:
+    """Name of the monthly partition of ``table`` starting at ``start``."""
+    return f"{table}_{start.year:04d}_{start.month:02d}"
+
+
+def list_partitions(table: str) -> List[Partition]:
+    """List the monthly partitions of ``table`` in month order.
+
+    Detached partitions (left behind by an archive run that did not finish)
+    are included with ``attached=False``.
+    """
+    pattern = re.compile(rf"^{re.escape(table)}_(\d{{4}})_(\d{{2}})$")
+    names = db.session.execute(
+        text("SELECT tablename FROM pg_tables WHERE schemaname = current_schema() AND tablename LIKE :prefix"),
+        {"prefix": table.replace("_", r"\_") + r"\_%"}
+    ).scalars().all()
+    attached = set(db.session.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "WHERE parent.relname = :table"
+        ),
+        {"table": table}
+    ).scalars().all())
+
+    partitions = []
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            start = datetime(int(match.group(1)), int(match.group(2)), 1)
+            partitions.append(Partition(name, start, add_months(start, 1), name in attached))
+    return sorted(partitions, key=lambda partition: partition.start)
+
+
+def ensure_default_partition(table: str) -> None:
+    """Create the default partition of ``table`` if it does not exist."""
+    db.session.execute(text(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"))
+    db.session.commit()
+
+
+def ensure_monthly_partitions(table: str, start: datetime, months_ahead: int = 3) -> List[str]:
+    """Create missing monthly partitions from ``start``'s month through ``months_ahead`` months later.
+
+    Rows the default partition already holds for a new month are moved into
+    it, in the same transaction that creates it. Returns the names created.
+    """
+    existing = {partition.name for partition in list_partitions(table)}
+    created = []
+    month = month_start(start)
+    for _ in range(months_ahead + 1):
+        name = partition_name(table, month)
+        if name not in existing:
+            _create_partition(table, name, month, add_months(month, 1))
+            created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+def _create_partition(table: str, name: str, start: datetime, end: datetime) -> None:
+    """Create one monthly partition, moving matching rows out of the default partition."""
+    bounds = {"start": start, "end": end}
+    default = f"{table}_default"
+    try:
+        stranded = db.session.execute(
+            text(f"SELECT 1 FROM {default} WHERE created_at >= :start AND created_at < :end LIMIT 1"),
+            bounds
+        ).first()
+        if stranded:
+            # PostgreSQL refuses a partition whose rows sit in the default partition
+            db.session.execute(text(f"ALTER TABLE {table} DETACH PARTITION {default}"))
+        db.session.execute(text(
+            f"CREATE TABLE {name} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+        if stranded:
+            db.session.execute(
+                text(f"INSERT INTO {name} SELECT * FROM {default} WHERE created_at >= :start AND created_at < :end"),
+                bounds
+            )
+            db.session.execute(
+                text(f"DELETE FROM {default} WHERE created_at >= :start AND created_at < :end"),
+                bounds
+            )
+            db.session.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT"))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def detach_partition(table: str, name: str) -> None:
+    """Detach a monthly partition, leaving it as a standalone table."""
+    db.session.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+    db.session.commit()
+
+
+def drop_partition(name: str) -> None:
+    """Drop a detached partition table."""
+    db.session.execute(text(f"DROP TABLE IF EXISTS {name}"))
+    db.session.commit()
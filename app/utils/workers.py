@@ -0,0 +1,54 @@
+"""Thread pool runner for database-backed background workers."""
+import signal
+import threading
+import time
+from typing import Callable
+from flask import Flask
+
+
+def run_worker_pool(
+    app: Flask,
+    work: Callable[[], int],
+    concurrency: int = 1,
+    poll_interval: float = 1.0,
+    name: str = "worker"
+) -> None:
+    """Run ``work`` in a loop on ``concurrency`` threads until interrupted.
+
+    ``work`` runs inside an app context and returns the number of items it
+    handled; a thread sleeps ``poll_interval`` seconds whenever it finds
+    nothing to do. Queues are expected to claim rows with SKIP LOCKED, so any
+    number of threads and processes can drain the same table. SIGTERM and
+    Ctrl-C let every thread finish its current iteration before exiting.
+    """
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+    def loop():
+        from app.extensions import db
+        while not stop.is_set():
+            with app.app_context():
+                try:
+                    handled = work()
+                except Exception as e:
+                    app.logger.error(f"{name} iteration failed: {str(e)}", exc_info=True)
+                    handled = 0
+                finally:
+                    db.session.remove()
+            if not handled:
+                stop.wait(poll_interval)
+
+    threads = [
+        threading.Thread(target=loop, name=f"{name}-{i}", daemon=True)
+        for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        stop.set()
+        for thread in threads:
+            thread.join()
@@ -0,0 +1,131 @@
+"""Baseline schema: users, wallets, transactions, beneficiaries and webhook_logs
+
+Revision ID: 0f3a9c2d8b41
+Revises:
+Create Date: 2026-10-17 01:00:00.000000
+
+The tables as db.create_all created them before the schema was managed
+with migrations. Tables that already exist are skipped, so databases
+created that way upgrade through the whole chain without being stamped
+first.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0f3a9c2d8b41'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _relkind(table):
+    return op.get_bind().execute(
+        sa.text("SELECT relkind FROM pg_class WHERE relname = :table AND relnamespace = current_schema()::regnamespace"),
+        {"table": table}
+    ).scalar()
+
+
+def upgrade() -> None:
+    if _relkind("users") is None:
+        op.execute("""
+            CREATE TABLE users (
+                id VARCHAR(36) PRIMARY KEY,
+                email VARCHAR(255) NOT NULL,
+                phone VARCHAR(20) NOT NULL,
+                first_name VARCHAR(100) NOT NULL,
+                last_name VARCHAR(100) NOT NULL,
+                pin_hash VARCHAR(255) NOT NULL,
+                is_active BOOLEAN NOT NULL,
+                created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+                updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+            )
+        """)
+        op.execute("CREATE UNIQUE INDEX ix_users_email ON users (email)")
+        op.execute("CREATE UNIQUE INDEX ix_users_phone ON users (phone)")
+
+    if _relkind("wallets") is None:
+        op.execute("""
+            CREATE TABLE wallets (
+                id VARCHAR(36) PRIMARY KEY,
+                user_id VARCHAR(36) NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+                balance NUMERIC(10, 2) NOT NULL,
+                payscribe_customer_id VARCHAR(255),
+                payscribe_account_id VARCHAR(255),
+                payscribe_account_number VARCHAR(20),
+                payscribe_bank_code VARCHAR(10),
+                payscribe_bank_name VARCHAR(100),
+                virtual_account_status VARCHAR(20) NOT NULL,
+                created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+                updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+            )
+        """)
+        op.execute("CREATE UNIQUE INDEX ix_wallets_user_id ON wallets (user_id)")
+        op.execute("CREATE UNIQUE INDEX ix_wallets_payscribe_customer_id ON wallets (payscribe_customer_id)")
+        op.execute("CREATE UNIQUE INDEX ix_wallets_payscribe_account_id ON wallets (payscribe_account_id)")
+        op.execute("CREATE UNIQUE INDEX ix_wallets_payscribe_account_number ON wallets (payscribe_account_number)")
+
+    if _relkind("transactions") is None:
+        op.execute("""
+            CREATE TABLE transactions (
+                id VARCHAR(36) PRIMARY KEY,
+                user_id VARCHAR(36) NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+                type VARCHAR(20) NOT NULL,
+                status VARCHAR(20) NOT NULL,
+                amount NUMERIC(10, 2) NOT NULL,
+                reference VARCHAR(100) NOT NULL,
+                payscribe_transaction_id VARCHAR(255),
+                payscribe_reference VARCHAR(255),
+                details JSON,
+                description TEXT,
+                created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+                updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+            )
+        """)
+        op.execute("CREATE INDEX ix_transactions_user_id ON transactions (user_id)")
+        op.execute("CREATE INDEX ix_transactions_type ON transactions (type)")
+        op.execute("CREATE INDEX ix_transactions_status ON transactions (status)")
+        op.execute("CREATE UNIQUE INDEX ix_transactions_reference ON transactions (reference)")
+        op.execute("CREATE INDEX ix_transactions_payscribe_transaction_id ON transactions (payscribe_transaction_id)")
+        op.execute("CREATE INDEX ix_transactions_created_at ON transactions (created_at)")
+
+    if _relkind("beneficiaries") is None:
+        op.execute("""
+            CREATE TABLE beneficiaries (
+                id VARCHAR(36) PRIMARY KEY,
+                user_id VARCHAR(36) NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+                phone VARCHAR(20) NOT NULL,
+                network VARCHAR(20) NOT NULL,
+                name VARCHAR(100),
+                created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+                updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+                CONSTRAINT unique_user_phone UNIQUE (user_id, phone)
+            )
+        """)
+        op.execute("CREATE INDEX ix_beneficiaries_user_id ON beneficiaries (user_id)")
+        op.execute("CREATE INDEX ix_beneficiaries_phone ON beneficiaries (phone)")
+
+    if _relkind("webhook_logs") is None:
+        op.execute("""
+            CREATE TABLE webhook_logs (
+                id VARCHAR(36) PRIMARY KEY,
+                event_type VARCHAR(100) NOT NULL,
+                payload JSON NOT NULL,
+                status VARCHAR(20) NOT NULL,
+                error_message TEXT,
+                processed_at TIMESTAMP WITHOUT TIME ZONE,
+                created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+            )
+        """)
+        op.execute("CREATE INDEX ix_webhook_logs_event_type ON webhook_logs (event_type)")
+        op.execute("CREATE INDEX ix_webhook_logs_status ON webhook_logs (status)")
+        op.execute("CREATE INDEX ix_webhook_logs_created_at ON webhook_logs (created_at)")
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE webhook_logs")
+    op.execute("DROP TABLE beneficiaries")
+    op.execute("DROP TABLE transactions")
+    op.execute("DROP TABLE wallets")
+    op.execute("DROP TABLE users")
@@ -0,0 +1,39 @@
+"""Add data_plans for the synced Payscribe data plan catalog
+
+Revision ID: 1b7e4d5a9c02
+Revises: 0f3a9c2d8b41
+Create Date: 2026-10-17 01:05:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '1b7e4d5a9c02'
+down_revision = '0f3a9c2d8b41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS data_plans (
+            id VARCHAR(36) PRIMARY KEY,
+            network VARCHAR(20) NOT NULL,
+            plan_code VARCHAR(100) NOT NULL,
+            name VARCHAR(255) NOT NULL,
+            category VARCHAR(100),
+            size VARCHAR(20) NOT NULL,
+            duration VARCHAR(50) NOT NULL,
+            price NUMERIC(10, 2) NOT NULL,
+            is_active BOOLEAN NOT NULL,
+            synced_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            CONSTRAINT unique_network_plan_code UNIQUE (network, plan_code)
+        )
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE data_plans")
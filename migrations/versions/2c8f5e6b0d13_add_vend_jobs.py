@@ -0,0 +1,39 @@
+"""Add vend_jobs for the async vend queue
+
+Revision ID: 2c8f5e6b0d13
+Revises: 1b7e4d5a9c02
+Create Date: 2026-10-17 01:10:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '2c8f5e6b0d13'
+down_revision = '1b7e4d5a9c02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS vend_jobs (
+            id VARCHAR(36) PRIMARY KEY,
+            transaction_id VARCHAR(36) NOT NULL UNIQUE,
+            payload JSON NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            attempts INTEGER NOT NULL,
+            run_after TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            locked_at TIMESTAMP WITHOUT TIME ZONE,
+            last_error TEXT,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            CONSTRAINT vend_jobs_transaction_id_fkey
+                FOREIGN KEY (transaction_id) REFERENCES transactions (id) ON DELETE CASCADE
+        )
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_vend_jobs_status_run_after ON vend_jobs (status, run_after)")
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE vend_jobs")
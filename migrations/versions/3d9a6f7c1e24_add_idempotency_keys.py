@@ -0,0 +1,38 @@
+"""Add idempotency_keys for Idempotency-Key replay on purchases
+
+Revision ID: 3d9a6f7c1e24
+Revises: 2c8f5e6b0d13
+Create Date: 2026-10-17 01:15:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3d9a6f7c1e24'
+down_revision = '2c8f5e6b0d13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            id VARCHAR(36) PRIMARY KEY,
+            user_id VARCHAR(36) NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            key VARCHAR(255) NOT NULL,
+            fingerprint VARCHAR(64) NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            response_code INTEGER,
+            response_body JSON,
+            expires_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            CONSTRAINT unique_user_idempotency_key UNIQUE (user_id, key)
+        )
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_idempotency_keys_expires_at ON idempotency_keys (expires_at)")
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE idempotency_keys")
@@ -0,0 +1,39 @@
+"""Add purchase_batches and transactions.batch_id for bulk purchases
+
+Revision ID: 4e0b7a8d2f35
+Revises: 3d9a6f7c1e24
+Create Date: 2026-10-17 01:20:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '4e0b7a8d2f35'
+down_revision = '3d9a6f7c1e24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS purchase_batches (
+            id VARCHAR(36) PRIMARY KEY,
+            user_id VARCHAR(36) NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            reference VARCHAR(100) NOT NULL UNIQUE,
+            total_amount NUMERIC(12, 2) NOT NULL,
+            item_count INTEGER NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+        )
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_purchase_batches_user_id ON purchase_batches (user_id)")
+    op.execute("""
+        ALTER TABLE transactions ADD COLUMN IF NOT EXISTS batch_id VARCHAR(36)
+        REFERENCES purchase_batches (id) ON DELETE SET NULL
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_transactions_batch_id ON transactions (batch_id)")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE transactions DROP COLUMN batch_id")
+    op.execute("DROP TABLE purchase_batches")
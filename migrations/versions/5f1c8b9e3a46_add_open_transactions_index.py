@@ -0,0 +1,26 @@
+"""Add a partial (status, created_at) index on open transactions for reconciliation
+
+Revision ID: 5f1c8b9e3a46
+Revises: 4e0b7a8d2f35
+Create Date: 2026-10-17 01:25:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5f1c8b9e3a46'
+down_revision = '4e0b7a8d2f35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_transactions_status_created_at
+        ON transactions (status, created_at) WHERE status IN ('pending', 'processing')
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX ix_transactions_status_created_at")
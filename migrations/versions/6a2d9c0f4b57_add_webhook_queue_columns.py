@@ -0,0 +1,36 @@
+"""Add retry and lock columns to webhook_logs for the webhook worker queue
+
+Revision ID: 6a2d9c0f4b57
+Revises: 5f1c8b9e3a46
+Create Date: 2026-10-17 01:30:00.000000
+
+Existing rows get attempts 0 and next_attempt_at = created_at, so pending
+webhooks are picked up by the workers right away.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '6a2d9c0f4b57'
+down_revision = '5f1c8b9e3a46'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE webhook_logs ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0")
+    op.execute("ALTER TABLE webhook_logs ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMP WITHOUT TIME ZONE")
+    op.execute("UPDATE webhook_logs SET next_attempt_at = created_at WHERE next_attempt_at IS NULL")
+    op.execute("ALTER TABLE webhook_logs ALTER COLUMN next_attempt_at SET NOT NULL")
+    op.execute("ALTER TABLE webhook_logs ADD COLUMN IF NOT EXISTS locked_at TIMESTAMP WITHOUT TIME ZONE")
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_webhook_logs_status_next_attempt_at
+        ON webhook_logs (status, next_attempt_at)
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX ix_webhook_logs_status_next_attempt_at")
+    op.execute("ALTER TABLE webhook_logs DROP COLUMN locked_at")
+    op.execute("ALTER TABLE webhook_logs DROP COLUMN next_attempt_at")
+    op.execute("ALTER TABLE webhook_logs DROP COLUMN attempts")
@@ -0,0 +1,73 @@
+"""Add webhook_logs.dedup_key and a unique index on credit transactions
+
+Revision ID: 7b3e0d1a5c68
+Revises: 6a2d9c0f4b57
+Create Date: 2026-10-17 01:35:00.000000
+
+The unique index cannot be built while duplicate credit rows for the same
+Payscribe trans_id exist. This revision does not touch balances or delete
+ledger rows: if duplicates are found it stops and lists every credit row
+involved (trans_id, user, amount), to be resolved by a reviewed data fix
+before upgrading again. To check beforehand:
+
+    SELECT payscribe_transaction_id, count(*) FROM transactions
+    WHERE type = 'credit' AND payscribe_transaction_id IS NOT NULL
+    GROUP BY 1 HAVING count(*) > 1;
+
+Existing webhook logs keep a NULL dedup_key and are never deduplicated.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b3e0d1a5c68'
+down_revision = '6a2d9c0f4b57'
+branch_labels = None
+depends_on = None
+
+
+def _relkind(table):
+    return op.get_bind().execute(
+        sa.text("SELECT relkind FROM pg_class WHERE relname = :table AND relnamespace = current_schema()::regnamespace"),
+        {"table": table}
+    ).scalar()
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE webhook_logs ADD COLUMN IF NOT EXISTS dedup_key VARCHAR(255) UNIQUE")
+
+    # A partitioned table (created from the current models) dedupes credits in funding_credits instead
+    if _relkind("transactions") != "r":
+        return
+
+    duplicates = op.get_bind().execute(sa.text("""
+        SELECT payscribe_transaction_id, id, user_id, amount, created_at FROM transactions
+        WHERE type = 'credit' AND payscribe_transaction_id IN (
+            SELECT payscribe_transaction_id FROM transactions
+            WHERE type = 'credit' AND payscribe_transaction_id IS NOT NULL
+            GROUP BY payscribe_transaction_id HAVING count(*) > 1
+        )
+        ORDER BY payscribe_transaction_id, created_at, id
+    """)).all()
+    if duplicates:
+        rows = "\n".join(
+            f"  trans_id={row.payscribe_transaction_id} transaction={row.id} user={row.user_id} "
+            f"amount={row.amount} created_at={row.created_at}"
+            for row in duplicates
+        )
+        raise RuntimeError(
+            "Duplicate credit transactions share a Payscribe trans_id, so the unique credit index "
+            "cannot be built. Each duplicate credited the wallet again; resolve them with a reviewed "
+            f"data fix, then rerun the upgrade:\n{rows}"
+        )
+
+    op.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_transactions_credit_payscribe_transaction_id
+        ON transactions (type, payscribe_transaction_id) WHERE type = 'credit'
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS uq_transactions_credit_payscribe_transaction_id")
+    op.execute("ALTER TABLE webhook_logs DROP COLUMN dedup_key")
@@ -0,0 +1,35 @@
+"""Replace the transactions user_id index with keyset history indexes
+
+Revision ID: 8c4f1e2b6d79
+Revises: a3c5e7f90b12
+Create Date: 2026-10-17 01:40:00.000000
+
+Both new indexes lead with user_id, so the old single-column index is
+dropped once they exist.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4f1e2b6d79'
+down_revision = 'a3c5e7f90b12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_transactions_user_id_created_at
+        ON transactions (user_id, created_at DESC, id DESC)
+    """)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_transactions_user_id_type_created_at
+        ON transactions (user_id, type, created_at DESC, id DESC)
+    """)
+    op.execute("DROP INDEX IF EXISTS ix_transactions_user_id")
+
+
+def downgrade() -> None:
+    op.execute("CREATE INDEX ix_transactions_user_id ON transactions (user_id)")
+    op.execute("DROP INDEX ix_transactions_user_id_type_created_at")
+    op.execute("DROP INDEX ix_transactions_user_id_created_at")
@@ -0,0 +1,36 @@
+"""Add network and recipient_phone search columns to transactions
+
+Revision ID: 9d5a2f3c7e80
+Revises: 8c4f1e2b6d79
+Create Date: 2026-10-17 01:45:00.000000
+
+Existing rows are left NULL; fill them with
+``flask transactions backfill-search-columns`` after upgrading.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9d5a2f3c7e80'
+down_revision = '8c4f1e2b6d79'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE transactions ADD COLUMN IF NOT EXISTS network VARCHAR(20)")
+    op.execute("ALTER TABLE transactions ADD COLUMN IF NOT EXISTS recipient_phone VARCHAR(20)")
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_transactions_user_id_network_created_at
+        ON transactions (user_id, network, created_at DESC, id DESC)
+    """)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_transactions_recipient_phone_created_at
+        ON transactions (recipient_phone varchar_pattern_ops, created_at DESC)
+    """)
+
+
+def downgrade() -> None:
+    # Dropping the columns drops their indexes
+    op.execute("ALTER TABLE transactions DROP COLUMN recipient_phone")
+    op.execute("ALTER TABLE transactions DROP COLUMN network")
@@ -0,0 +1,131 @@
+"""Partition webhook_logs by month and move dedup keys to webhook_dedup_keys
+
+Revision ID: a3c5e7f90b12
+Revises: 7b3e0d1a5c68
+Create Date: 2026-10-16 21:10:00.000000
+
+Converts an existing, unpartitioned webhook_logs table. Databases created
+from the current models (db.create_all) already have the partitioned table
+and are left untouched.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c5e7f90b12'
+down_revision = '7b3e0d1a5c68'
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    "id, event_type, payload, dedup_key, status, error_message, attempts, "
+    "next_attempt_at, locked_at, processed_at, created_at"
+)
+INDEXES = [
+    "CREATE INDEX ix_webhook_logs_event_type ON webhook_logs (event_type)",
+    "CREATE INDEX ix_webhook_logs_status ON webhook_logs (status)",
+    "CREATE INDEX ix_webhook_logs_created_at ON webhook_logs (created_at)",
+    "CREATE INDEX ix_webhook_logs_status_next_attempt_at ON webhook_logs (status, next_attempt_at)",
+]
+
+
+def _relkind(table):
+    return op.get_bind().execute(
+        sa.text("SELECT relkind FROM pg_class WHERE relname = :table AND relnamespace = current_schema()::regnamespace"),
+        {"table": table}
+    ).scalar()
+
+
+def upgrade() -> None:
+    if _relkind("webhook_logs") != "r":
+        return
+
+    # Columns the copy reads, in case the table predates them
+    op.execute("ALTER TABLE webhook_logs ADD COLUMN IF NOT EXISTS dedup_key VARCHAR(255)")
+    op.execute("ALTER TABLE webhook_logs ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0")
+    op.execute("ALTER TABLE webhook_logs ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMP WITHOUT TIME ZONE")
+    op.execute("UPDATE webhook_logs SET next_attempt_at = created_at WHERE next_attempt_at IS NULL")
+    op.execute("ALTER TABLE webhook_logs ADD COLUMN IF NOT EXISTS locked_at TIMESTAMP WITHOUT TIME ZONE")
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS webhook_dedup_keys (
+            dedup_key VARCHAR(255) PRIMARY KEY,
+            webhook_log_id VARCHAR(36) NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+        )
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_webhook_dedup_keys_created_at ON webhook_dedup_keys (created_at)")
+    op.execute("""
+        INSERT INTO webhook_dedup_keys (dedup_key, webhook_log_id, created_at)
+        SELECT dedup_key, id, created_at FROM webhook_logs WHERE dedup_key IS NOT NULL
+        ON CONFLICT DO NOTHING
+    """)
+
+    op.execute("ALTER TABLE webhook_logs RENAME TO webhook_logs_unpartitioned")
+    op.execute("ALTER TABLE webhook_logs_unpartitioned RENAME CONSTRAINT webhook_logs_pkey TO webhook_logs_unpartitioned_pkey")
+    op.execute("""
+        CREATE TABLE webhook_logs (
+            id VARCHAR(36) NOT NULL,
+            event_type VARCHAR(100) NOT NULL,
+            payload JSON NOT NULL,
+            dedup_key VARCHAR(255),
+            status VARCHAR(20) NOT NULL,
+            error_message TEXT,
+            attempts INTEGER NOT NULL,
+            next_attempt_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            locked_at TIMESTAMP WITHOUT TIME ZONE,
+            processed_at TIMESTAMP WITHOUT TIME ZONE,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("CREATE TABLE webhook_logs_default PARTITION OF webhook_logs DEFAULT")
+    # One partition per month from the oldest row through three months ahead
+    op.execute("""
+        DO $$
+        DECLARE
+            month DATE := date_trunc('month', COALESCE((SELECT min(created_at) FROM webhook_logs_unpartitioned), now()));
+        BEGIN
+            WHILE month <= date_trunc('month', now()) + interval '3 months' LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF webhook_logs FOR VALUES FROM (%L) TO (%L)',
+                    'webhook_logs_' || to_char(month, 'YYYY_MM'), month, month + interval '1 month'
+                );
+                month := month + interval '1 month';
+            END LOOP;
+        END $$
+    """)
+    op.execute(f"INSERT INTO webhook_logs ({COLUMNS}) SELECT {COLUMNS} FROM webhook_logs_unpartitioned")
+    op.execute("DROP TABLE webhook_logs_unpartitioned")
+    for statement in INDEXES:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    if _relkind("webhook_logs") != "p":
+        return
+
+    op.execute("ALTER TABLE webhook_logs RENAME TO webhook_logs_partitioned")
+    op.execute("ALTER TABLE webhook_logs_partitioned RENAME CONSTRAINT webhook_logs_pkey TO webhook_logs_partitioned_pkey")
+    op.execute("""
+        CREATE TABLE webhook_logs (
+            id VARCHAR(36) PRIMARY KEY,
+            event_type VARCHAR(100) NOT NULL,
+            payload JSON NOT NULL,
+            dedup_key VARCHAR(255) UNIQUE,
+            status VARCHAR(20) NOT NULL,
+            error_message TEXT,
+            attempts INTEGER NOT NULL,
+            next_attempt_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            locked_at TIMESTAMP WITHOUT TIME ZONE,
+            processed_at TIMESTAMP WITHOUT TIME ZONE,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+        )
+    """)
+    op.execute(f"INSERT INTO webhook_logs ({COLUMNS}) SELECT {COLUMNS} FROM webhook_logs_partitioned")
+    # Dropping the parent drops all of its partitions and their indexes
+    op.execute("DROP TABLE webhook_logs_partitioned")
+    for statement in INDEXES:
+        op.execute(statement)
+    op.execute("DROP TABLE webhook_dedup_keys")
@@ -0,0 +1,138 @@
+"""Partition transactions by month and move credit dedup to funding_credits
+
+Revision ID: b7d2f4a61c08
+Revises: e6b3a4d8f901
+Create Date: 2026-10-16 23:40:00.000000
+
+Converts an existing, unpartitioned transactions table. Databases created
+from the current models (db.create_all) already have the partitioned table
+and are left untouched. The copy rewrites the whole table: run it in a
+maintenance window with the API and workers stopped.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2f4a61c08'
+down_revision = 'e6b3a4d8f901'
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    "id, user_id, type, status, amount, reference, payscribe_transaction_id, payscribe_reference, "
+    "batch_id, details, network, recipient_phone, description, created_at, updated_at"
+)
+INDEXES = [
+    "CREATE INDEX ix_transactions_type ON transactions (type)",
+    "CREATE INDEX ix_transactions_status ON transactions (status)",
+    "CREATE INDEX ix_transactions_reference ON transactions (reference)",
+    "CREATE INDEX ix_transactions_payscribe_transaction_id ON transactions (payscribe_transaction_id)",
+    "CREATE INDEX ix_transactions_batch_id ON transactions (batch_id)",
+    "CREATE INDEX ix_transactions_created_at ON transactions (created_at)",
+    "CREATE INDEX ix_transactions_user_id_created_at ON transactions (user_id, created_at DESC, id DESC)",
+    "CREATE INDEX ix_transactions_user_id_type_created_at ON transactions (user_id, type, created_at DESC, id DESC)",
+    "CREATE INDEX ix_transactions_user_id_network_created_at ON transactions (user_id, network, created_at DESC, id DESC)",
+    "CREATE INDEX ix_transactions_recipient_phone_created_at ON transactions (recipient_phone varchar_pattern_ops, created_at DESC)",
+    "CREATE INDEX ix_transactions_status_created_at ON transactions (status, created_at) WHERE status IN ('pending', 'processing')",
+]
+TABLE_BODY = """
+    id VARCHAR(36) NOT NULL,
+    user_id VARCHAR(36) NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    type VARCHAR(20) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    amount NUMERIC(10, 2) NOT NULL,
+    reference VARCHAR(100) NOT NULL,
+    payscribe_transaction_id VARCHAR(255),
+    payscribe_reference VARCHAR(255),
+    batch_id VARCHAR(36) REFERENCES purchase_batches (id) ON DELETE SET NULL,
+    details JSON,
+    network VARCHAR(20),
+    recipient_phone VARCHAR(20),
+    description TEXT,
+    created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+"""
+
+
+def _relkind(table):
+    return op.get_bind().execute(
+        sa.text("SELECT relkind FROM pg_class WHERE relname = :table AND relnamespace = current_schema()::regnamespace"),
+        {"table": table}
+    ).scalar()
+
+
+def upgrade() -> None:
+    if _relkind("transactions") != "r":
+        return
+
+    # Columns added to the model since the table was created
+    op.execute("ALTER TABLE transactions ADD COLUMN IF NOT EXISTS batch_id VARCHAR(36)")
+    op.execute("ALTER TABLE transactions ADD COLUMN IF NOT EXISTS network VARCHAR(20)")
+    op.execute("ALTER TABLE transactions ADD COLUMN IF NOT EXISTS recipient_phone VARCHAR(20)")
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS funding_credits (
+            payscribe_transaction_id VARCHAR(255) PRIMARY KEY,
+            transaction_id VARCHAR(36) NOT NULL,
+            user_id VARCHAR(36) NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+        )
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_funding_credits_user_id ON funding_credits (user_id)")
+    op.execute("""
+        INSERT INTO funding_credits (payscribe_transaction_id, transaction_id, user_id, created_at)
+        SELECT payscribe_transaction_id, id, user_id, created_at FROM transactions
+        WHERE type = 'credit' AND payscribe_transaction_id IS NOT NULL
+        ON CONFLICT DO NOTHING
+    """)
+
+    # A foreign key can only reference the whole (id, created_at) primary key
+    op.execute("ALTER TABLE vend_jobs DROP CONSTRAINT IF EXISTS vend_jobs_transaction_id_fkey")
+
+    op.execute("ALTER TABLE transactions RENAME TO transactions_unpartitioned")
+    op.execute("ALTER TABLE transactions_unpartitioned RENAME CONSTRAINT transactions_pkey TO transactions_unpartitioned_pkey")
+    op.execute(f"CREATE TABLE transactions ({TABLE_BODY}, PRIMARY KEY (id, created_at)) PARTITION BY RANGE (created_at)")
+    op.execute("CREATE TABLE transactions_default PARTITION OF transactions DEFAULT")
+    # One partition per month from the oldest row through three months ahead
+    op.execute("""
+        DO $$
+        DECLARE
+            month DATE := date_trunc('month', COALESCE((SELECT min(created_at) FROM transactions_unpartitioned), now()));
+        BEGIN
+            WHILE month <= date_trunc('month', now()) + interval '3 months' LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF transactions FOR VALUES FROM (%L) TO (%L)',
+                    'transactions_' || to_char(month, 'YYYY_MM'), month, month + interval '1 month'
+                );
+                month := month + interval '1 month';
+            END LOOP;
+        END $$
+    """)
+    op.execute(f"INSERT INTO transactions ({COLUMNS}) SELECT {COLUMNS} FROM transactions_unpartitioned")
+    op.execute("DROP TABLE transactions_unpartitioned")
+    for statement in INDEXES:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    if _relkind("transactions") != "p":
+        return
+
+    op.execute("ALTER TABLE transactions RENAME TO transactions_partitioned")
+    op.execute("ALTER TABLE transactions_partitioned RENAME CONSTRAINT transactions_pkey TO transactions_partitioned_pkey")
+    op.execute(f"CREATE TABLE transactions ({TABLE_BODY}, PRIMARY KEY (id), UNIQUE (reference))")
+    op.execute(f"INSERT INTO transactions ({COLUMNS}) SELECT {COLUMNS} FROM transactions_partitioned")
+    # Dropping the parent drops all of its partitions and their indexes
+    op.execute("DROP TABLE transactions_partitioned")
+    for statement in INDEXES:
+        op.execute(statement)
+    op.execute("""
+        CREATE UNIQUE INDEX uq_transactions_credit_payscribe_transaction_id
+        ON transactions (type, payscribe_transaction_id) WHERE type = 'credit'
+    """)
+    op.execute("""
+        ALTER TABLE vend_jobs ADD CONSTRAINT vend_jobs_transaction_id_fkey
+        FOREIGN KEY (transaction_id) REFERENCES transactions (id) ON DELETE CASCADE
+    """)
+    op.execute("DROP TABLE funding_credits")
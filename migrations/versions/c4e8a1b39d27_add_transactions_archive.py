@@ -0,0 +1,57 @@
+"""Add transactions_archive for finalized transactions moved out of transactions
+
+Revision ID: c4e8a1b39d27
+Revises: b7d2f4a61c08
+Create Date: 2026-10-17 00:30:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8a1b39d27'
+down_revision = 'b7d2f4a61c08'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS transactions_archive (
+            id VARCHAR(36) PRIMARY KEY,
+            user_id VARCHAR(36) NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            type VARCHAR(20) NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            amount NUMERIC(10, 2) NOT NULL,
+            reference VARCHAR(100) NOT NULL,
+            payscribe_transaction_id VARCHAR(255),
+            payscribe_reference VARCHAR(255),
+            batch_id VARCHAR(36) REFERENCES purchase_batches (id) ON DELETE SET NULL,
+            details JSON,
+            network VARCHAR(20),
+            recipient_phone VARCHAR(20),
+            description TEXT,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+        )
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_transactions_archive_batch_id ON transactions_archive (batch_id)")
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_transactions_archive_user_id_created_at
+        ON transactions_archive (user_id, created_at DESC, id DESC)
+    """)
+
+
+def downgrade() -> None:
+    # Archived rows go back to transactions first so downgrading loses no history
+    op.execute("""
+        INSERT INTO transactions (
+            id, user_id, type, status, amount, reference, payscribe_transaction_id, payscribe_reference,
+            batch_id, details, network, recipient_phone, description, created_at, updated_at
+        )
+        SELECT
+            id, user_id, type, status, amount, reference, payscribe_transaction_id, payscribe_reference,
+            batch_id, details, network, recipient_phone, description, created_at, updated_at
+        FROM transactions_archive
+    """)
+    op.execute("DROP TABLE transactions_archive")
@@ -0,0 +1,23 @@
+"""Link idempotency keys to the purchase or batch their request debited
+
+Revision ID: d8a1c3e5f702
+Revises: c4e8a1b39d27
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8a1c3e5f702'
+down_revision = 'c4e8a1b39d27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE idempotency_keys ADD COLUMN IF NOT EXISTS transaction_reference VARCHAR(100)")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE idempotency_keys DROP COLUMN transaction_reference")
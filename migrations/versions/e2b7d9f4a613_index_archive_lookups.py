@@ -0,0 +1,30 @@
+"""Index transactions_archive on reference and payscribe_transaction_id
+
+Revision ID: e2b7d9f4a613
+Revises: d8a1c3e5f702
+Create Date: 2026-10-18 10:30:00.000000
+
+Status webhooks and requeries that miss the hot table fall back to the
+archive by reference or Payscribe trans_id.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b7d9f4a613'
+down_revision = 'd8a1c3e5f702'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE INDEX IF NOT EXISTS ix_transactions_archive_reference ON transactions_archive (reference)")
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_transactions_archive_payscribe_transaction_id
+        ON transactions_archive (payscribe_transaction_id)
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX ix_transactions_archive_payscribe_transaction_id")
+    op.execute("DROP INDEX ix_transactions_archive_reference")
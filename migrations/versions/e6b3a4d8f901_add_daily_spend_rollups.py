@@ -0,0 +1,36 @@
+"""Add daily_spend_rollups for the spending summary
+
+Revision ID: e6b3a4d8f901
+Revises: 9d5a2f3c7e80
+Create Date: 2026-10-17 01:50:00.000000
+
+The table starts empty; fill it with ``flask transactions rebuild-rollups``
+after upgrading.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6b3a4d8f901'
+down_revision = '9d5a2f3c7e80'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS daily_spend_rollups (
+            user_id VARCHAR(36) NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            day DATE NOT NULL,
+            type VARCHAR(20) NOT NULL,
+            network VARCHAR(20) NOT NULL,
+            amount NUMERIC(14, 2) NOT NULL,
+            count INTEGER NOT NULL,
+            updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            PRIMARY KEY (user_id, day, type, network)
+        )
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE daily_spend_rollups")
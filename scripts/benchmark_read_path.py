@@ -0,0 +1,123 @@
+"""Benchmark ORM entities vs projected row tuples for transaction history pages.
+
+Builds one page of 50-500 transactions both ways -- ORM query plus
+Transaction.to_dict(), and TransactionRow select plus to_dict() -- and
+serializes it to JSON, as GET /transactions does. Prints CPU time and
+peak allocated bytes per row for each.
+
+Runs against an in-memory SQLite database by default. Set
+BENCHMARK_DATABASE_URL to a scratch PostgreSQL database for numbers
+closer to production; the script creates and drops all tables there.
+
+    PYTHONPATH=. python scripts/benchmark_read_path.py [--rows 5000] [--repeat 20]
+"""
+import os
+import json
+import time
+import argparse
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models import User, Transaction, TransactionRow
+from app.utils.helpers import generate_uuid
+
+PAGE_SIZES = [50, 100, 200, 500]
+
+
+class BenchmarkConfig(Config):
+    SQLALCHEMY_DATABASE_URI = os.getenv("BENCHMARK_DATABASE_URL", "sqlite://")
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+
+
+def seed(rows: int) -> str:
+    """Create one user with ``rows`` purchases. Returns the user id."""
+    user = User(email="benchmark@example.com", phone="08000000000", first_name="Bench", last_name="Mark", pin="0000")
+    db.session.add(user)
+    db.session.commit()
+
+    now = datetime.utcnow()
+    db.session.execute(Transaction.__table__.insert(), [
+        {
+            "id": generate_uuid(),
+            "user_id": user.id,
+            "type": "airtime",
+            "status": "success",
+            "amount": Decimal("100.00"),
+            "reference": f"BENCH{index:08d}",
+            "payscribe_transaction_id": f"PS{index:08d}",
+            "details": {"network": "mtn", "phone": "+2348031234567", "amount": 100},
+            "network": "mtn",
+            "recipient_phone": "+2348031234567",
+            "description": "Airtime purchase - MTN",
+            "created_at": now - timedelta(minutes=index),
+            "updated_at": now - timedelta(minutes=index),
+        }
+        for index in range(rows)
+    ])
+    db.session.commit()
+    return user.id
+
+
+def orm_page(user_id: str, limit: int) -> str:
+    transactions = Transaction.query.filter(Transaction.user_id == user_id).order_by(
+        Transaction.created_at.desc(), Transaction.id.desc()
+    ).limit(limit).all()
+    return json.dumps({"transactions": [transaction.to_dict() for transaction in transactions]})
+
+
+def projected_page(user_id: str, limit: int) -> str:
+    statement = TransactionRow.select_from(Transaction).where(Transaction.user_id == user_id).order_by(
+        Transaction.created_at.desc(), Transaction.id.desc()
+    ).limit(limit)
+    rows = [TransactionRow._make(row) for row in db.session.execute(statement)]
+    return json.dumps({"transactions": [row.to_dict() for row in rows]})
+
+
+def measure(build_page, user_id: str, limit: int, repeat: int):
+    """Return (CPU microseconds per row, peak bytes per row) for one page, best of ``repeat``."""
+    best_cpu = None
+    for _ in range(repeat):
+        # A fresh session per page, like one per API request
+        db.session.remove()
+        started = time.process_time()
+        build_page(user_id, limit)
+        elapsed = time.process_time() - started
+        best_cpu = elapsed if best_cpu is None else min(best_cpu, elapsed)
+
+    db.session.remove()
+    tracemalloc.start()
+    build_page(user_id, limit)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best_cpu * 1e6 / limit, peak / limit
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000, help="Transactions to seed.")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per page size (best is kept).")
+    args = parser.parse_args()
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        db.create_all()
+        if db.engine.dialect.name == "postgresql":
+            from app.services.transaction_service import TransactionService
+            TransactionService().ensure_partitions()
+        try:
+            user_id = seed(args.rows)
+            print(f"{'rows':>5}  {'orm us/row':>11}  {'rows us/row':>11}  {'orm B/row':>10}  {'rows B/row':>10}")
+            for limit in PAGE_SIZES:
+                orm_cpu, orm_bytes = measure(orm_page, user_id, limit, args.repeat)
+                row_cpu, row_bytes = measure(projected_page, user_id, limit, args.repeat)
+                print(f"{limit:>5}  {orm_cpu:>11.1f}  {row_cpu:>11.1f}  {orm_bytes:>10.0f}  {row_bytes:>10.0f}")
+        finally:
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,15 @@
 from app import create_app
 from app.extensions import db
 from app.config import Config
+from app.services.webhook_archive_service import WebhookArchiveService
+from app.services.transaction_service import TransactionService
 
 app = create_app(Config)
 
 with app.app_context():
     db.create_all()
+    if db.engine.dialect.name == "postgresql":
+        WebhookArchiveService().ensure_partitions()
+        TransactionService().ensure_partitions()
     print("Database tables created successfully!")
 
@@ -0,0 +1,46 @@
+"""Shared fixtures: the app on the test database, with fresh tables per test.
+
+Tests need PostgreSQL (partitioned tables, ON CONFLICT, RETURNING). They use
+TestingConfig's database unless TEST_DATABASE_URL points elsewhere.
+"""
+import os
+from decimal import Decimal
+import pytest
+from app import create_app
+from app.config import TestingConfig
+from app.extensions import db
+from app.models import User, Wallet
+from app.services.transaction_service import TransactionService
+from app.services.webhook_archive_service import WebhookArchiveService
+
+
+class Config(TestingConfig):
+    SQLALCHEMY_DATABASE_URI = os.getenv("TEST_DATABASE_URL", TestingConfig.SQLALCHEMY_DATABASE_URI)
+    RATELIMIT_ENABLED = False
+
+
+@pytest.fixture
+def app():
+    app = create_app(Config)
+    with app.app_context():
+        db.create_all()
+        TransactionService().ensure_partitions()
+        WebhookArchiveService().ensure_partitions()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def user(app):
+    """A user whose wallet holds NGN 5,000."""
+    user = User(email="ada@example.com", phone="08030000000", first_name="Ada", last_name="Obi", pin="1234")
+    db.session.add(user)
+    db.session.flush()
+    wallet = Wallet(user_id=user.id)
+    wallet.balance = Decimal("5000.00")
+    db.session.add(wallet)
+    db.session.commit()
+    user_id = user.id
+    db.session.close()
+    return user_id
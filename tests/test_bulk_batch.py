@@ -0,0 +1,99 @@
+"""Bulk purchases: settling a synchronous batch and reading it back."""
+from decimal import Decimal
+from unittest.mock import MagicMock
+from sqlalchemy import delete, select
+from app.extensions import db
+from app.models import PurchaseBatch, Transaction, ArchivedTransaction, Wallet
+from app.services.bulk_purchase_service import BulkPurchaseService
+from app.services.purchase_service import PurchaseService
+from app.errors.exceptions import PayscribeAPIException, PayscribeUnavailableException
+
+
+def _line(index):
+    phone = f"+23480312345{index:02d}"
+    return {
+        "transaction_type": "airtime",
+        "reference": f"BULK-{index}",
+        "details": {"network": "mtn", "phone": phone, "amount": 100},
+        "description": "Airtime purchase - MTN",
+        "amount": Decimal("100"),
+        "vend_payload": None
+    }
+
+
+def test_get_batch_counts_live_and_archived_lines(user):
+    batch = PurchaseBatch(user_id=user, reference="BATCH-1", total_amount=Decimal("300"), item_count=3)
+    batch_id = batch.id
+    snapshots = PurchaseService().reserve_batch(batch, [_line(index) for index in range(3)])
+    PurchaseService().fail_many(snapshots[:1])
+
+    # Move the failed line to the archive
+    table = Transaction.__table__
+    columns = [column.name for column in ArchivedTransaction.__table__.columns]
+    db.session.execute(ArchivedTransaction.__table__.insert().from_select(
+        columns, select(*[table.c[name] for name in columns]).where(table.c.id == snapshots[0]["id"])
+    ))
+    db.session.execute(delete(table).where(table.c.id == snapshots[0]["id"]))
+    db.session.commit()
+
+    result = BulkPurchaseService().get_batch(user, batch_id)
+
+    assert result["batch"]["counts"] == {"failed": 1, "pending": 2}
+    assert result["batch"]["status"] == "processing"
+    assert [line["reference"] for line in result["results"]] == ["BULK-0", "BULK-1", "BULK-2"]
+    assert result["results"][0] == {
+        "transaction_id": snapshots[0]["id"],
+        "reference": "BULK-0",
+        "type": "airtime",
+        "network": "mtn",
+        "phone": "+2348031234500",
+        "amount": 100.0,
+        "status": "failed",
+        "error": None
+    }
+
+
+def _purchase(user, monkeypatch, responses, complete_many=None):
+    items = [
+        {"type": "airtime", "network": "mtn", "phone": f"0803123456{index}", "amount": 100}
+        for index in range(len(responses))
+    ]
+    service = BulkPurchaseService()
+
+    async def vend_all(lines):
+        return responses
+
+    monkeypatch.setattr(service, "_vend_all", vend_all)
+    if complete_many:
+        monkeypatch.setattr(service.purchase_service, "complete_many", complete_many)
+    return service.purchase_bulk(user, items)
+
+
+def test_only_explicit_refusals_are_refunded(user, monkeypatch):
+    result = _purchase(user, monkeypatch, [
+        {"status": False, "description": "Invalid recipient"},
+        PayscribeAPIException("Payscribe API request error: Read timed out"),
+        PayscribeUnavailableException(),
+    ])
+
+    # The timed-out line may have been delivered, so it stays pending for reconciliation
+    assert [line["status"] for line in result["results"]] == ["failed", "pending", "failed"]
+    assert db.session.query(Wallet.balance).filter_by(user_id=user).scalar() == Decimal("4900.00")
+
+
+def test_failed_settlement_still_refunds_failed_lines(user, monkeypatch):
+    result = _purchase(user, monkeypatch, [
+        {"status": True, "message": {"details": {"trans_id": "PS-1", "status": "success"}}},
+        {"status": False, "description": "Invalid recipient"},
+    ], complete_many=MagicMock(side_effect=RuntimeError("connection lost")))
+
+    # The vended line is left pending for reconciliation, the refused one is refunded
+    assert [line["status"] for line in result["results"]] == ["pending", "failed"]
+    assert db.session.query(Wallet.balance).filter_by(user_id=user).scalar() == Decimal("4900.00")
+
+
+def test_large_batch_is_queued(app):
+    items = [{"type": "airtime"}] * (app.config["BULK_PURCHASE_SYNC_MAX_ITEMS"] + 1)
+
+    assert BulkPurchaseService().should_queue(items)
+    assert not BulkPurchaseService().should_queue(items[:1])
@@ -0,0 +1,61 @@
+"""Collection paging in funding reconciliation when the API misbehaves."""
+import asyncio
+from datetime import datetime, timedelta
+from app.services.funding_reconciliation_service import FundingReconciliationService
+
+ACCOUNT = {"user_id": "user-1", "payscribe_account_number": "9900000001"}
+
+
+class RepeatingClient:
+    """Returns the same full page of collections whatever page is asked for."""
+
+    def __init__(self, page_size):
+        self.calls = 0
+        self.items = [
+            {"trans_id": f"COL-{i}", "amount": "1000", "status": "success"} for i in range(page_size)
+        ]
+
+    async def list_collections(self, **kwargs):
+        self.calls += 1
+        return {"status": True, "message": {"details": {"transactions": self.items}}}
+
+
+class EndlessClient:
+    """Returns a new full page of collections for every page number."""
+
+    def __init__(self, page_size):
+        self.calls = 0
+        self.page_size = page_size
+
+    async def list_collections(self, page, **kwargs):
+        self.calls += 1
+        items = [
+            {"trans_id": f"COL-{page}-{i}", "amount": "1000", "status": "success"} for i in range(self.page_size)
+        ]
+        return {"status": True, "message": {"details": {"transactions": items}}}
+
+
+def _fetch(client, page_size):
+    end = datetime.utcnow()
+    return asyncio.run(
+        FundingReconciliationService()._fetch_collections(client, ACCOUNT, end - timedelta(hours=24), end, page_size=page_size)
+    )
+
+
+def test_paging_stops_when_the_page_repeats(app):
+    client = RepeatingClient(page_size=3)
+
+    collections = _fetch(client, page_size=3)
+
+    assert client.calls == 2
+    assert [c["trans_id"] for c in collections] == ["COL-0", "COL-1", "COL-2"]
+
+
+def test_paging_stops_at_the_page_cap(app):
+    app.config["FUNDING_RECONCILE_MAX_PAGES"] = 4
+    client = EndlessClient(page_size=2)
+
+    collections = _fetch(client, page_size=2)
+
+    assert client.calls == 4
+    assert len(collections) == 8
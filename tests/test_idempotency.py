@@ -0,0 +1,138 @@
+"""Idempotency-Key handling around POST endpoints."""
+from datetime import datetime, timedelta
+from decimal import Decimal
+import pytest
+from sqlalchemy import update
+from app.extensions import db
+from app.models import IdempotencyKey, Wallet
+from app.services.purchase_service import PurchaseService
+from app.utils.helpers import generate_uuid
+from app.utils.idempotency import idempotent, IDEMPOTENCY_HEADER
+
+
+class Endpoint:
+    """Stands in for a Resource: returns the queued responses in order.
+
+    A queued callable is called with the user id and its result returned.
+    """
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    @idempotent
+    def post(self, current_user_id):
+        self.calls += 1
+        response = self.responses.pop(0)
+        return response(current_user_id) if callable(response) else response
+
+
+def _post(app, endpoint, user_id, key="key-1"):
+    with app.test_request_context("/purchase", method="POST", json={"amount": 100}, headers={IDEMPOTENCY_HEADER: key}):
+        return endpoint.post(user_id)
+
+
+def _reserve(user_id):
+    return PurchaseService().reserve(
+        user_id=user_id,
+        transaction_type="airtime",
+        amount=Decimal("100"),
+        reference=generate_uuid(),
+        details={"network": "mtn", "phone": "08031234567", "amount": 100.0},
+        description="Airtime purchase - MTN 08031234567"
+    )
+
+
+def test_success_is_replayed(app, user):
+    endpoint = Endpoint(({"status": True}, 200), ({"status": True}, 200))
+
+    assert _post(app, endpoint, user) == ({"status": True}, 200)
+    assert _post(app, endpoint, user) == ({"status": True}, 200, {"Idempotent-Replayed": "true"})
+    assert endpoint.calls == 1
+
+
+def test_server_error_releases_key(app, user):
+    endpoint = Endpoint(({"status": False, "message": "Upstream down"}, 503), ({"status": True}, 200))
+
+    assert _post(app, endpoint, user) == ({"status": False, "message": "Upstream down"}, 503)
+    assert IdempotencyKey.query.filter_by(user_id=user, key="key-1").count() == 0
+
+    # The retry runs the endpoint again instead of replaying the 503
+    assert _post(app, endpoint, user) == ({"status": True}, 200)
+    assert endpoint.calls == 2
+
+
+def test_server_error_after_debit_keeps_key(app, user):
+    def vend_timed_out(user_id):
+        _reserve(user_id)
+        return {"status": False, "message": "Vend timed out"}, 502
+
+    endpoint = Endpoint(vend_timed_out, ({"status": True}, 200))
+
+    assert _post(app, endpoint, user) == ({"status": False, "message": "Vend timed out"}, 502)
+    assert IdempotencyKey.query.filter_by(user_id=user, key="key-1").one().status == "completed"
+
+    # The retry replays the 502 instead of debiting and vending again
+    assert _post(app, endpoint, user) == ({"status": False, "message": "Vend timed out"}, 502, {"Idempotent-Replayed": "true"})
+    assert endpoint.calls == 1
+    assert db.session.query(Wallet.balance).filter_by(user_id=user).scalar() == Decimal("4900.00")
+
+
+def test_server_error_after_refund_releases_key(app, user):
+    def vend_failed(user_id):
+        PurchaseService().fail(_reserve(user_id))
+        return {"status": False, "message": "Vend failed"}, 502
+
+    endpoint = Endpoint(vend_failed, ({"status": True}, 200))
+
+    assert _post(app, endpoint, user) == ({"status": False, "message": "Vend failed"}, 502)
+    assert IdempotencyKey.query.filter_by(user_id=user, key="key-1").count() == 0
+    assert _post(app, endpoint, user) == ({"status": True}, 200)
+
+
+class WorkerDied(BaseException):
+    """Kills the request the way a dead worker would: no except block runs."""
+
+
+def _age_key(app, user):
+    """Make the key look abandoned past IDEMPOTENCY_STALE_SECONDS."""
+    stale = datetime.utcnow() - timedelta(seconds=app.config["IDEMPOTENCY_STALE_SECONDS"] + 1)
+    db.session.execute(
+        update(IdempotencyKey).where(IdempotencyKey.user_id == user, IdempotencyKey.key == "key-1").values(updated_at=stale)
+    )
+    db.session.commit()
+
+
+def test_stale_key_after_debit_returns_the_purchase(app, user):
+    reserved = {}
+
+    def died_after_debit(user_id):
+        reserved.update(_reserve(user_id))
+        raise WorkerDied()
+
+    endpoint = Endpoint(died_after_debit, ({"status": True}, 200))
+    with pytest.raises(WorkerDied):
+        _post(app, endpoint, user)
+    _age_key(app, user)
+
+    body, status_code, headers = _post(app, endpoint, user)
+
+    # The retry reports the pending purchase instead of debiting and vending again
+    assert (status_code, headers) == (200, {"Idempotent-Replayed": "true"})
+    assert body["data"]["transaction"]["reference"] == reserved["reference"]
+    assert body["data"]["transaction"]["status"] == "pending"
+    assert endpoint.calls == 1
+    assert db.session.query(Wallet.balance).filter_by(user_id=user).scalar() == Decimal("4900.00")
+
+
+def test_stale_key_without_debit_is_taken_over(app, user):
+    def died_before_debit(user_id):
+        raise WorkerDied()
+
+    endpoint = Endpoint(died_before_debit, ({"status": True}, 200))
+    with pytest.raises(WorkerDied):
+        _post(app, endpoint, user)
+    _age_key(app, user)
+
+    assert _post(app, endpoint, user) == ({"status": True}, 200)
+    assert IdempotencyKey.query.filter_by(user_id=user, key="key-1").one().status == "completed"
@@ -0,0 +1,63 @@
+"""Statement budget of the purchase unit of work (see PurchaseService)."""
+from decimal import Decimal
+from unittest.mock import MagicMock
+import pytest
+from sqlalchemy import event
+from app.extensions import db
+from app.models import Wallet, Transaction
+from app.services.airtime_service import AirtimeService
+from app.errors.exceptions import PayscribeAPIException
+
+
+@pytest.fixture
+def statements(app):
+    """Collect every SQL statement sent to the database while the test runs."""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(db.engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def airtime_service():
+    service = AirtimeService()
+    service.payscribe_client = MagicMock()
+    service.payscribe_client.vend_airtime.return_value = {
+        "status": True,
+        "message": {"details": {"trans_id": "PS-1", "ref": "AT-1", "status": "success"}}
+    }
+    return service
+
+
+def _verbs(statements):
+    return [statement.split(None, 1)[0].upper() for statement in statements]
+
+
+def test_successful_purchase(user, statements, airtime_service):
+    result = airtime_service.purchase_airtime(user, "mtn", Decimal("100"), "08031234567")
+
+    assert result["transaction"]["status"] == "success"
+    # reserve: debit, transaction, spend rollup; complete: transaction update
+    assert _verbs(statements) == ["UPDATE", "INSERT", "INSERT", "UPDATE"]
+    assert db.session.query(Transaction.status).filter_by(id=result["transaction"]["id"]).scalar() == "success"
+
+
+def test_successful_purchase_saving_beneficiary(user, statements, airtime_service):
+    airtime_service.purchase_airtime(user, "mtn", Decimal("100"), "08031234567", save_beneficiary=True)
+
+    assert _verbs(statements) == ["UPDATE", "INSERT", "INSERT", "UPDATE", "INSERT"]
+
+
+def test_failed_vend_refunds(user, statements, airtime_service):
+    airtime_service.payscribe_client.vend_airtime.return_value = {"status": False, "description": "Vend failed"}
+
+    with pytest.raises(PayscribeAPIException):
+        airtime_service.purchase_airtime(user, "mtn", Decimal("100"), "08031234567")
+
+    # reserve, then fail: transaction update, refund, spend rollup reversal
+    assert _verbs(statements) == ["UPDATE", "INSERT", "INSERT", "UPDATE", "UPDATE", "INSERT"]
+    assert db.session.query(Wallet.balance).filter_by(user_id=user).scalar() == Decimal("5000.00")
@@ -0,0 +1,56 @@
+"""Applying requery answers to open purchases."""
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+from app.integrations import AsyncPayscribeClient
+from app.integrations.payscribe.client import parse_response
+from app.services.reconciliation_service import ReconciliationService
+
+
+def _snapshot(age_seconds):
+    return {"id": "t1", "reference": "AT-1", "created_at": datetime.utcnow() - timedelta(seconds=age_seconds)}
+
+
+def _apply(response, age_seconds=7200):
+    service = ReconciliationService()
+    service.purchase_service = MagicMock()
+    service.purchase_service.fail_many.side_effect = len
+    summary = service._apply([_snapshot(age_seconds)], [response])
+    return summary, service.purchase_service.fail_many.call_args.args[0]
+
+
+def test_explicit_not_found_is_refunded(app):
+    summary, failed = _apply({"status": False, "status_code": 404, "description": "Transaction not found"})
+
+    assert summary["failed"] == 1
+    assert len(failed) == 1
+
+
+def test_http_404_requery_is_refunded(app, monkeypatch):
+    response = MagicMock(status_code=404, text="")
+    response.json.return_value = {"status": False, "description": "Transaction not found"}
+
+    async def make_request(self, method, endpoint, data=None, params=None, network=None):
+        return parse_response(response)
+
+    monkeypatch.setattr(AsyncPayscribeClient, "_make_request", make_request)
+    snapshot = dict(_snapshot(7200), payscribe_transaction_id=None)
+    [answer] = asyncio.run(ReconciliationService()._requery_all([snapshot]))
+
+    summary, failed = _apply(answer)
+    assert summary["failed"] == 1
+    assert len(failed) == 1
+
+
+def test_recent_not_found_stays_pending(app):
+    summary, failed = _apply({"status": False, "description": "Transaction not found"}, age_seconds=60)
+
+    assert summary["still_pending"] == 1
+    assert failed == []
+
+
+def test_other_refusal_stays_pending(app):
+    summary, failed = _apply({"status": False, "description": "Service temporarily unavailable"})
+
+    assert summary["still_pending"] == 1
+    assert failed == []
@@ -0,0 +1,74 @@
+"""Archiving finalized transactions and reading history across the archive boundary."""
+from datetime import datetime, timedelta
+from decimal import Decimal
+import pytest
+from app.extensions import db
+from app.models import Transaction, ArchivedTransaction
+from app.services.transaction_archive_service import TransactionArchiveService
+from app.services.transaction_service import TransactionService
+
+ARCHIVE_AFTER_DAYS = 5
+
+
+@pytest.fixture
+def history(app, user):
+    """Ten settled purchases a day apart plus an old one still pending, archived at five days.
+
+    Returns every transaction id in history order (newest first).
+    """
+    now = datetime.utcnow()
+    rows = [(f"AT-{age}", "success", now - timedelta(days=age, hours=1)) for age in range(10)]
+    rows.append(("AT-OPEN", "pending", now - timedelta(days=7, hours=2)))
+    for reference, status, created_at in rows:
+        transaction = Transaction(
+            user_id=user,
+            type="airtime",
+            amount=Decimal("100"),
+            reference=reference,
+            details={"network": "mtn", "phone": "+2348031234567"},
+            status=status
+        )
+        transaction.created_at = transaction.updated_at = created_at
+        db.session.add(transaction)
+    db.session.commit()
+
+    ordered = db.session.query(Transaction.id).filter_by(user_id=user).order_by(
+        Transaction.created_at.desc(), Transaction.id.desc()
+    ).all()
+    TransactionArchiveService().archive(archive_after_days=ARCHIVE_AFTER_DAYS, batch_size=2)
+    return [row.id for row in ordered]
+
+
+def test_archive_moves_only_old_final_rows(user, history):
+    live = {row.reference for row in db.session.query(Transaction.reference).filter_by(user_id=user)}
+    archived = {row.reference for row in db.session.query(ArchivedTransaction.reference).filter_by(user_id=user)}
+
+    assert archived == {f"AT-{age}" for age in range(ARCHIVE_AFTER_DAYS, 10)}
+    # The pending row is older than the cutoff but still open, so it stays in the hot table
+    assert live == {f"AT-{age}" for age in range(ARCHIVE_AFTER_DAYS)} | {"AT-OPEN"}
+
+
+def test_offset_pages_cross_the_archive_boundary(user, history):
+    service = TransactionService()
+
+    # Pages of 3 start in the hot table and end in the archive
+    seen = []
+    for offset in range(0, len(history), 3):
+        page = service.get_transactions(user, limit=3, offset=offset)
+        seen.extend(transaction["id"] for transaction in page["transactions"])
+
+    assert seen == history
+
+
+def test_cursor_continues_into_archived_rows(user, history):
+    service = TransactionService()
+
+    seen, cursor = [], None
+    while True:
+        page = service.get_transactions(user, limit=4, cursor=cursor)
+        seen.extend(transaction["id"] for transaction in page["transactions"])
+        if not page["has_more"]:
+            break
+        cursor = page["next_cursor"]
+
+    assert seen == history
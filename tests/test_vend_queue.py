@@ -0,0 +1,95 @@
+"""Vend jobs whose outcome is unknown: vend errors and jobs reclaimed from a dead worker."""
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import MagicMock
+from sqlalchemy import update
+from app.extensions import db
+from app.models import Transaction, VendJob, Wallet
+from app.services.purchase_service import PurchaseService
+from app.services.vend_queue_service import VendQueueService
+from app.errors.exceptions import PayscribeAPIException
+
+VEND_PAYLOAD = {"kind": "airtime", "network": "mtn", "recipient": "+2348031234567", "amount": 100.0, "beneficiary": None}
+
+
+def _queued_purchase(user):
+    return PurchaseService().reserve(
+        user_id=user,
+        transaction_type="airtime",
+        amount=Decimal("100"),
+        reference="AT-1",
+        details={"network": "mtn", "phone": "+2348031234567", "amount": 100.0},
+        description="Airtime purchase - MTN +2348031234567",
+        vend_payload=VEND_PAYLOAD
+    )
+
+
+def _abandoned_job(app, user):
+    """Queue a purchase and leave its job in processing past the lock timeout."""
+    snapshot = _queued_purchase(user)
+    stale = datetime.utcnow() - timedelta(seconds=app.config["VEND_QUEUE_LOCK_TIMEOUT_SECONDS"] + 1)
+    db.session.execute(
+        update(VendJob).where(VendJob.transaction_id == snapshot["id"]).values(status="processing", locked_at=stale, attempts=1)
+    )
+    db.session.commit()
+    return snapshot
+
+
+def _service(requery_response):
+    service = VendQueueService()
+    service.payscribe_client = MagicMock()
+    service.payscribe_client.requery_transaction.return_value = requery_response
+    service.payscribe_client.vend_airtime.return_value = {
+        "status": True,
+        "message": {"details": {"trans_id": "PS-2", "ref": "AT-1", "status": "success"}}
+    }
+    return service
+
+
+def test_reclaimed_job_settles_from_requery(app, user):
+    snapshot = _abandoned_job(app, user)
+    service = _service({"status": True, "message": {"details": {"trans_id": "PS-1", "ref": "AT-1", "status": "success"}}})
+
+    [job] = service.claim_jobs()
+    assert job["reclaimed"]
+    assert service.process_job(job) == "done"
+
+    # The dead worker's vend went through: no second vend
+    service.payscribe_client.vend_airtime.assert_not_called()
+    assert db.session.query(Transaction.payscribe_transaction_id).filter_by(id=snapshot["id"]).scalar() == "PS-1"
+
+
+def test_reclaimed_job_vends_after_not_found(app, user):
+    _abandoned_job(app, user)
+    service = _service({"status": False, "status_code": 404, "description": "Transaction not found"})
+
+    [job] = service.claim_jobs()
+    assert service.process_job(job) == "done"
+
+    service.payscribe_client.vend_airtime.assert_called_once()
+
+
+def test_reclaimed_job_without_answer_stays_processing(app, user):
+    snapshot = _abandoned_job(app, user)
+    service = _service({"status": False, "description": "Service temporarily unavailable"})
+
+    [job] = service.claim_jobs()
+    assert service.process_job(job) == "processing"
+
+    service.payscribe_client.vend_airtime.assert_not_called()
+    assert db.session.query(Transaction.status).filter_by(id=snapshot["id"]).scalar() == "pending"
+    assert db.session.query(Wallet.balance).filter_by(user_id=user).scalar() == Decimal("4900.00")
+
+
+def test_vend_error_leaves_job_open_for_requery(app, user):
+    snapshot = _queued_purchase(user)
+    service = _service({"status": False, "description": "unused"})
+    service.payscribe_client.vend_airtime.side_effect = PayscribeAPIException("Payscribe API request error: Read timed out")
+
+    [job] = service.claim_jobs()
+    assert service.process_job(job) == "processing"
+
+    # Payscribe may have delivered it: no refund, the job is requeried once its lock times out
+    assert db.session.query(Transaction.status).filter_by(id=snapshot["id"]).scalar() == "pending"
+    assert db.session.query(VendJob.status).filter_by(transaction_id=snapshot["id"]).scalar() == "processing"
+    assert db.session.query(Wallet.balance).filter_by(user_id=user).scalar() == Decimal("4900.00")
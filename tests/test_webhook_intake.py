@@ -0,0 +1,69 @@
+"""Recording incoming webhooks, dropping redeliveries and rejecting unusable ones."""
+from datetime import datetime, timedelta
+from decimal import Decimal
+from app.extensions import db
+from app.models import WebhookLog, Wallet, ArchivedTransaction
+from app.services.webhook_service import record_webhook, process_payscribe_webhook
+
+EVENT = "transaction.status"
+PAYLOAD = {"event_type": EVENT, "trans_id": "PS-1", "status": "success"}
+
+
+def _set_status(log_id, status):
+    webhook_log = db.session.get(WebhookLog, log_id)
+    webhook_log.status = status
+    webhook_log.attempts = 5
+    db.session.commit()
+
+
+def test_redelivery_of_processed_webhook_is_dropped(app):
+    log_id = record_webhook(EVENT, PAYLOAD)
+    _set_status(log_id, "processed")
+
+    assert record_webhook(EVENT, PAYLOAD) is None
+    assert WebhookLog.query.count() == 1
+
+
+def test_redelivery_of_dead_webhook_is_requeued(app):
+    log_id = record_webhook(EVENT, PAYLOAD)
+    _set_status(log_id, "dead")
+
+    assert record_webhook(EVENT, dict(PAYLOAD, amount=100)) == log_id
+    db.session.expire_all()
+    webhook_log = db.session.get(WebhookLog, log_id)
+    assert (webhook_log.status, webhook_log.attempts, webhook_log.payload["amount"]) == ("pending", 0, 100)
+    assert WebhookLog.query.count() == 1
+
+
+def test_funding_webhook_without_trans_id_is_rejected(app, user):
+    wallet = Wallet.query.filter_by(user_id=user).one()
+    wallet.payscribe_account_number = "9900000001"
+    db.session.commit()
+    log_id = record_webhook("accounts.payment.status", {
+        "event_type": "accounts.payment.status",
+        "status": "success",
+        "amount": 1000,
+        "customer": {"number": "9900000001"}
+    })
+
+    process_payscribe_webhook(db.session.get(WebhookLog, log_id))
+
+    webhook_log = db.session.get(WebhookLog, log_id)
+    assert (webhook_log.status, webhook_log.error_message) == ("failed", "Missing trans_id: payment cannot be deduplicated")
+    assert db.session.query(Wallet.balance).filter_by(user_id=user).scalar() == Decimal("5000.00")
+
+
+def test_status_webhook_for_archived_purchase_is_a_no_op(app, user):
+    created_at = datetime.utcnow() - timedelta(days=200)
+    db.session.add(ArchivedTransaction(
+        id="t-archived", user_id=user, type="airtime", status="success", amount=Decimal("100"),
+        reference="AT-OLD", payscribe_transaction_id="PS-OLD", details={}, created_at=created_at, updated_at=created_at
+    ))
+    db.session.commit()
+    log_id = record_webhook(EVENT, {"event_type": EVENT, "trans_id": "PS-OLD", "status": "failed"})
+
+    process_payscribe_webhook(db.session.get(WebhookLog, log_id))
+
+    assert db.session.get(WebhookLog, log_id).status == "processed"
+    assert db.session.get(ArchivedTransaction, "t-archived").status == "success"
+    assert db.session.query(Wallet.balance).filter_by(user_id=user).scalar() == Decimal("5000.00")